@@ -5,11 +5,12 @@ package.domain = com.factory.app
 source.dir = .
 source.include_exts = py,png,jpg,kv,atlas,ttf,db,json,txt
 # IMPORTANTE: Incluimos la carpeta modules donde está tu PDFGenerator
-source.include_patterns = factory.kv,modules/*.py,assets/*
+source.include_patterns = factory.kv,kv/*.kv,modules/*.py,assets/*,assets/fonts/*
 version = 2.0.0
 
 # REQUERIMIENTOS: Actualizados para KivyMD 2.0.1 (Material 3)
-requirements = python3, kivy==2.3.0, https://github.com/kivymd/KivyMD/archive/master.zip, pillow, fpdf2, plyer, requests, materialyoucolor
+# fpdf2 fijado: modules/fonts.py usa detalles internos de esa versión (igual que requirements.txt)
+requirements = python3, kivy==2.3.0, https://github.com/kivymd/KivyMD/archive/master.zip, pillow, fpdf2==2.7.5, plyer, requests, materialyoucolor
 
 orientation = landscape
 fullscreen = 0
@@ -19,9 +19,12 @@ Características:
 """
 
 import os
-import sqlite3
 from datetime import datetime
-from pathlib import Path
+
+from modules.startup import StartupTimer
+
+# Medición del arranque en frío (se muestra al dibujar el primer frame)
+arranque = StartupTimer()
 
 from kivy.config import Config
 # Forzar modo Landscape antes de importar Window
@@ -32,306 +35,23 @@ Config.set('kivy', 'exit_on_escape', '0')
 
 from kivy.core.window import Window
 from kivy.metrics import dp
-from kivy.properties import StringProperty, ObjectProperty, NumericProperty
+from kivy.properties import StringProperty, ObjectProperty, NumericProperty, BooleanProperty, ListProperty
 from kivy.uix.screenmanager import ScreenManager, SlideTransition
 from kivy.clock import Clock
+from kivy.lang import Builder
 
 from kivymd.app import MDApp
 from kivymd.uix.screen import MDScreen
-from kivymd.uix.dialog import MDDialog
 from kivymd.uix.snackbar import MDSnackbar, MDSnackbarText
-from kivymd.uix.button import MDButton, MDButtonText, MDButtonIcon
-from kivymd.uix.textfield import MDTextField, MDTextFieldHintText, MDTextFieldHelperText
-from kivymd.uix.list import MDListItem, MDListItemLeadingIcon, MDListItemSupportingText
-from kivymd.uix.card import MDCard
-from kivymd.uix.label import MDLabel
-from kivymd.uix.boxlayout import MDBoxLayout
-
-# Importar módulo PDF
-try:
-    from modules.pdf_generator import PDFGenerator
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
-    print("[WARNING] Módulo PDF no disponible")
-
-# ==============================================================================
-# BASE DE DATOS
-# ==============================================================================
-class DatabaseManager:
-    """Gestor de base de datos SQLite para la aplicación"""
-    
-    def __init__(self, db_path='factory.db'):
-        self.db_path = db_path
-        self.init_database()
-    
-    def get_connection(self):
-        return sqlite3.connect(self.db_path)
-    
-    def init_database(self):
-        """Inicializa todas las tablas necesarias"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Tabla de productos/inventario
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS productos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                codigo TEXT UNIQUE,
-                stock INTEGER DEFAULT 0,
-                precio_venta REAL DEFAULT 0,
-                costo_unitario REAL DEFAULT 0,
-                categoria TEXT,
-                fecha_creacion TEXT
-            )
-        ''')
-        
-        # Tabla de producción
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS produccion (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                producto_id INTEGER,
-                cantidad INTEGER NOT NULL,
-                fecha TEXT,
-                costo_total REAL DEFAULT 0,
-                FOREIGN KEY (producto_id) REFERENCES productos(id)
-            )
-        ''')
-        
-        # Tabla de ventas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS ventas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                producto_id INTEGER,
-                cantidad INTEGER NOT NULL,
-                precio_unitario REAL,
-                total REAL,
-                fecha TEXT,
-                cliente TEXT,
-                FOREIGN KEY (producto_id) REFERENCES productos(id)
-            )
-        ''')
-        
-        # Tabla de gastos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS gastos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                concepto TEXT NOT NULL,
-                monto REAL NOT NULL,
-                categoria TEXT,
-                fecha TEXT,
-                descripcion TEXT
-            )
-        ''')
-        
-        # Tabla de balance
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS balance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fecha TEXT,
-                tipo TEXT,
-                concepto TEXT,
-                monto REAL,
-                saldo_acumulado REAL
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    # ===== PRODUCTOS =====
-    def add_producto(self, nombre, codigo, stock, precio_venta, categoria):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        cursor.execute('''
-            INSERT INTO productos (nombre, codigo, stock, precio_venta, categoria, fecha_creacion)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (nombre, codigo, stock, precio_venta, categoria, fecha))
-        conn.commit()
-        conn.close()
-    
-    def get_productos(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM productos ORDER BY nombre')
-        productos = cursor.fetchall()
-        conn.close()
-        return productos
-    
-    def update_producto_stock(self, producto_id, cantidad):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('UPDATE productos SET stock = stock + ? WHERE id = ?', (cantidad, producto_id))
-        conn.commit()
-        conn.close()
-    
-    # ===== PRODUCCIÓN =====
-    def add_produccion(self, producto_id, cantidad, costo_total):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        cursor.execute('''
-            INSERT INTO produccion (producto_id, cantidad, fecha, costo_total)
-            VALUES (?, ?, ?, ?)
-        ''', (producto_id, cantidad, fecha, costo_total))
-        cursor.execute('UPDATE productos SET stock = stock + ? WHERE id = ?', (cantidad, producto_id))
-        conn.commit()
-        conn.close()
-    
-    def get_produccion_mes(self, mes=None, anio=None):
-        if mes is None:
-            mes = datetime.now().month
-        if anio is None:
-            anio = datetime.now().year
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT SUM(cantidad), SUM(costo_total) FROM produccion 
-            WHERE strftime('%m', fecha) = ? AND strftime('%Y', fecha) = ?
-        ''', (f'{mes:02d}', str(anio)))
-        result = cursor.fetchone()
-        conn.close()
-        return result if result[0] else (0, 0)
-    
-    # ===== VENTAS =====
-    def add_venta(self, producto_id, cantidad, precio_unitario, cliente):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        total = cantidad * precio_unitario
-        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        cursor.execute('''
-            INSERT INTO ventas (producto_id, cantidad, precio_unitario, total, fecha, cliente)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (producto_id, cantidad, precio_unitario, total, fecha, cliente))
-        cursor.execute('UPDATE productos SET stock = stock - ? WHERE id = ?', (cantidad, producto_id))
-        self._registrar_balance(conn, 'INGRESO', f'Venta - {cliente}', total)
-        conn.commit()
-        conn.close()
-    
-    def get_ventas(self, limit=50):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT v.id, p.nombre, v.cantidad, v.total, v.fecha, v.cliente 
-            FROM ventas v JOIN productos p ON v.producto_id = p.id
-            ORDER BY v.fecha DESC LIMIT ?
-        ''', (limit,))
-        ventas = cursor.fetchall()
-        conn.close()
-        return ventas
-    
-    # ===== GASTOS =====
-    def add_gasto(self, concepto, monto, categoria, descripcion):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        cursor.execute('''
-            INSERT INTO gastos (concepto, monto, categoria, fecha, descripcion)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (concepto, monto, categoria, fecha, descripcion))
-        self._registrar_balance(conn, 'EGRESO', concepto, monto)
-        conn.commit()
-        conn.close()
-    
-    def get_gastos_mes(self, mes=None, anio=None):
-        if mes is None:
-            mes = datetime.now().month
-        if anio is None:
-            anio = datetime.now().year
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT SUM(monto) FROM gastos 
-            WHERE strftime('%m', fecha) = ? AND strftime('%Y', fecha) = ?
-        ''', (f'{mes:02d}', str(anio)))
-        result = cursor.fetchone()[0]
-        conn.close()
-        return result if result else 0
-    
-    def get_gastos(self, limit=50):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM gastos ORDER BY fecha DESC LIMIT ?', (limit,))
-        gastos = cursor.fetchall()
-        conn.close()
-        return gastos
-    
-    # ===== BALANCE =====
-    def _registrar_balance(self, conn, tipo, concepto, monto):
-        cursor = conn.cursor()
-        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        cursor.execute('SELECT saldo_acumulado FROM balance ORDER BY id DESC LIMIT 1')
-        result = cursor.fetchone()
-        saldo_anterior = result[0] if result else 0
-        
-        if tipo == 'INGRESO':
-            nuevo_saldo = saldo_anterior + monto
-        else:
-            nuevo_saldo = saldo_anterior - monto
-        
-        cursor.execute('''
-            INSERT INTO balance (fecha, tipo, concepto, monto, saldo_acumulado)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (fecha, tipo, concepto, monto, nuevo_saldo))
-    
-    def get_balance_actual(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT saldo_acumulado FROM balance ORDER BY id DESC LIMIT 1')
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else 0
-    
-    def get_resumen_mes(self, mes=None, anio=None):
-        if mes is None:
-            mes = datetime.now().month
-        if anio is None:
-            anio = datetime.now().year
-        
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT SUM(total) FROM ventas 
-            WHERE strftime('%m', fecha) = ? AND strftime('%Y', fecha) = ?
-        ''', (f'{mes:02d}', str(anio)))
-        ventas_mes = cursor.fetchone()[0] or 0
-        
-        cursor.execute('''
-            SELECT SUM(monto) FROM gastos 
-            WHERE strftime('%m', fecha) = ? AND strftime('%Y', fecha) = ?
-        ''', (f'{mes:02d}', str(anio)))
-        gastos_mes = cursor.fetchone()[0] or 0
-        
-        cursor.execute('''
-            SELECT SUM(cantidad) FROM produccion 
-            WHERE strftime('%m', fecha) = ? AND strftime('%Y', fecha) = ?
-        ''', (f'{mes:02d}', str(anio)))
-        unidades_producidas = cursor.fetchone()[0] or 0
-        
-        conn.close()
-        
-        costo_por_unidad = gastos_mes / unidades_producidas if unidades_producidas > 0 else 0
-        
-        return {
-            'ventas': ventas_mes,
-            'gastos': gastos_mes,
-            'balance': ventas_mes - gastos_mes,
-            'unidades_producidas': unidades_producidas,
-            'costo_por_unidad': costo_por_unidad
-        }
 
+from modules.database import DatabaseManager, format_guaranies
+from modules.db_executor import DBExecutor
+from modules.historial import PaginadorHistorial
+from modules.instrumentation import instrumentacion
+from modules.report_jobs import ReportJobQueue, TrabajoReporte
+from modules.write_batcher import EscriturasDescartadas
 
-# ==============================================================================
-# FORMATO MONEDA GUARANÍES
-# ==============================================================================
-def format_guaranies(valor):
-    """Formatea un número al estilo Guaraníes: Gs. 1.000.000"""
-    if valor is None:
-        valor = 0
-    return f"Gs. {valor:,.0f}".replace(",", ".")
+arranque.marcar('imports')
 
 
 # ==============================================================================
@@ -340,43 +60,97 @@ def format_guaranies(valor):
 class PanelScreen(MDScreen):
     """Pantalla principal del Panel de Control"""
     
+    @instrumentacion.medido('pantalla')
     def on_enter(self):
         self.actualizar_dashboard()
     
+    cargando = BooleanProperty(False)
+    
     def actualizar_dashboard(self):
-        db = MDApp.get_running_app().db
-        resumen = db.get_resumen_mes()
+        app = MDApp.get_running_app()
+        db = app.db
+        self.cargando = True
+        app.db_async.enviar(
+            lambda: (db.get_resumen_mes(), db.get_balance_actual()),
+            al_terminar=self._mostrar_dashboard,
+            al_fallar=self._error_dashboard,
+        )
+    
+    @instrumentacion.medido('pantalla')
+    def _mostrar_dashboard(self, datos):
+        resumen, balance_total = datos
+        self.cargando = False
         
         self.ids.lbl_ventas.text = format_guaranies(resumen['ventas'])
         self.ids.lbl_gastos.text = format_guaranies(resumen['gastos'])
         self.ids.lbl_balance.text = format_guaranies(resumen['balance'])
         self.ids.lbl_unidades.text = str(resumen['unidades_producidas'])
         self.ids.lbl_costo_unitario.text = format_guaranies(resumen['costo_por_unidad'])
-        
-        balance_total = db.get_balance_actual()
         self.ids.lbl_balance_total.text = format_guaranies(balance_total)
+    
+    def _error_dashboard(self, error):
+        self.cargando = False
+        print(f"[ERROR] No se pudo actualizar el panel: {error}")
 
 
 class InventarioScreen(MDScreen):
     """Pantalla de Gestión de Inventario"""
     
+    # Productos mostrados como resultado de una búsqueda (db.buscar)
+    MAX_RESULTADOS = 100
+    cargando = BooleanProperty(False)
+    busqueda = ''
+    
+    @instrumentacion.medido('pantalla')
     def on_enter(self):
         self.cargar_productos()
     
     def cargar_productos(self):
-        self.ids.container_productos.clear_widgets()
-        db = MDApp.get_running_app().db
-        productos = db.get_productos()
-        
-        for prod in productos:
-            item = MDListItem(
-                MDListItemLeadingIcon(icon="package-variant"),
-                MDListItemSupportingText(
-                    text=f"{prod[1]} | Stock: {prod[3]} | {format_guaranies(prod[4])}"
-                ),
-                on_release=lambda x, p=prod: self.ver_producto(p)
+        app = MDApp.get_running_app()
+        self.cargando = True
+        if not self.busqueda:
+            app.db_async.enviar(
+                app.db.get_productos,
+                al_terminar=lambda productos: self._mostrar_productos(productos, ''),
+                al_fallar=self._error_carga,
             )
-            self.ids.container_productos.add_widget(item)
+            return
+        app.db_async.enviar(
+            self._buscar, app.db, self.busqueda,
+            al_terminar=lambda productos, texto=self.busqueda: self._mostrar_productos(productos, texto),
+            al_fallar=self._error_carga,
+        )
+    
+    def _buscar(self, db, texto):
+        # En el hilo de la base: una búsqueda ya reemplazada no se ordena por relevancia
+        if texto != self.busqueda:
+            return None
+        return db.buscar(texto, 'productos', size=self.MAX_RESULTADOS)[0]
+    
+    def buscar_productos(self, texto):
+        texto = texto.strip()
+        if texto != self.busqueda:
+            self.busqueda = texto
+            self.cargar_productos()
+    
+    @instrumentacion.medido('pantalla')
+    def _mostrar_productos(self, productos, busqueda):
+        # Resultado de una búsqueda que ya se cambió: llega otro detrás
+        if busqueda != self.busqueda:
+            return
+        self.cargando = False
+        self.ids.container_productos.data = [
+            {
+                'icono': "package-variant",
+                'texto': f"{prod[1]} | Stock: {prod[3]} | {format_guaranies(prod[4])}",
+                'on_release': lambda p=prod: self.ver_producto(p),
+            }
+            for prod in productos
+        ]
+    
+    def _error_carga(self, error):
+        self.cargando = False
+        self.mostrar_snackbar(f"Error: {error}")
     
     def ver_producto(self, producto):
         self.mostrar_snackbar(f"{producto[1]} - Stock: {producto[3]}")
@@ -393,17 +167,62 @@ class InventarioScreen(MDScreen):
         self.mostrar_snackbar("Función: Nuevo Producto")
 
 
-class ProduccionScreen(MDScreen):
+class SeleccionProducto:
+    """
+    Elección del producto por código de barras o por nombre.
+    
+    Las búsquedas se hacen contra el catálogo en memoria (db.catalogo), que
+    se carga en el hilo de la base de datos la primera vez que se entra.
+    El producto elegido es la mejor coincidencia de lo escrito en txt_producto.
+    """
+    
+    MAX_SUGERENCIAS = 4
+    producto = None
+    
+    def cargar_catalogo(self):
+        app = MDApp.get_running_app()
+        app.db_async.enviar(
+            app.db.catalogo.cargar,
+            al_terminar=lambda _: self.buscar_producto(self.ids.txt_producto.text),
+            al_fallar=lambda e: self.mostrar_error(f"Error al cargar productos: {e}"),
+        )
+    
+    @instrumentacion.medido('pantalla')
+    def buscar_producto(self, texto):
+        catalogo = MDApp.get_running_app().db.catalogo
+        if not catalogo.cargado:
+            self.ids.lbl_producto.text = "Cargando productos..."
+            return
+        
+        encontrados = catalogo.buscar(texto, limite=self.MAX_SUGERENCIAS) if texto.strip() else []
+        self.producto = encontrados[0] if encontrados else None
+        if self.producto is not None:
+            p = self.producto
+            detalle = f"{p.nombre} ({p.codigo or 's/código'}) · stock {p.stock}"
+            if len(encontrados) > 1:
+                detalle += "   |   También: " + ", ".join(otro.nombre for otro in encontrados[1:])
+            self.ids.lbl_producto.text = detalle
+        elif texto.strip():
+            self.ids.lbl_producto.text = "Sin coincidencias"
+        else:
+            self.ids.lbl_producto.text = "Escriba el código o el nombre del producto"
+        self._producto_elegido(self.producto)
+    
+    def _producto_elegido(self, producto):
+        """Para las pantallas que completan otros campos según el producto"""
+        pass
+
+
+class ProduccionScreen(SeleccionProducto, MDScreen):
     """Pantalla de Registro de Producción"""
     
-    def on_enter(self):
-        self.cargar_productos_spinner()
+    guardando = BooleanProperty(False)
     
-    def cargar_productos_spinner(self):
-        db = MDApp.get_running_app().db
-        productos = db.get_productos()
-        self.productos_list = [(p[0], p[1]) for p in productos]
+    @instrumentacion.medido('pantalla')
+    def on_enter(self):
+        self.cargar_catalogo()
     
+    @instrumentacion.medido('pantalla')
     def registrar_produccion(self):
         try:
             cantidad = int(self.ids.txt_cantidad.text)
@@ -412,23 +231,31 @@ class ProduccionScreen(MDScreen):
             if cantidad <= 0:
                 self.mostrar_error("La cantidad debe ser mayor a 0")
                 return
-            
-            db = MDApp.get_running_app().db
-            productos = db.get_productos()
-            if not productos:
-                self.mostrar_error("No hay productos registrados")
+            if self.producto is None:
+                self.mostrar_error("Seleccione un producto")
                 return
             
-            producto_id = productos[0][0]
-            db.add_produccion(producto_id, cantidad, costo)
-            
-            self.mostrar_snackbar(f"Producción registrada: {cantidad} unidades")
-            self.ids.txt_cantidad.text = ""
-            self.ids.txt_costo.text = ""
-            
+            app = MDApp.get_running_app()
+            self.guardando = True
+            app.db_async.enviar(
+                app.db.add_produccion, self.producto.id, cantidad, costo,
+                al_terminar=lambda _: self._produccion_guardada(cantidad),
+                al_fallar=self._error_guardado,
+            )
+        
         except ValueError:
             self.mostrar_error("Ingrese valores numéricos válidos")
     
+    def _produccion_guardada(self, cantidad):
+        self.guardando = False
+        self.mostrar_snackbar(f"Producción registrada: {cantidad} unidades")
+        self.ids.txt_cantidad.text = ""
+        self.ids.txt_costo.text = ""
+    
+    def _error_guardado(self, error):
+        self.guardando = False
+        self.mostrar_error(str(error))
+    
     def mostrar_snackbar(self, texto):
         MDSnackbar(
             MDSnackbarText(text=texto),
@@ -446,53 +273,175 @@ class ProduccionScreen(MDScreen):
         ).open()
 
 
-class VentasScreen(MDScreen):
+class HistorialPaginado:
+    """
+    Historial cargado por páginas en una ListaReciclada.
+    
+    La primera página se carga al entrar; las siguientes se piden a la base
+    de datos cuando el usuario llega al final de la lista. Con texto en el
+    campo de búsqueda, las páginas son los resultados de db.buscar.
+    El cursor y la búsqueda los lleva un PaginadorHistorial.
+    
+    Cada pantalla define lista_historial, tabla_historial y, como métodos
+    estáticos, pagina_historial(db, after, size) y dato_historial(fila).
+    """
+    
+    lista_historial = ''
+    # Tabla mostrada: el historial se recarga al confirmarse escrituras en ella
+    tabla_historial = ''
+    pagina_historial = None
+    dato_historial = None
+    _paginador = None
+    
+    @property
+    def historial(self):
+        if self._paginador is None:
+            self._paginador = PaginadorHistorial(
+                MDApp.get_running_app().db_async, self.tabla_historial,
+                self.pagina_historial, self.dato_historial,
+                al_agregar=self._agregar_pagina,
+                al_fallar=self._error_historial,
+            )
+        return self._paginador
+    
+    def reiniciar_historial(self, busqueda=None):
+        lista = self.ids[self.lista_historial]
+        lista.data = []
+        lista.scroll_y = 1
+        self.historial.reiniciar(busqueda)
+        self.cargando = self.historial.cargando
+    
+    def cargar_pagina_historial(self):
+        self.historial.siguiente()
+        self.cargando = self.historial.cargando
+    
+    def buscar_historial(self, texto):
+        texto = texto.strip()
+        if texto != self.historial.busqueda:
+            self.reiniciar_historial(texto)
+    
+    @instrumentacion.medido('pantalla')
+    def _agregar_pagina(self, datos):
+        self.cargando = False
+        self.ids[self.lista_historial].data.extend(datos)
+    
+    def _error_historial(self, error):
+        self.cargando = False
+        self.mostrar_error(f"Error: {error}")
+    
+    def on_scroll_historial(self, scroll_y):
+        # scroll_y llega a 0 al final de la lista
+        if scroll_y <= 0.05:
+            self.cargar_pagina_historial()
+
+
+class VentasScreen(SeleccionProducto, HistorialPaginado, MDScreen):
     """Pantalla de Registro de Ventas"""
     
+    lista_historial = 'container_ventas'
+    tabla_historial = 'ventas'
+    pagina_historial = staticmethod(DatabaseManager.get_ventas_page)
+    cargando = BooleanProperty(False)
+    guardando = BooleanProperty(False)
+    # Líneas del ticket en preparación: (Producto, cantidad, precio_unitario)
+    ticket = ListProperty()
+    # Último precio completado desde el catálogo (se reemplaza al cambiar de producto)
+    _precio_sugerido = ""
+    
+    @instrumentacion.medido('pantalla')
     def on_enter(self):
+        self.cargar_catalogo()
         self.cargar_ventas()
     
+    def _producto_elegido(self, producto):
+        campo = self.ids.txt_precio_venta
+        if producto is None or campo.text not in ("", self._precio_sugerido):
+            return
+        self._precio_sugerido = f"{producto.precio_venta:.0f}" if producto.precio_venta else ""
+        campo.text = self._precio_sugerido
+    
     def cargar_ventas(self):
-        self.ids.container_ventas.clear_widgets()
-        db = MDApp.get_running_app().db
-        ventas = db.get_ventas(20)
-        
-        for v in ventas:
-            item = MDListItem(
-                MDListItemLeadingIcon(icon="cash-register"),
-                MDListItemSupportingText(
-                    text=f"{v[1]} | {v[2]} u. | {format_guaranies(v[3])} | {v[4][:10]}"
-                )
-            )
-            self.ids.container_ventas.add_widget(item)
+        self.reiniciar_historial()
     
-    def registrar_venta(self):
+    @staticmethod
+    def dato_historial(v):
+        return {
+            'icono': "cash-register",
+            'texto': f"{v[1]} | {v[2]} u. | {format_guaranies(v[3])} | {v[4][:10]}",
+        }
+    
+    # ===== TICKET =====
+    def _leer_linea(self):
+        """Línea del formulario como (producto, cantidad, precio), o None si no es válida"""
         try:
             cantidad = int(self.ids.txt_cantidad_venta.text)
             precio = float(self.ids.txt_precio_venta.text)
-            cliente = self.ids.txt_cliente.text or "Cliente General"
-            
-            if cantidad <= 0 or precio <= 0:
-                self.mostrar_error("Cantidad y precio deben ser mayores a 0")
-                return
-            
-            db = MDApp.get_running_app().db
-            productos = db.get_productos()
-            if not productos:
-                self.mostrar_error("No hay productos registrados")
-                return
-            
-            producto_id = productos[0][0]
-            db.add_venta(producto_id, cantidad, precio, cliente)
-            
-            self.mostrar_snackbar(f"Venta registrada: {format_guaranies(cantidad * precio)}")
-            self.ids.txt_cantidad_venta.text = ""
-            self.ids.txt_precio_venta.text = ""
-            self.ids.txt_cliente.text = ""
-            self.cargar_ventas()
-            
         except ValueError:
             self.mostrar_error("Ingrese valores numéricos válidos")
+            return None
+        if cantidad <= 0 or precio <= 0:
+            self.mostrar_error("Cantidad y precio deben ser mayores a 0")
+            return None
+        if self.producto is None:
+            self.mostrar_error("Seleccione un producto")
+            return None
+        return (self.producto, cantidad, precio)
+    
+    def agregar_al_ticket(self):
+        linea = self._leer_linea()
+        if linea is None:
+            return
+        self.ticket.append(linea)
+        # Formulario listo para el próximo producto
+        self._precio_sugerido = ""
+        self.ids.txt_cantidad_venta.text = ""
+        self.ids.txt_precio_venta.text = ""
+        self.ids.txt_producto.text = ""
+    
+    def quitar_del_ticket(self):
+        if self.ticket:
+            self.ticket.pop()
+    
+    def resumen_ticket(self, lineas):
+        if not lineas:
+            return "Ticket vacío: se registra solo el producto del formulario"
+        total = sum(cantidad * precio for _, cantidad, precio in lineas)
+        detalle = ", ".join(f"{producto.nombre} x{cantidad}" for producto, cantidad, _ in lineas)
+        productos = f"{len(lineas)} producto" + ("s" if len(lineas) > 1 else "")
+        return f"Ticket: {productos} · {format_guaranies(total)}   |   {detalle}"
+    
+    @instrumentacion.medido('pantalla')
+    def registrar_venta(self):
+        lineas = list(self.ticket)
+        # Lo que quedó en el formulario es la última línea (o la venta de un solo producto)
+        if self.ids.txt_cantidad_venta.text or not lineas:
+            linea = self._leer_linea()
+            if linea is None:
+                return
+            lineas.append(linea)
+        cliente = self.ids.txt_cliente.text or "Cliente General"
+        
+        app = MDApp.get_running_app()
+        self.guardando = True
+        app.db_async.enviar(
+            app.db.add_venta_ticket,
+            [(producto.id, cantidad, precio) for producto, cantidad, precio in lineas], cliente,
+            al_terminar=self._venta_guardada,
+            al_fallar=self._error_guardado,
+        )
+    
+    def _venta_guardada(self, total):
+        self.guardando = False
+        self.mostrar_snackbar(f"Venta registrada: {format_guaranies(total)}")
+        self.ticket = []
+        self.ids.txt_cantidad_venta.text = ""
+        self.ids.txt_precio_venta.text = ""
+        self.ids.txt_cliente.text = ""
+        self._precio_sugerido = ""
+    
+    def _error_guardado(self, error):
+        self.guardando = False
+        self.mostrar_error(str(error))
     
     def mostrar_snackbar(self, texto):
         MDSnackbar(
@@ -511,26 +460,30 @@ class VentasScreen(MDScreen):
         ).open()
 
 
-class GastosScreen(MDScreen):
+class GastosScreen(HistorialPaginado, MDScreen):
     """Pantalla de Registro de Gastos"""
     
+    lista_historial = 'container_gastos'
+    tabla_historial = 'gastos'
+    pagina_historial = staticmethod(DatabaseManager.get_gastos_page)
+    cargando = BooleanProperty(False)
+    guardando = BooleanProperty(False)
+    
+    @instrumentacion.medido('pantalla')
     def on_enter(self):
         self.cargar_gastos()
     
     def cargar_gastos(self):
-        self.ids.container_gastos.clear_widgets()
-        db = MDApp.get_running_app().db
-        gastos = db.get_gastos(20)
-        
-        for g in gastos:
-            item = MDListItem(
-                MDListItemLeadingIcon(icon="cash-remove"),
-                MDListItemSupportingText(
-                    text=f"{g[1]} | {format_guaranies(g[2])} | {g[4][:10]}"
-                )
-            )
-            self.ids.container_gastos.add_widget(item)
+        self.reiniciar_historial()
     
+    @staticmethod
+    def dato_historial(g):
+        return {
+            'icono': "cash-remove",
+            'texto': f"{g[1]} | {format_guaranies(g[2])} | {g[4][:10]}",
+        }
+    
+    @instrumentacion.medido('pantalla')
     def registrar_gasto(self):
         try:
             concepto = self.ids.txt_concepto_gasto.text
@@ -542,18 +495,28 @@ class GastosScreen(MDScreen):
                 self.mostrar_error("Concepto y monto son obligatorios")
                 return
             
-            db = MDApp.get_running_app().db
-            db.add_gasto(concepto, monto, categoria, descripcion)
-            
-            self.mostrar_snackbar(f"Gasto registrado: {format_guaranies(monto)}")
-            self.ids.txt_concepto_gasto.text = ""
-            self.ids.txt_monto_gasto.text = ""
-            self.ids.txt_descripcion_gasto.text = ""
-            self.cargar_gastos()
-            
+            app = MDApp.get_running_app()
+            self.guardando = True
+            app.db_async.enviar(
+                app.db.add_gasto, concepto, monto, categoria, descripcion,
+                al_terminar=lambda _: self._gasto_guardado(monto),
+                al_fallar=self._error_guardado,
+            )
+        
         except ValueError:
             self.mostrar_error("Ingrese un monto válido")
     
+    def _gasto_guardado(self, monto):
+        self.guardando = False
+        self.mostrar_snackbar(f"Gasto registrado: {format_guaranies(monto)}")
+        self.ids.txt_concepto_gasto.text = ""
+        self.ids.txt_monto_gasto.text = ""
+        self.ids.txt_descripcion_gasto.text = ""
+    
+    def _error_guardado(self, error):
+        self.guardando = False
+        self.mostrar_error(str(error))
+    
     def mostrar_snackbar(self, texto):
         MDSnackbar(
             MDSnackbarText(text=texto),
@@ -574,13 +537,30 @@ class GastosScreen(MDScreen):
 class ReportesScreen(MDScreen):
     """Pantalla de Generación de Reportes PDF"""
     
+    progreso_pdf = NumericProperty(0)
+    estado_pdf = StringProperty("")
+    trabajos_pendientes = NumericProperty(0)
+    
+    # Se crea con el primer reporte (ver _generador)
+    _pdf_gen = None
+    
+    @instrumentacion.medido('pantalla')
     def on_enter(self):
         self.actualizar_preview()
     
     def actualizar_preview(self):
-        db = MDApp.get_running_app().db
-        resumen = db.get_resumen_mes()
-        
+        app = MDApp.get_running_app()
+        db = app.db
+        self.ids.lbl_preview.text = "Cargando..."
+        app.db_async.enviar(
+            lambda: (db.get_resumen_mes(), db.get_balance_actual()),
+            al_terminar=self._mostrar_preview,
+            al_fallar=lambda e: self.mostrar_error(f"Error: {e}"),
+        )
+    
+    @instrumentacion.medido('pantalla')
+    def _mostrar_preview(self, datos):
+        resumen, balance_total = datos
         preview_text = f"""
 RESUMEN MENSUAL
 
@@ -591,27 +571,82 @@ Balance: {format_guaranies(resumen['balance'])}
 Unidades Producidas: {resumen['unidades_producidas']}
 Costo por Unidad: {format_guaranies(resumen['costo_por_unidad'])}
 
-Balance Acumulado: {format_guaranies(db.get_balance_actual())}
+Balance Acumulado: {format_guaranies(balance_total)}
         """
         self.ids.lbl_preview.text = preview_text
     
-    def generar_pdf(self):
-        """Genera PDF y abre el menú de compartir de Android"""
-        if not PDF_AVAILABLE:
-            self.mostrar_error("Módulo PDF no disponible")
-            return
+    def generar_pdf(self, mes=None, anio=None, tipo='mensual'):
+        """
+        Encola el PDF; el menú de compartir de Android se abre al terminar.
         
-        try:
-            db = MDApp.get_running_app().db
-            pdf_gen = PDFGenerator()
-            
-            filepath = pdf_gen.generar_reporte_mensual(db)
-            self.mostrar_snackbar(f"PDF generado")
-            
-            pdf_gen.compartir_pdf_android(filepath)
-            
-        except Exception as e:
-            self.mostrar_error(f"Error: {str(e)}")
+        Args:
+            tipo: 'mensual' (resumen), 'detallado' (todas las transacciones
+                del mes) o 'anual' (portada, índice y detalle de los doce meses)
+        """
+        if mes is None:
+            mes = datetime.now().month
+        if anio is None:
+            anio = datetime.now().year
+        
+        app = MDApp.get_running_app()
+        if tipo == 'anual':
+            descripcion = f"Reporte anual {anio}"
+        elif tipo == 'detallado':
+            descripcion = f"Detalle {mes:02d}/{anio}"
+        else:
+            descripcion = f"Reporte {mes:02d}/{anio}"
+        app.reportes.encolar(
+            self._generar_reporte, app.db, tipo, mes, anio,
+            descripcion=descripcion,
+            al_progreso=self._progreso_pdf,
+            al_terminar=self._pdf_listo,
+            al_fallar=self._pdf_fallido,
+        )
+        self._actualizar_cola()
+    
+    def _generador(self):
+        """
+        PDFGenerator compartido por la pantalla.
+        
+        fpdf, fontTools y plyer se importan recién con el primer reporte (en el
+        hilo de reportes), no al abrir la app.
+        """
+        if self._pdf_gen is None:
+            try:
+                from modules.pdf_generator import PDFGenerator
+            except ImportError as e:
+                raise RuntimeError(f"Módulo PDF no disponible: {e}") from e
+            ReportesScreen._pdf_gen = PDFGenerator()
+        return self._pdf_gen
+    
+    def _generar_reporte(self, db, tipo, mes, anio, progreso=None):
+        return self._generador().generar_reporte(db, tipo, mes, anio, progreso=progreso)
+    
+    def cancelar_pdf(self):
+        MDApp.get_running_app().reportes.cancelar_todos()
+    
+    def _actualizar_cola(self):
+        self.trabajos_pendientes = len(MDApp.get_running_app().reportes.pendientes())
+        if not self.trabajos_pendientes:
+            self.progreso_pdf = 0
+            self.estado_pdf = ""
+    
+    def _progreso_pdf(self, trabajo):
+        self.progreso_pdf = trabajo.progreso * 100
+        self.estado_pdf = f"{trabajo.descripcion}: {trabajo.etapa}"
+        self._actualizar_cola()
+    
+    def _pdf_listo(self, trabajo):
+        self._actualizar_cola()
+        self.mostrar_snackbar(f"PDF generado: {trabajo.descripcion}")
+        self._generador().compartir_pdf_android(trabajo.resultado)
+    
+    def _pdf_fallido(self, trabajo):
+        self._actualizar_cola()
+        if trabajo.estado == TrabajoReporte.CANCELADO:
+            self.mostrar_snackbar(f"{trabajo.descripcion} cancelado")
+        else:
+            self.mostrar_error(f"Error: {trabajo.error}")
     
     def mostrar_snackbar(self, texto):
         MDSnackbar(
@@ -634,7 +669,38 @@ Balance Acumulado: {format_guaranies(db.get_balance_actual())}
 # SCREEN MANAGER
 # ==============================================================================
 class FactoryScreenManager(ScreenManager):
-    pass
+    """
+    Crea cada pantalla (y carga su kv) la primera vez que se entra a ella.
+    
+    Al abrir la app solo se construye el Panel; las demás pantallas no se
+    arman hasta que el usuario navega a ellas.
+    """
+    
+    # nombre -> (clase, archivo kv relativo a main.py)
+    PANTALLAS = {
+        'inventario': (InventarioScreen, 'kv/inventario.kv'),
+        'produccion': (ProduccionScreen, 'kv/produccion.kv'),
+        'ventas': (VentasScreen, 'kv/ventas.kv'),
+        'gastos': (GastosScreen, 'kv/gastos.kv'),
+        'reportes': (ReportesScreen, 'kv/reportes.kv'),
+    }
+    
+    def on_current(self, instance, value):
+        if value and not self.has_screen(value):
+            self._crear_pantalla(value)
+        return super().on_current(instance, value)
+    
+    @instrumentacion.medido('pantalla')
+    def _crear_pantalla(self, nombre):
+        if nombre not in self.PANTALLAS:
+            return
+        clase, archivo = self.PANTALLAS[nombre]
+        ruta = os.path.join(os.path.dirname(os.path.abspath(__file__)), archivo)
+        if ruta not in Builder.files:
+            Builder.load_file(ruta)
+        pantalla = clase()
+        # add_widget no cambia current si ya hay una pantalla activa
+        self.add_widget(pantalla)
 
 
 # ==============================================================================
@@ -642,8 +708,15 @@ class FactoryScreenManager(ScreenManager):
 # ==============================================================================
 class FactoryApp(MDApp):
     db = ObjectProperty(None)
+    db_async = ObjectProperty(None)
+    reportes = ObjectProperty(None)
+    
+    # Segundos que on_stop espera a que se confirme el lote de escrituras
+    ESPERA_CIERRE = 10
     
     def build(self):
+        arranque.marcar('app')
+        
         # Configurar tema oscuro
         self.theme_cls.theme_style = "Dark"
         self.theme_cls.primary_palette = "Blue"
@@ -654,14 +727,102 @@ class FactoryApp(MDApp):
         
         # Inicializar base de datos
         self.db = DatabaseManager()
+        arranque.marcar('base de datos')
+        self.db_async = DBExecutor(
+            self.db, despachar=lambda funcion: Clock.schedule_once(lambda dt: funcion())
+        )
+        # Ventas, gastos y producción se confirman por lotes; la pantalla se
+        # refresca cuando el lote llega a la base (_escrituras_confirmadas)
+        self.db.activar_escritura_agrupada(
+            al_confirmar=self._escrituras_confirmadas,
+            al_fallar=self._escritura_fallida,
+            despachar=lambda funcion: Clock.schedule_once(lambda dt: funcion()),
+        )
+        self.reportes = ReportJobQueue(
+            despachar=lambda funcion: Clock.schedule_once(lambda dt: funcion())
+        )
+        # Importaciones, archivado, mantenimiento: el catálogo se vacía y la
+        # pantalla que elige productos lo vuelve a pedir
+        self.db.catalogo.suscribir(lambda: Clock.schedule_once(lambda dt: self._catalogo_invalidado()))
+        arranque.marcar('ejecutores')
         
         return self.root
     
     def on_start(self):
         """Acciones al iniciar la app"""
-        productos = self.db.get_productos()
-        if not productos:
-            self._insertar_datos_ejemplo()
+        # El kv principal (factory.kv) se carga entre build() y on_start
+        arranque.marcar('interfaz')
+        
+        # La verificación de datos de ejemplo va al hilo de la base de datos
+        self.db_async.enviar(self._verificar_datos_ejemplo, al_terminar=self._datos_ejemplo_listos)
+        Clock.schedule_once(self._primer_frame)
+    
+    def _primer_frame(self, dt):
+        arranque.marcar('primer frame')
+        arranque.terminar(os.path.join(self.user_data_dir, 'arranque.jsonl'))
+    
+    def _verificar_datos_ejemplo(self):
+        """Inserta los datos de ejemplo si no hay productos (corre en el hilo de la base de datos)"""
+        if self.db.get_productos():
+            return False
+        self._insertar_datos_ejemplo()
+        return True
+    
+    def _datos_ejemplo_listos(self, insertados):
+        if insertados and self.root.current == 'panel':
+            self.root.current_screen.actualizar_dashboard()
+    
+    def _escrituras_confirmadas(self, tablas):
+        """Refresca la pantalla actual con lo que acaba de confirmarse"""
+        pantalla = self.root.current_screen
+        if isinstance(pantalla, HistorialPaginado) and pantalla.tabla_historial in tablas:
+            pantalla.reiniciar_historial()
+        if isinstance(pantalla, SeleccionProducto) and 'productos' in tablas:
+            # Stock actualizado del producto elegido
+            pantalla.buscar_producto(pantalla.ids.txt_producto.text)
+    
+    def _catalogo_invalidado(self):
+        """Recarga el catálogo si la pantalla actual elige productos (las otras lo cargan al entrar)"""
+        pantalla = self.root.current_screen if self.root is not None else None
+        if isinstance(pantalla, SeleccionProducto):
+            pantalla.cargar_catalogo()
+    
+    def _escritura_fallida(self, error):
+        pantalla = self.root.current_screen
+        if hasattr(pantalla, 'mostrar_error'):
+            pantalla.mostrar_error(f"No se pudo guardar un registro: {error}")
+    
+    def on_pause(self):
+        """Android puede cerrar la app en pausa: confirmar antes las escrituras pendientes"""
+        if self.db_async is not None:
+            # Por la cola de la base, sin esperar en el hilo de la interfaz:
+            # primero terminan los add_* ya enviados y después se confirma el lote
+            self.db_async.enviar(
+                self.db.sincronizar,
+                al_fallar=lambda e: print(f"[WARNING] No se pudieron confirmar las escrituras al pausar: {e}"),
+            )
+        return True
+    
+    def on_stop(self):
+        """Cancela los reportes, completa las escrituras pendientes y cierra la base de datos"""
+        if self.reportes is not None:
+            self.reportes.cerrar()
+        if self.db_async is not None:
+            self.db_async.cerrar()
+        if self.db is not None:
+            try:
+                self.db.close(timeout=self.ESPERA_CIERRE)
+            except TimeoutError as e:
+                print(f"[ERROR] La base de datos no se cerró: {e}")
+            except EscriturasDescartadas as e:
+                # Cada una ya se mostró con _escritura_fallida; quedan en el registro
+                for error in e.errores:
+                    print(f"[ERROR] Escritura descartada al salir: {error}")
+        if instrumentacion.activa:
+            try:
+                instrumentacion.volcar(os.path.join(self.user_data_dir, 'instrumentacion.json'))
+            except OSError as e:
+                print(f"[WARNING] No se pudieron guardar las mediciones: {e}")
     
     def _insertar_datos_ejemplo(self):
         """Inserta datos de ejemplo para pruebas"""
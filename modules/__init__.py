@@ -2,6 +2,32 @@
 Módulos de la aplicación Gestión Fábrica
 Repositorio: voeseboin-sys/apkgithut
 """
-from .pdf_generator import PDFGenerator, generar_y_compartir_pdf
 
-__all__ = ['PDFGenerator', 'generar_y_compartir_pdf']
+# Nombre exportado -> submódulo que lo define. Nada se importa hasta usarlo:
+# factory.kv importa modules.database al arrancar y eso carga este paquete,
+# que no debe arrastrar el importador, el exportador, los PDF ni las colas.
+_EXPORTACIONES = {
+    'CSVImporter': 'csv_importer',
+    'DatabaseManager': 'database',
+    'format_guaranies': 'database',
+    'DBExecutor': 'db_executor',
+    'DataExporter': 'exporter',
+    'ReportCache': 'report_cache',
+    'ReportJobQueue': 'report_jobs',
+    'ReporteCancelado': 'report_jobs',
+    'EscriturasDescartadas': 'write_batcher',
+    'WriteBatcher': 'write_batcher',
+    # El stack PDF (fpdf, plyer, jnius) solo al generar un reporte
+    'PDFGenerator': 'pdf_generator',
+    'generar_y_compartir_pdf': 'pdf_generator',
+}
+
+__all__ = list(_EXPORTACIONES)
+
+
+def __getattr__(name):
+    modulo = _EXPORTACIONES.get(name)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    return getattr(import_module(f'.{modulo}', __name__), name)
@@ -0,0 +1,245 @@
+"""
+================================================================================
+MÓDULO CATALOG - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Catálogo de productos en memoria para elegir el producto de una venta o una
+producción sin leer la tabla en cada transacción. Se carga una vez y
+DatabaseManager lo mantiene al día en add_producto y en cada cambio de stock.
+
+Búsquedas:
+- Por código exacto (lector de código de barras) o prefijo de código.
+- Por prefijo del nombre o de cualquiera de sus palabras, sin distinguir
+  mayúsculas ni acentos ('cafe' encuentra 'Café Molido').
+- Aproximada por trigramas cuando no hay coincidencia por prefijo ('chocolte').
+================================================================================
+"""
+
+import bisect
+import threading
+import unicodedata
+
+
+class Producto:
+    """Fila de productos en memoria"""
+    
+    __slots__ = ('id', 'nombre', 'codigo', 'stock', 'precio_venta', 'categoria')
+    
+    def __init__(self, id, nombre, codigo, stock, precio_venta, categoria):
+        self.id = id
+        self.nombre = nombre
+        self.codigo = codigo
+        self.stock = stock or 0
+        self.precio_venta = precio_venta or 0
+        self.categoria = categoria
+    
+    def __repr__(self):
+        return f'Producto({self.id}, {self.nombre!r}, {self.codigo!r})'
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos, para comparar lo que escribe el usuario"""
+    texto = unicodedata.normalize('NFKD', (texto or '').strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _trigramas(texto):
+    relleno = f'  {texto} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class ProductCatalog:
+    """Productos indexados por id, código, prefijo de nombre y trigramas"""
+    
+    # Similitud mínima (Dice sobre trigramas) de una coincidencia aproximada
+    SIMILITUD_MINIMA = 0.35
+    
+    # Entradas del índice de palabras revisadas por cada resultado pedido
+    REVISAR_POR_RESULTADO = 20
+    
+    def __init__(self, db):
+        """
+        Args:
+            db: DatabaseManager del que se cargan los productos
+        """
+        self.db = db
+        self._lock = threading.Lock()
+        # Funciones avisadas en cada invalidar() (suscribir)
+        self._suscriptores = []
+        self._vaciar()
+    
+    def _vaciar(self):
+        self.cargado = False
+        self._por_id = {}
+        self._por_codigo = {}
+        # Listas ordenadas para buscar por prefijo con bisect
+        self._codigos = []
+        self._palabras = []     # (palabra o nombre completo normalizado, id)
+        self._nombres = {}      # id -> nombre normalizado
+        self._trigramas = {}    # trigrama -> set de ids
+        self._cant_trigramas = {}
+    
+    # ===== CARGA Y SINCRONIZACIÓN =====
+    def cargar(self, forzar=False):
+        """Lee la tabla productos (una sola vez, salvo forzar o invalidar())"""
+        if self.cargado and not forzar:
+            return
+        filas = self.db.get_connection().execute(
+            'SELECT id, nombre, codigo, stock, precio_venta, categoria FROM productos'
+        ).fetchall()
+        with self._lock:
+            self._vaciar()
+            for fila in filas:
+                self._indexar(Producto(*fila))
+            self._codigos.sort()
+            self._palabras.sort()
+            self.cargado = True
+    
+    def invalidar(self):
+        """Descarta el catálogo y avisa a los suscriptores para que lo vuelvan a cargar"""
+        with self._lock:
+            self._vaciar()
+        for funcion in list(self._suscriptores):
+            funcion()
+    
+    def suscribir(self, funcion):
+        """
+        Registra funcion() para después de cada invalidar().
+        
+        La interfaz recarga desde ahí la pantalla que está eligiendo productos;
+        funcion corre en el hilo que invalidó (normalmente el de la base de datos).
+        """
+        self._suscriptores.append(funcion)
+    
+    def agregar(self, id, nombre, codigo, stock, precio_venta, categoria):
+        """Incorpora un producto recién insertado (sin efecto si aún no se cargó)"""
+        with self._lock:
+            if not self.cargado:
+                return
+            producto = Producto(id, nombre, codigo, stock, precio_venta, categoria)
+            if producto.codigo:
+                bisect.insort(self._codigos, normalizar(producto.codigo))
+            for entrada in self._entradas_nombre(producto):
+                bisect.insort(self._palabras, entrada)
+            self._indexar(producto, ordenadas=False)
+    
+    def ajustar_stock(self, producto_id, delta):
+        """Suma delta al stock en memoria (ventas, producción, ajustes)"""
+        producto = self._por_id.get(producto_id)
+        if producto is not None:
+            with self._lock:
+                producto.stock += delta
+    
+    def _entradas_nombre(self, producto):
+        nombre = self._nombres[producto.id] = normalizar(producto.nombre)
+        entradas = {(nombre, producto.id)}
+        entradas.update((palabra, producto.id) for palabra in nombre.split())
+        return entradas
+    
+    def _indexar(self, producto, ordenadas=True):
+        self._por_id[producto.id] = producto
+        if producto.codigo:
+            self._por_codigo[normalizar(producto.codigo)] = producto.id
+            if ordenadas:
+                self._codigos.append(normalizar(producto.codigo))
+        if ordenadas:
+            self._palabras.extend(self._entradas_nombre(producto))
+        trigramas = _trigramas(self._nombres[producto.id])
+        self._cant_trigramas[producto.id] = len(trigramas)
+        for trigrama in trigramas:
+            self._trigramas.setdefault(trigrama, set()).add(producto.id)
+    
+    # ===== CONSULTAS =====
+    def __len__(self):
+        return len(self._por_id)
+    
+    def obtener(self, producto_id):
+        """Producto por id, o None"""
+        return self._por_id.get(producto_id)
+    
+    def buscar_codigo(self, codigo):
+        """Producto con ese código exacto (lector de código de barras), o None"""
+        producto_id = self._por_codigo.get(normalizar(codigo))
+        return self._por_id.get(producto_id) if producto_id is not None else None
+    
+    def buscar(self, texto, limite=10):
+        """
+        Productos que coinciden con lo escrito, de mejor a peor coincidencia.
+        
+        Orden: código exacto, prefijo de código, prefijo del nombre, prefijo de
+        una palabra del nombre y, si nada de eso coincide, similitud aproximada.
+        
+        Returns:
+            list: Hasta limite objetos Producto
+        """
+        consulta = normalizar(texto)
+        if not consulta:
+            return []
+        
+        ids = []
+        vistos = set()
+        
+        def agregar(producto_id):
+            if producto_id not in vistos:
+                vistos.add(producto_id)
+                ids.append(producto_id)
+        
+        with self._lock:
+            exacto = self._por_codigo.get(consulta)
+            if exacto is not None:
+                agregar(exacto)
+            for codigo in self._prefijos(self._codigos, consulta, limite):
+                agregar(self._por_codigo[codigo])
+            
+            # Primero los nombres que empiezan con la consulta, después las palabras
+            nombres, palabras = [], []
+            for _, producto_id in self._prefijos(self._palabras, (consulta,), limite * self.REVISAR_POR_RESULTADO):
+                (nombres if self._nombres[producto_id].startswith(consulta) else palabras).append(producto_id)
+                if len(nombres) >= limite:
+                    break
+            for producto_id in nombres + palabras:
+                agregar(producto_id)
+            
+            if not ids:
+                for producto_id in self._aproximados(consulta):
+                    agregar(producto_id)
+            return [self._por_id[producto_id] for producto_id in ids[:limite]]
+    
+    @staticmethod
+    def _prefijos(lista, prefijo, limite):
+        """Elementos de una lista ordenada que empiezan con prefijo (str o tupla de un str)"""
+        texto = prefijo[0] if isinstance(prefijo, tuple) else prefijo
+        i = bisect.bisect_left(lista, prefijo)
+        encontrados = 0
+        while i < len(lista):
+            elemento = lista[i]
+            clave = elemento[0] if isinstance(elemento, tuple) else elemento
+            if not clave.startswith(texto):
+                break
+            yield elemento
+            encontrados += 1
+            if limite is not None and encontrados >= limite:
+                break
+            i += 1
+    
+    def _aproximados(self, consulta):
+        """Ids ordenados por similitud de trigramas con la consulta"""
+        trigramas = _trigramas(consulta)
+        comunes = {}
+        # De los trigramas más raros a los más comunes: cuando la lista de un
+        # trigrama supera a los candidatos ya reunidos, solo se suman puntos a
+        # esos candidatos (en un catálogo de 'Producto NNNN' no se recorre todo)
+        for ids in sorted((self._trigramas.get(t, ()) for t in trigramas), key=len):
+            if comunes and len(ids) > len(comunes):
+                for producto_id in comunes:
+                    if producto_id in ids:
+                        comunes[producto_id] += 1
+            else:
+                for producto_id in ids:
+                    comunes[producto_id] = comunes.get(producto_id, 0) + 1
+        similitud = {
+            producto_id: 2 * n / (len(trigramas) + self._cant_trigramas[producto_id])
+            for producto_id, n in comunes.items()
+        }
+        candidatos = [pid for pid, s in similitud.items() if s >= self.SIMILITUD_MINIMA]
+        return sorted(candidatos, key=lambda pid: -similitud[pid])
@@ -0,0 +1,212 @@
+"""
+================================================================================
+MÓDULO CLI - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Línea de comandos sin interfaz gráfica: resúmenes, reportes PDF,
+exportaciones, importaciones y mantenimiento de la base de datos. No importa
+Kivy, así que corre en un servidor o en cron.
+
+USO:
+    python -m modules.cli --db factory.db resumen --mes 5 --anio 2024
+    python -m modules.cli --db factory.db reporte anual --anio 2024 --salida /tmp
+    python -m modules.cli --db factory.db exportar ventas --desde 2024-01-01 --gzip
+    python -m modules.cli --db factory.db importar gastos historico.csv
+    python -m modules.cli --db factory.db mantenimiento verificar-balance
+    python -m modules.cli --db factory.db archivar 2023
+    python -m modules.cli --db factory.db --instrumentar medidas.json reporte detallado
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from .database import DatabaseManager, format_guaranies
+from .instrumentation import instrumentacion
+
+
+# Acciones de mantenimiento: nombre -> (método de DatabaseManager, es verificación)
+MANTENIMIENTO = {
+    'reconstruir-resumen': ('reconstruir_resumen_mensual', False),
+    'verificar-resumen': ('verificar_resumen_mensual', True),
+    'recalcular-balance': ('recalcular_balance', False),
+    'verificar-balance': ('verificar_balance', True),
+    'reconstruir-busqueda': ('reconstruir_busqueda', False),
+}
+
+
+def _progreso(fraccion, etapa=''):
+    """Avance de un reporte en stderr, solo si es una terminal"""
+    if sys.stderr.isatty():
+        sys.stderr.write(f"\r{fraccion:6.1%} {etapa:<50}")
+        if fraccion >= 1:
+            sys.stderr.write('\n')
+        sys.stderr.flush()
+
+
+def cmd_resumen(db, args):
+    resumen = db.get_resumen_mes(args.mes, args.anio)
+    mes = args.mes or datetime.now().month
+    anio = args.anio or datetime.now().year
+    print(f"Resumen {mes:02d}/{anio}")
+    print(f"  Ventas:              {format_guaranies(resumen['ventas'])}")
+    print(f"  Gastos:              {format_guaranies(resumen['gastos'])}")
+    print(f"  Balance:             {format_guaranies(resumen['balance'])}")
+    print(f"  Unidades producidas: {resumen['unidades_producidas']}")
+    print(f"  Costo por unidad:    {format_guaranies(resumen['costo_por_unidad'])}")
+    print(f"  Balance acumulado:   {format_guaranies(db.get_balance_actual())}")
+    return 0
+
+
+def cmd_reporte(db, args):
+    # fpdf y fontTools se importan solo para este comando
+    from .pdf_generator import PDFGenerator
+    from .report_cache import ReportCache
+    
+    generador = PDFGenerator()
+    if args.salida:
+        os.makedirs(args.salida, exist_ok=True)
+        generador.output_dir = args.salida
+        generador.cache = ReportCache(args.salida)
+    opciones = {'procesos': args.procesos} if args.tipo == 'anual' else {}
+    ruta = generador.generar_reporte(db, args.tipo, args.mes, args.anio, progreso=_progreso, **opciones)
+    print(ruta)
+    return 0
+
+
+def cmd_exportar(db, args):
+    from .exporter import DataExporter
+    
+    exportador = DataExporter(db, output_dir=args.salida)
+    if args.salida:
+        os.makedirs(args.salida, exist_ok=True)
+    ruta, filas = exportador.exportar(args.tabla, args.formato, args.desde, args.hasta, comprimir=args.gzip)
+    print(f"{ruta} ({filas} filas)")
+    return 0
+
+
+def cmd_importar(db, args):
+    from .csv_importer import CSVImporter
+    
+    importadas = CSVImporter(db).importar(args.tipo, args.ruta, ajustar_stock=args.ajustar_stock)
+    print(f"{importadas} filas importadas")
+    return 0
+
+
+def cmd_mantenimiento(db, args):
+    metodo, es_verificacion = MANTENIMIENTO[args.accion]
+    resultado = getattr(db, metodo)()
+    if not es_verificacion:
+        print("Listo")
+        return 0
+    if not resultado:
+        print("Sin problemas")
+        return 0
+    for problema in resultado:
+        if isinstance(problema, tuple):
+            # verificar_resumen_mensual: (anio, mes, esperado, almacenado)
+            anio, mes, esperado, almacenado = problema
+            problema = f"Resumen {mes:02d}/{anio}: esperado {esperado}, almacenado {almacenado}"
+        print(problema)
+    return 1
+
+
+def cmd_archivar(db, args):
+    primero = db.get_primer_anio_activo()
+    if primero is None or primero > args.anio:
+        print("Nada para archivar")
+        return 0
+    # Los años se archivan del más antiguo al pedido
+    for anio in range(primero, args.anio + 1):
+        filas = db.archivar_anio(anio)
+        print(f"{anio}: {filas} filas -> {db.ruta_archivo(anio)}")
+    if not args.sin_compactar:
+        db.compactar()
+    return 0
+
+
+def _entero_entre(minimo, maximo, nombre):
+    """Tipo de argparse: entero en [minimo, maximo]; fuera de rango termina con código 2"""
+    def convertir(texto):
+        try:
+            valor = int(texto)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"{nombre} inválido: '{texto}'") from None
+        if not minimo <= valor <= maximo:
+            raise argparse.ArgumentTypeError(f"{nombre} fuera de rango ({minimo}-{maximo}): {valor}")
+        return valor
+    return convertir
+
+
+_mes_valido = _entero_entre(1, 12, 'mes')
+_anio_valido = _entero_entre(1900, 9999, 'año')
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog='python -m modules.cli',
+                                     description='Gestión Fábrica sin interfaz gráfica')
+    parser.add_argument('--db', default='factory.db', help='Base de datos SQLite (default: factory.db)')
+    parser.add_argument('--instrumentar', metavar='ARCHIVO',
+                        help='Mide consultas SQL y etapas del PDF y guarda el resultado en ARCHIVO (JSON)')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    
+    p = comandos.add_parser('resumen', help='Resumen de un mes y balance acumulado')
+    p.add_argument('--mes', type=_mes_valido)
+    p.add_argument('--anio', type=_anio_valido)
+    p.set_defaults(funcion=cmd_resumen)
+    
+    p = comandos.add_parser('reporte', help='Genera un reporte PDF (usa la caché de reportes)')
+    p.add_argument('tipo', choices=('mensual', 'detallado', 'anual'))
+    p.add_argument('--mes', type=_mes_valido)
+    p.add_argument('--anio', type=_anio_valido)
+    p.add_argument('--procesos', type=int, help='Procesos para el reporte anual')
+    p.add_argument('--salida', help='Carpeta de salida (default: FactoryReports)')
+    p.set_defaults(funcion=cmd_reporte)
+    
+    p = comandos.add_parser('exportar', help='Exporta transacciones a CSV o JSON Lines')
+    p.add_argument('tabla', choices=('ventas', 'gastos', 'produccion'))
+    p.add_argument('--formato', choices=('csv', 'jsonl'), default='csv')
+    p.add_argument('--desde', help='Fecha inicial YYYY-MM-DD')
+    p.add_argument('--hasta', help='Fecha final YYYY-MM-DD')
+    p.add_argument('--gzip', action='store_true', help='Comprimir con gzip')
+    p.add_argument('--salida', help='Carpeta de salida (default: FactoryReports)')
+    p.set_defaults(funcion=cmd_exportar)
+    
+    p = comandos.add_parser('importar', help='Importa un histórico CSV')
+    p.add_argument('tipo', choices=('ventas', 'gastos', 'produccion'))
+    p.add_argument('ruta')
+    p.add_argument('--ajustar-stock', action='store_true', help='Ventas y producción modifican el stock')
+    p.set_defaults(funcion=cmd_importar)
+    
+    p = comandos.add_parser('mantenimiento', help='Reconstruye o verifica tablas derivadas')
+    p.add_argument('accion', choices=tuple(MANTENIMIENTO))
+    p.set_defaults(funcion=cmd_mantenimiento)
+    
+    p = comandos.add_parser('archivar', help='Mueve los años cerrados hasta ANIO a un archivo por año')
+    p.add_argument('anio', type=_anio_valido, metavar='ANIO')
+    p.add_argument('--sin-compactar', action='store_true', help='No ejecutar VACUUM al terminar')
+    p.set_defaults(funcion=cmd_archivar)
+    
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    if args.instrumentar:
+        instrumentacion.activar()
+    db = DatabaseManager(args.db)
+    try:
+        return args.funcion(db, args)
+    except (ValueError, OSError, RuntimeError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+        if args.instrumentar:
+            instrumentacion.volcar(args.instrumentar)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+================================================================================
+MÓDULO CSV IMPORTER - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Importación masiva de históricos (ventas, gastos, producción) desde CSV.
+Las filas se leen en streaming y se insertan por lotes con executemany;
+cada lote es una transacción que además guarda el avance, de modo que una
+importación interrumpida se retoma donde quedó. Si las filas llegan con
+fechas anteriores al final del libro de balance, la última transacción lo
+reordena por fecha.
+================================================================================
+"""
+
+import csv
+import hashlib
+import os
+from datetime import datetime
+
+from .database import a_guaranies
+
+
+# Columnas obligatorias de cada tipo de archivo (la primera fila es el encabezado)
+COLUMNAS = {
+    'ventas': ('fecha', 'cantidad', 'precio_unitario'),
+    'gastos': ('fecha', 'concepto', 'monto'),
+    'produccion': ('fecha', 'cantidad'),
+}
+
+
+class CSVImporter:
+    """Importador de históricos CSV hacia la base de datos de la aplicación"""
+    
+    TAM_LOTE = 5000
+    
+    def __init__(self, db, tam_lote=None):
+        """
+        Args:
+            db: Instancia de DatabaseManager
+            tam_lote: Filas por transacción (default: TAM_LOTE)
+        """
+        self.db = db
+        self.tam_lote = tam_lote or self.TAM_LOTE
+        # Alguna fila de la importación en curso quedó fuera del orden del libro
+        self._reordenar_balance = False
+        self._crear_tabla_importaciones()
+    
+    def _crear_tabla_importaciones(self):
+        with self.db.get_connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS importaciones (
+                    archivo_id TEXT PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    ruta TEXT,
+                    filas_importadas INTEGER NOT NULL DEFAULT 0,
+                    completada INTEGER NOT NULL DEFAULT 0,
+                    fecha_inicio TEXT,
+                    fecha_fin TEXT
+                )
+            ''')
+    
+    def importar(self, tipo, ruta, ajustar_stock=False, progreso=None):
+        """
+        Importa un archivo CSV completo.
+        
+        Args:
+            tipo: 'ventas', 'gastos' o 'produccion'
+            ruta: Ruta del archivo CSV (UTF-8, separado por comas)
+            ajustar_stock: Si True, ventas y producción modifican el stock actual
+                como add_venta/add_produccion. Por defecto el histórico no toca
+                el inventario de hoy.
+            progreso: Callback opcional progreso(filas_importadas, bytes_leidos, bytes_totales)
+        
+        Returns:
+            int: Filas importadas en esta ejecución (0 si el archivo ya estaba completo)
+        """
+        if tipo not in COLUMNAS:
+            raise ValueError(f"Tipo de importación desconocido: {tipo}")
+        
+        archivo_id = self._identificar_archivo(ruta)
+        ya_importadas, completada = self._estado_importacion(archivo_id, tipo, ruta)
+        if completada:
+            return 0
+        
+        productos = self._indice_productos() if tipo != 'gastos' else None
+        bytes_totales = os.path.getsize(ruta)
+        importadas = 0
+        # Al retomar no se sabe si los lotes ya confirmados venían en orden
+        self._reordenar_balance = ya_importadas > 0
+        
+        leidos = [0]
+        
+        def lineas(archivo):
+            # tell() no está disponible mientras csv itera el archivo
+            for linea in archivo:
+                leidos[0] += len(linea.encode('utf-8'))
+                yield linea
+        
+        with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+            filas = self._leer_filas(lineas(archivo), tipo, productos)
+            
+            # Retomar: las filas ya confirmadas en una ejecución anterior se saltean
+            for _ in range(ya_importadas):
+                if next(filas, None) is None:
+                    break
+            
+            lote = []
+            for fila in filas:
+                lote.append(fila)
+                if len(lote) >= self.tam_lote:
+                    importadas += self._insertar_lote(tipo, lote, archivo_id, ajustar_stock)
+                    lote = []
+                    if progreso is not None:
+                        progreso(ya_importadas + importadas, leidos[0], bytes_totales)
+            
+            importadas += self._insertar_lote(tipo, lote, archivo_id, ajustar_stock, final=True)
+            if progreso is not None:
+                progreso(ya_importadas + importadas, bytes_totales, bytes_totales)
+        
+        self.db.invalidar_cache()
+        return importadas
+    
+    # ===== LECTURA =====
+    def _identificar_archivo(self, ruta):
+        """Identificador estable del archivo: tamaño + hash del primer MB"""
+        h = hashlib.sha1()
+        h.update(str(os.path.getsize(ruta)).encode())
+        with open(ruta, 'rb') as archivo:
+            h.update(archivo.read(1024 * 1024))
+        return h.hexdigest()
+    
+    def _indice_productos(self):
+        """codigo -> id (y el id como texto), para resolver la columna producto"""
+        indice = {}
+        for prod in self.db.get_productos():
+            indice[str(prod[0])] = prod[0]
+            if prod[2]:
+                indice[prod[2]] = prod[0]
+        return indice
+    
+    def _leer_filas(self, lineas, tipo, productos):
+        """Generador de tuplas listas para insertar; valida cada línea"""
+        lector = csv.DictReader(lineas)
+        faltantes = [c for c in COLUMNAS[tipo] if c not in (lector.fieldnames or ())]
+        if tipo != 'gastos' and not {'codigo', 'producto_id'} & set(lector.fieldnames or ()):
+            faltantes.append('codigo|producto_id')
+        if faltantes:
+            raise ValueError(f"Faltan columnas en el CSV de {tipo}: {', '.join(faltantes)}")
+        archivados = self.db.get_anios_archivados()
+        
+        for fila in lector:
+            linea = lector.line_num
+            try:
+                fecha = self._normalizar_fecha(fila['fecha'])
+                if archivados and int(fecha[:4]) <= archivados[-1]:
+                    # Sus totales ya están cerrados en resumen_mensual y en el
+                    # arrastre del libro, que va antes que todo lo activo
+                    raise ValueError(f"el año {fecha[:4]} está archivado o es anterior a uno archivado")
+                if tipo == 'gastos':
+                    yield (
+                        fila['concepto'].strip(),
+                        a_guaranies(float(fila['monto'])),
+                        (fila.get('categoria') or 'General').strip(),
+                        fecha,
+                        (fila.get('descripcion') or '').strip(),
+                    )
+                    continue
+                
+                clave = (fila.get('codigo') or fila.get('producto_id') or '').strip()
+                if clave not in productos:
+                    raise ValueError(f"producto desconocido '{clave}'")
+                producto_id = productos[clave]
+                cantidad = int(fila['cantidad'])
+                
+                if tipo == 'ventas':
+                    precio = a_guaranies(float(fila['precio_unitario']))
+                    total = a_guaranies(float(fila['total'])) if fila.get('total') else cantidad * precio
+                    cliente = (fila.get('cliente') or 'Cliente General').strip()
+                    yield (producto_id, cantidad, precio, total, fecha, cliente)
+                else:
+                    yield (producto_id, cantidad, fecha, a_guaranies(float(fila.get('costo_total') or 0)))
+            except (KeyError, ValueError, TypeError) as e:
+                raise ValueError(f"Línea {linea} inválida: {e}") from None
+    
+    @staticmethod
+    def _normalizar_fecha(texto):
+        """Acepta 'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM:SS' y devuelve el formato de la base"""
+        texto = (texto or '').strip()
+        try:
+            # fromisoformat es C puro; strptime multiplica el tiempo de importación
+            valor = datetime.fromisoformat(texto)
+        except ValueError:
+            raise ValueError(f"fecha inválida '{texto}'") from None
+        return str(valor.replace(microsecond=0, tzinfo=None))
+    
+    # ===== ESCRITURA =====
+    def _estado_importacion(self, archivo_id, tipo, ruta):
+        conn = self.db.get_connection()
+        fila = conn.execute(
+            'SELECT tipo, filas_importadas, completada FROM importaciones WHERE archivo_id = ?',
+            (archivo_id,)
+        ).fetchone()
+        if fila is None:
+            with conn:
+                conn.execute('''
+                    INSERT INTO importaciones (archivo_id, tipo, ruta, fecha_inicio)
+                    VALUES (?, ?, ?, ?)
+                ''', (archivo_id, tipo, ruta, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            return 0, False
+        if fila[0] != tipo:
+            raise ValueError(f"El archivo ya fue importado como {fila[0]}")
+        return fila[1], bool(fila[2])
+    
+    def _insertar_lote(self, tipo, lote, archivo_id, ajustar_stock, final=False):
+        """Inserta un lote, su libro de balance y el avance en una sola transacción"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            if tipo == 'ventas':
+                cursor.executemany('''
+                    INSERT INTO ventas (producto_id, cantidad, precio_unitario, total, fecha, cliente)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', lote)
+                movimientos = [(f[4], 'INGRESO', f'Venta - {f[5]}', f[3]) for f in lote]
+                stock = [(-f[1], f[0]) for f in lote]
+            elif tipo == 'gastos':
+                cursor.executemany('''
+                    INSERT INTO gastos (concepto, monto, categoria, fecha, descripcion)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', lote)
+                movimientos = [(f[3], 'EGRESO', f[0], f[1]) for f in lote]
+                stock = []
+            else:
+                cursor.executemany('''
+                    INSERT INTO produccion (producto_id, cantidad, fecha, costo_total)
+                    VALUES (?, ?, ?, ?)
+                ''', lote)
+                movimientos = []
+                stock = [(f[1], f[0]) for f in lote]
+            
+            if movimientos and not self._registrar_movimientos(cursor, movimientos):
+                self._reordenar_balance = True
+            if final and self._reordenar_balance:
+                # Saldos y checkpoints en orden (fecha, id), junto con completada
+                self.db._recalcular_balance(cursor)
+            
+            if ajustar_stock and stock:
+                # Un UPDATE por producto en lugar de uno por fila
+                por_producto = {}
+                for delta, producto_id in stock:
+                    por_producto[producto_id] = por_producto.get(producto_id, 0) + delta
+                cursor.executemany(
+                    'UPDATE productos SET stock = stock + ? WHERE id = ?',
+                    [(delta, pid) for pid, delta in por_producto.items()]
+                )
+            
+            cursor.execute('''
+                UPDATE importaciones SET
+                    filas_importadas = filas_importadas + ?,
+                    completada = ?,
+                    fecha_fin = CASE WHEN ? THEN ? ELSE fecha_fin END
+                WHERE archivo_id = ?
+            ''', (len(lote), int(final), int(final),
+                  datetime.now().strftime('%Y-%m-%d %H:%M:%S'), archivo_id))
+        return len(lote)
+    
+    def _registrar_movimientos(self, cursor, movimientos):
+        """
+        Escribe el libro de balance de todo el lote en una pasada.
+        
+        El saldo corrido se calcula en Python partiendo de balance_estado y los
+        ids se asignan en orden, así los checkpoints se generan sin releer filas.
+        
+        Returns:
+            bool: False si alguna fecha es anterior a la que la precede en el
+                libro: los saldos quedan para el recálculo al final de importar
+        """
+        cursor.execute('SELECT saldo FROM balance_estado WHERE id = 1')
+        saldo = cursor.fetchone()[0]
+        cursor.execute('SELECT MAX(fecha) FROM balance')
+        ultima_fecha = cursor.fetchone()[0] or ''
+        en_orden = True
+        cursor.execute("SELECT IFNULL(MAX(id), 0) FROM balance")
+        ultimo_id = cursor.fetchone()[0]
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'balance'")
+        fila_seq = cursor.fetchone()
+        if fila_seq is not None:
+            ultimo_id = max(ultimo_id, fila_seq[0])
+        
+        filas = []
+        checkpoints = []
+        cada = self.db.BALANCE_CHECKPOINT_CADA
+        for fecha, tipo, concepto, monto in movimientos:
+            if fecha < ultima_fecha:
+                en_orden = False
+            ultima_fecha = max(ultima_fecha, fecha)
+            saldo += monto if tipo == 'INGRESO' else -monto
+            ultimo_id += 1
+            filas.append((ultimo_id, fecha, tipo, concepto, monto, saldo))
+            if ultimo_id % cada == 0:
+                checkpoints.append((ultimo_id, fecha, saldo))
+        
+        cursor.executemany('''
+            INSERT INTO balance (id, fecha, tipo, concepto, monto, saldo_acumulado)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', filas)
+        cursor.executemany('''
+            INSERT OR REPLACE INTO balance_checkpoint (balance_id, fecha, saldo) VALUES (?, ?, ?)
+        ''', checkpoints)
+        cursor.execute('UPDATE balance_estado SET saldo = ?, ultimo_id = ? WHERE id = 1',
+                       (saldo, ultimo_id))
+        return en_orden
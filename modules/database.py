@@ -0,0 +1,1583 @@
+"""
+================================================================================
+MÓDULO DATABASE - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Capa de datos de la aplicación (SQLite) y formato de moneda. No depende de
+Kivy: la usan tanto la interfaz (main.py) como los procesos de reportes y la
+línea de comandos (modules/cli.py).
+================================================================================
+"""
+
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
+
+from .catalog import ProductCatalog
+from .instrumentation import ConexionInstrumentada
+from .write_batcher import EscriturasDescartadas, WriteBatcher
+
+
+# ==============================================================================
+# BASE DE DATOS
+# ==============================================================================
+class DatabaseManager:
+    """Gestor de base de datos SQLite para la aplicación"""
+    
+    # Pragmas aplicados a cada conexión persistente
+    PRAGMAS = (
+        ('journal_mode', 'WAL'),        # Escrituras sin bloquear lecturas, un fsync por checkpoint
+        ('synchronous', 'NORMAL'),      # Seguro con WAL, evita fsync en cada commit
+        ('cache_size', -8000),          # ~8 MB de caché de páginas
+        ('mmap_size', 64 * 1024 * 1024),
+        ('temp_store', 'MEMORY'),
+    )
+    
+    # Cada cuántos movimientos del libro de balance se guarda un checkpoint del saldo.
+    # El libro se ordena por (fecha, id): saldo_acumulado y los checkpoints suman
+    # los movimientos en ese orden, aunque un id nuevo tenga una fecha anterior.
+    BALANCE_CHECKPOINT_CADA = 1000
+    
+    # Monto con signo de una fila de balance (ARRASTRE, el saldo de los años
+    # archivados, ya lleva su signo)
+    MONTO_CON_SIGNO = "CASE WHEN tipo = 'EGRESO' THEN -monto ELSE monto END"
+    
+    # Entradas máximas de la caché de consultas (LRU)
+    CACHE_MAX_ENTRADAS = 64
+    
+    # Columnas de resumen_mensual alimentadas por cada tabla: (columna_resumen, columna_origen)
+    RESUMEN_FUENTES = {
+        'ventas': (('ventas', 'total'),),
+        'gastos': (('gastos', 'monto'),),
+        'produccion': (('unidades', 'cantidad'), ('costo_produccion', 'costo_total')),
+    }
+    
+    # Columnas de dinero por tabla: guaraníes enteros (la moneda no tiene fracciones)
+    COLUMNAS_MONTO = {
+        'productos': ('precio_venta', 'costo_unitario'),
+        'produccion': ('costo_total',),
+        'ventas': ('precio_unitario', 'total'),
+        'tickets': ('total',),
+        'gastos': ('monto',),
+        'balance': ('monto', 'saldo_acumulado'),
+        'balance_estado': ('saldo',),
+        'balance_checkpoint': ('saldo',),
+        'resumen_mensual': ('ventas', 'gastos', 'costo_produccion'),
+    }
+    
+    # Migraciones del esquema en orden: (PRAGMA user_version resultante, descripción, método).
+    # Un cambio de esquema se agrega aquí y también en _crear_esquema (bases nuevas).
+    MIGRACIONES = (
+        (1, 'montos en guaraníes como INTEGER', '_migrar_montos_enteros'),
+        (2, 'registro de años archivados', '_migrar_archivos'),
+        (3, 'búsqueda de texto completo (FTS5)', '_migrar_busqueda'),
+    )
+    
+    # Tablas con historia que archivar_anio mueve al archivo de cada año
+    TABLAS_ARCHIVO = ('tickets', 'ventas', 'gastos', 'produccion', 'balance')
+    
+    # Archivos de años adjuntos a la vez por conexión (SQLite admite hasta 10)
+    ARCHIVOS_ADJUNTOS_MAX = 8
+    
+    def __init__(self, db_path='factory.db', solo_lectura=False):
+        """
+        Args:
+            db_path: Ruta del archivo SQLite
+            solo_lectura: Abre las conexiones en modo solo lectura y no crea
+                ni migra tablas (procesos auxiliares de reportes)
+        """
+        self.db_path = db_path
+        self.solo_lectura = solo_lectura
+        self._local = threading.local()
+        self._conexiones = []
+        self._lock = threading.Lock()
+        
+        # Caché de consultas: clave -> (versiones de sus dependencias, valor)
+        self._cache = OrderedDict()
+        self._versiones = {}
+        self._cache_lock = threading.Lock()
+        self.cache_aciertos = 0
+        self.cache_fallos = 0
+        
+        # Productos en memoria para elegir por código o nombre (se carga al usarlo)
+        self.catalogo = ProductCatalog(self)
+        
+        # Escritura agrupada (activar_escritura_agrupada); None = una transacción por escritura
+        self._lote = None
+        
+        if not solo_lectura:
+            self.init_database()
+    
+    def get_connection(self):
+        """
+        Devuelve la conexión persistente del hilo actual.
+        
+        Cada hilo abre una única conexión (WAL + pragmas) que se reutiliza
+        en todas las llamadas; se cierran juntas en close(). Con la
+        instrumentación activa (modules.instrumentation) se mide cada sentencia.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.solo_lectura:
+                uri = f'{Path(self.db_path).absolute().as_uri()}?mode=ro'
+                conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                       factory=ConexionInstrumentada)
+                conn.execute('PRAGMA query_only = 1')
+            else:
+                conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=ConexionInstrumentada)
+            for pragma, valor in self.PRAGMAS:
+                # El modo WAL lo fija la conexión de escritura; una de solo lectura no puede cambiarlo
+                if not (self.solo_lectura and pragma == 'journal_mode'):
+                    conn.execute(f'PRAGMA {pragma} = {valor}')
+            self._local.conn = conn
+            with self._lock:
+                self._conexiones.append(conn)
+        return conn
+    
+    def close(self, timeout=None):
+        """
+        Confirma las escrituras agrupadas y cierra todas las conexiones (llamar al salir de la app).
+        
+        Args:
+            timeout: Espera máxima del lote pendiente en segundos (default: hasta terminar)
+        
+        Raises:
+            TimeoutError: Si el lote sigue confirmando; las conexiones quedan abiertas
+            EscriturasDescartadas: Escrituras del lote que fallaron; las conexiones
+                se cierran igual
+        """
+        descartadas = None
+        try:
+            self.desactivar_escritura_agrupada(timeout)
+        except EscriturasDescartadas as e:
+            # El hilo del lote ya terminó: se cierra y después se avisa
+            descartadas = e
+        with self._lock:
+            conexiones, self._conexiones = self._conexiones, []
+        for conn in conexiones:
+            try:
+                if not self.solo_lectura:
+                    conn.execute('PRAGMA optimize')
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"[WARNING] Error al cerrar la base de datos: {e}")
+        self._local = threading.local()
+        if descartadas is not None:
+            raise descartadas
+    
+    def init_database(self):
+        """
+        Crea o actualiza el esquema según PRAGMA user_version.
+        
+        Una base al día no ejecuta ningún DDL. Una base nueva se crea con el
+        esquema actual; una existente recibe en orden las MIGRACIONES
+        pendientes, cada una en su propia transacción junto con su user_version.
+        """
+        conn = self.get_connection()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        actual = self.MIGRACIONES[-1][0]
+        if version == actual:
+            return
+        if version > actual:
+            raise RuntimeError(f"La base de datos es de una versión más nueva de la aplicación (esquema {version})")
+        
+        if version == 0:
+            nueva = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0] == 0
+            with conn:
+                # BEGIN explícito: sqlite3 no abre transacción para DDL
+                conn.execute('BEGIN')
+                # Bases nuevas y bases anteriores a las migraciones (crea lo que falte)
+                self._crear_esquema(conn.cursor())
+                if nueva:
+                    conn.execute(f'PRAGMA user_version = {actual}')
+            if nueva:
+                return
+        
+        for numero, descripcion, metodo in self.MIGRACIONES:
+            if numero <= version:
+                continue
+            with conn:
+                conn.execute('BEGIN')
+                getattr(self, metodo)(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {numero}')
+            print(f"[INFO] Base de datos migrada al esquema {numero}: {descripcion}")
+        self.invalidar_cache()
+    
+    def _crear_esquema(self, cursor):
+        """Tablas, índices y triggers del esquema actual (CREATE ... IF NOT EXISTS)"""
+        # Tabla de productos/inventario
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS productos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                codigo TEXT UNIQUE,
+                stock INTEGER DEFAULT 0,
+                precio_venta INTEGER DEFAULT 0,
+                costo_unitario INTEGER DEFAULT 0,
+                categoria TEXT,
+                fecha_creacion TEXT
+            )
+        ''')
+        
+        # Tabla de producción
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS produccion (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                producto_id INTEGER,
+                cantidad INTEGER NOT NULL,
+                fecha TEXT,
+                costo_total INTEGER DEFAULT 0,
+                FOREIGN KEY (producto_id) REFERENCES productos(id)
+            )
+        ''')
+        
+        # Tabla de ventas
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ventas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                producto_id INTEGER,
+                cantidad INTEGER NOT NULL,
+                precio_unitario INTEGER,
+                total INTEGER,
+                fecha TEXT,
+                cliente TEXT,
+                ticket_id INTEGER,
+                FOREIGN KEY (producto_id) REFERENCES productos(id),
+                FOREIGN KEY (ticket_id) REFERENCES tickets(id)
+            )
+        ''')
+        
+        # Tickets: cabecera de una venta de varios productos; sus líneas son filas de ventas
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tickets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TEXT,
+                cliente TEXT,
+                lineas INTEGER NOT NULL,
+                total INTEGER
+            )
+        ''')
+        cursor.execute('PRAGMA table_info(ventas)')
+        if 'ticket_id' not in [columna[1] for columna in cursor.fetchall()]:
+            # Bases anteriores a los tickets: las ventas existentes quedan sin ticket
+            cursor.execute('ALTER TABLE ventas ADD COLUMN ticket_id INTEGER REFERENCES tickets(id)')
+        
+        # Tabla de gastos
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS gastos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                concepto TEXT NOT NULL,
+                monto INTEGER NOT NULL,
+                categoria TEXT,
+                fecha TEXT,
+                descripcion TEXT
+            )
+        ''')
+        
+        # Tabla de balance
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS balance (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TEXT,
+                tipo TEXT,
+                concepto TEXT,
+                monto INTEGER,
+                saldo_acumulado INTEGER
+            )
+        ''')
+        
+        self._crear_tabla_archivos(cursor)
+        self._crear_indices(cursor)
+        self._crear_resumen_mensual(cursor)
+        self._crear_estado_balance(cursor)
+        self._crear_busqueda(cursor)
+        self._crear_triggers_busqueda(cursor)
+    
+    def _crear_indices(self, cursor):
+        """Índices secundarios (también se recrean tras migraciones y cargas masivas)"""
+        # Índices por fecha para los agregados mensuales (rangos semiabiertos).
+        # Incluyen la columna sumada para resolver el SUM solo con el índice.
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas (fecha, total)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_gastos_fecha ON gastos (fecha, monto)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_produccion_fecha ON produccion (fecha, cantidad, costo_total)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ventas_producto_fecha ON ventas (producto_id, fecha)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_produccion_producto_fecha ON produccion (producto_id, fecha)')
+        # Parcial: las ventas sueltas (sin ticket) no ocupan lugar en el índice
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ventas_ticket ON ventas (ticket_id) WHERE ticket_id IS NOT NULL')
+        
+        # Índices (fecha, id) para la paginación por cursor del historial
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ventas_historial ON ventas (fecha, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_gastos_historial ON gastos (fecha, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_produccion_historial ON produccion (fecha, id)')
+        
+        # Saldos históricos por fecha (get_balance_en)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_balance_fecha ON balance (fecha)')
+    
+    def recrear_indices_y_triggers(self):
+        """Vuelve a crear índices y triggers de resumen y búsqueda (tras una carga masiva que los quitó)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._crear_indices(cursor)
+            self._crear_triggers_resumen(cursor)
+            self._crear_triggers_busqueda(cursor)
+    
+    def _crear_resumen_mensual(self, cursor):
+        """
+        Crea la tabla acumulada resumen_mensual y los triggers que la mantienen.
+        
+        Cada INSERT/UPDATE/DELETE en ventas, gastos o produccion ajusta la fila
+        (anio, mes) correspondiente dentro de la misma transacción y sube su
+        version, que identifica el estado de los datos del mes.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resumen_mensual'")
+        existia = cursor.fetchone() is not None
+        
+        if existia:
+            cursor.execute('PRAGMA table_info(resumen_mensual)')
+            if 'version' not in [columna[1] for columna in cursor.fetchall()]:
+                # Bases anteriores a la columna version: agregarla y rehacer los triggers
+                cursor.execute('ALTER TABLE resumen_mensual ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+                for tabla in self.RESUMEN_FUENTES:
+                    for sufijo in ('ins', 'del', 'upd'):
+                        cursor.execute(f'DROP TRIGGER IF EXISTS trg_{tabla}_resumen_{sufijo}')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS resumen_mensual (
+                anio INTEGER NOT NULL,
+                mes INTEGER NOT NULL,
+                ventas INTEGER NOT NULL DEFAULT 0,
+                gastos INTEGER NOT NULL DEFAULT 0,
+                unidades INTEGER NOT NULL DEFAULT 0,
+                costo_produccion INTEGER NOT NULL DEFAULT 0,
+                version INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (anio, mes)
+            ) WITHOUT ROWID
+        ''')
+        
+        self._crear_triggers_resumen(cursor)
+        
+        # Bases existentes: poblar la tabla acumulada la primera vez
+        if not existia:
+            self._poblar_resumen_mensual(cursor)
+    
+    def _crear_triggers_resumen(self, cursor):
+        """Triggers que mantienen resumen_mensual al escribir ventas, gastos y produccion"""
+        for tabla, columnas in self.RESUMEN_FUENTES.items():
+            destinos = ', '.join(destino for destino, _ in columnas)
+            asignaciones = ', '.join(f'{destino} = {destino} + excluded.{destino}' for destino, _ in columnas)
+            
+            def acumular(fila, signo):
+                """Sentencia que suma (o resta) la fila NEW/OLD a su mes"""
+                valores = ', '.join(f'{signo}IFNULL({fila}.{origen}, 0)' for _, origen in columnas)
+                return f'''
+                    INSERT INTO resumen_mensual (anio, mes, {destinos}, version)
+                    SELECT CAST(substr({fila}.fecha, 1, 4) AS INTEGER),
+                           CAST(substr({fila}.fecha, 6, 2) AS INTEGER), {valores}, 1
+                    WHERE {fila}.fecha IS NOT NULL
+                    ON CONFLICT (anio, mes) DO UPDATE SET {asignaciones}, version = version + 1;
+                '''
+            
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{tabla}_resumen_ins AFTER INSERT ON {tabla}
+                BEGIN {acumular('NEW', '')} END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{tabla}_resumen_del AFTER DELETE ON {tabla}
+                BEGIN {acumular('OLD', '-')} END
+            ''')
+            # Cualquier UPDATE (también de cliente, concepto...) cambia la version del mes
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{tabla}_resumen_upd AFTER UPDATE ON {tabla}
+                BEGIN {acumular('OLD', '-')} {acumular('NEW', '')} END
+            ''')
+    
+    # ===== MIGRACIONES =====
+    def _migrar_montos_enteros(self, cursor):
+        """
+        Migración 1: montos en INTEGER, para sumas exactas y más rápidas.
+        
+        SQLite no cambia el tipo de una columna: cada tabla con montos REAL se
+        recrea con la misma definición y sus montos redondeados. Después se
+        recalculan resumen_mensual y el libro de balance desde los montos
+        redondeados para que los totales cierren exactos.
+        """
+        # Los triggers apuntan a tablas que se recrean: se quitan todos y se rehacen al final
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        for (nombre,) in cursor.fetchall():
+            cursor.execute(f'DROP TRIGGER {nombre}')
+        for tabla, columnas in self.COLUMNAS_MONTO.items():
+            self._convertir_a_enteros(cursor, tabla, columnas)
+        self._crear_indices(cursor)
+        self._crear_triggers_resumen(cursor)
+        self._crear_triggers_busqueda(cursor)
+        self._poblar_resumen_mensual(cursor)
+        self._recalcular_balance(cursor)
+    
+    def _migrar_archivos(self, cursor):
+        """Migración 2: tabla archivos para archivar_anio"""
+        self._crear_tabla_archivos(cursor)
+    
+    def _migrar_busqueda(self, cursor):
+        """Migración 3: índices FTS5 de buscar(), poblados desde las tablas existentes"""
+        self._crear_busqueda(cursor)
+        self._crear_triggers_busqueda(cursor)
+    
+    @staticmethod
+    def _convertir_a_enteros(cursor, tabla, columnas):
+        """Recrea una tabla con columnas declaradas INTEGER y sus valores redondeados con a_guaranies"""
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,))
+        fila = cursor.fetchone()
+        patron = re.compile(rf'\b({"|".join(columnas)})\s+REAL\b', re.IGNORECASE)
+        if fila is None or not patron.search(fila[0]):
+            return
+        definicion = re.sub(rf'^CREATE TABLE\s+"?{tabla}"?', f'CREATE TABLE {tabla}_migracion',
+                            patron.sub(r'\1 INTEGER', fila[0]), flags=re.IGNORECASE)
+        cursor.execute(f'PRAGMA table_info({tabla})')
+        nombres = [columna[1] for columna in cursor.fetchall()]
+        # Exactamente el redondeo de las escrituras de la app, no el ROUND de SQLite
+        cursor.connection.create_function(
+            'a_guaranies', 1, lambda valor: None if valor is None else a_guaranies(valor), deterministic=True
+        )
+        valores = ', '.join(f'a_guaranies({c})' if c in columnas else c for c in nombres)
+        cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (tabla,))
+        secuencia = cursor.fetchone()
+        
+        cursor.execute(definicion)
+        cursor.execute(f'INSERT INTO {tabla}_migracion ({", ".join(nombres)}) SELECT {valores} FROM {tabla}')
+        cursor.execute(f'DROP TABLE {tabla}')
+        cursor.execute(f'ALTER TABLE {tabla}_migracion RENAME TO {tabla}')
+        
+        # AUTOINCREMENT no debe reutilizar ids de filas borradas antes de la migración
+        if secuencia is not None:
+            cursor.execute('DELETE FROM sqlite_sequence WHERE name = ?', (tabla,))
+            cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (tabla, secuencia[0]))
+    
+    @staticmethod
+    def _rango_mes(mes, anio):
+        """Rango semiabierto [inicio, fin) de un mes, comparable con la columna fecha"""
+        inicio = f'{anio:04d}-{mes:02d}-01'
+        if mes == 12:
+            fin = f'{anio + 1:04d}-01-01'
+        else:
+            fin = f'{anio:04d}-{mes + 1:02d}-01'
+        return inicio, fin
+    
+    # ===== CACHÉ DE CONSULTAS =====
+    @staticmethod
+    def _periodo(fecha):
+        """(anio, mes) de una fecha 'YYYY-MM-DD...'"""
+        return int(fecha[:4]), int(fecha[5:7])
+    
+    def _cacheado(self, clave, dependencias, calcular):
+        """
+        Devuelve el valor cacheado de una consulta o lo calcula.
+        
+        dependencias son claves (tabla, periodo) o (tabla, None); una entrada
+        sigue vigente mientras ninguna de ellas haya sido escrita.
+        """
+        with self._cache_lock:
+            version = tuple(self._versiones.get(d, 0) for d in (('*', None), *dependencias))
+            entrada = self._cache.get(clave)
+            if entrada is not None and entrada[0] == version:
+                self._cache.move_to_end(clave)
+                self.cache_aciertos += 1
+                return entrada[1]
+            self.cache_fallos += 1
+        
+        # La versión se tomó antes de consultar: si otra escritura llega en
+        # el medio, la entrada queda vencida y se recalcula en la próxima lectura
+        valor = calcular()
+        with self._cache_lock:
+            self._cache[clave] = (version, valor)
+            self._cache.move_to_end(clave)
+            while len(self._cache) > self.CACHE_MAX_ENTRADAS:
+                self._cache.popitem(last=False)
+        return valor
+    
+    def _marcar_escritura(self, *dependencias):
+        """Invalida las entradas que dependen de las tablas/periodos escritos"""
+        with self._cache_lock:
+            for tabla, periodo in dependencias:
+                for clave in {(tabla, None), (tabla, periodo)}:
+                    self._versiones[clave] = self._versiones.get(clave, 0) + 1
+    
+    def invalidar_cache(self):
+        """Vacía la caché (tras escrituras hechas por fuera de los métodos add_*)"""
+        with self._cache_lock:
+            self._cache.clear()
+            self._versiones[('*', None)] = self._versiones.get(('*', None), 0) + 1
+        self.catalogo.invalidar()
+    
+    def get_estadisticas_cache(self):
+        """Aciertos, fallos y tamaño de la caché de consultas"""
+        with self._cache_lock:
+            total = self.cache_aciertos + self.cache_fallos
+            return {
+                'aciertos': self.cache_aciertos,
+                'fallos': self.cache_fallos,
+                'entradas': len(self._cache),
+                'tasa_aciertos': self.cache_aciertos / total if total else 0,
+            }
+    
+    # ===== ESCRITURA AGRUPADA =====
+    def activar_escritura_agrupada(self, max_ms=250, max_registros=100, al_confirmar=None,
+                                   al_fallar=None, despachar=None):
+        """
+        Ventas, gastos y producción se encolan y se confirman por lotes.
+        
+        add_venta/add_gasto/add_produccion vuelven apenas encolan; lo escrito
+        es visible y durable recién cuando se confirma su lote. Ver
+        modules/write_batcher.py para los argumentos y la durabilidad.
+        """
+        if self._lote is None:
+            self._lote = WriteBatcher(self, max_ms, max_registros, al_confirmar, al_fallar, despachar)
+    
+    def desactivar_escritura_agrupada(self, timeout=None):
+        """
+        Confirma lo pendiente y vuelve a una transacción por escritura.
+        
+        Levanta TimeoutError o EscriturasDescartadas como WriteBatcher.cerrar().
+        """
+        lote = self._lote
+        if lote is None:
+            return
+        try:
+            lote.cerrar(timeout)
+        finally:
+            # Con el plazo vencido el hilo sigue confirmando: el lote se conserva
+            # (ya no acepta escrituras, que van directo) hasta que termine
+            if lote.detenido:
+                self._lote = None
+    
+    def sincronizar(self, timeout=None):
+        """
+        Bloquea hasta que las escrituras agrupadas pendientes están confirmadas.
+        
+        Sin efecto si el modo agrupado no está activo. Levanta
+        EscriturasDescartadas si alguna escritura del lote falló.
+        """
+        lote = self._lote
+        if lote is not None:
+            lote.sincronizar(timeout)
+    
+    def get_escrituras_pendientes(self):
+        """Escrituras encoladas todavía sin confirmar"""
+        lote = self._lote
+        return lote.pendientes if lote is not None else 0
+    
+    def _escribir(self, aplicar, dependencias, despues=None):
+        """Ejecuta aplicar(conn) en su propia transacción o lo encola en el lote"""
+        lote = self._lote
+        if lote is not None and lote.encolar(aplicar, dependencias, despues):
+            return
+        with self.get_connection() as conn:
+            aplicar(conn)
+        self._escritura_confirmada(dependencias, despues)
+    
+    def _escritura_confirmada(self, dependencias, despues):
+        self._marcar_escritura(*dependencias)
+        if despues is not None:
+            despues()
+    
+    # ===== PRODUCTOS =====
+    def add_producto(self, nombre, codigo, stock, precio_venta, categoria):
+        precio_venta = a_guaranies(precio_venta)
+        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self.get_connection() as conn:
+            cursor = conn.execute('''
+                INSERT INTO productos (nombre, codigo, stock, precio_venta, categoria, fecha_creacion)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (nombre, codigo, stock, precio_venta, categoria, fecha))
+        self._marcar_escritura(('productos', None))
+        self.catalogo.agregar(cursor.lastrowid, nombre, codigo, stock, precio_venta, categoria)
+    
+    def get_productos(self):
+        def calcular():
+            cursor = self.get_connection().execute('SELECT * FROM productos ORDER BY nombre')
+            return cursor.fetchall()
+        return self._cacheado(('productos',), [('productos', None)], calcular)
+    
+    def update_producto_stock(self, producto_id, cantidad):
+        with self.get_connection() as conn:
+            conn.execute('UPDATE productos SET stock = stock + ? WHERE id = ?', (cantidad, producto_id))
+        self._marcar_escritura(('productos', None))
+        self.catalogo.ajustar_stock(producto_id, cantidad)
+    
+    # ===== PRODUCCIÓN =====
+    def add_produccion(self, producto_id, cantidad, costo_total):
+        costo_total = a_guaranies(costo_total)
+        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        def aplicar(conn):
+            conn.execute('''
+                INSERT INTO produccion (producto_id, cantidad, fecha, costo_total)
+                VALUES (?, ?, ?, ?)
+            ''', (producto_id, cantidad, fecha, costo_total))
+            conn.execute('UPDATE productos SET stock = stock + ? WHERE id = ?', (cantidad, producto_id))
+        self._escribir(aplicar, (('produccion', self._periodo(fecha)), ('productos', None)),
+                       lambda: self.catalogo.ajustar_stock(producto_id, cantidad))
+    
+    def get_produccion_mes(self, mes=None, anio=None):
+        if mes is None:
+            mes = datetime.now().month
+        if anio is None:
+            anio = datetime.now().year
+        fila = self._get_fila_resumen(mes, anio)
+        return (fila[2], fila[3]) if fila[2] else (0, 0)
+    
+    # ===== VENTAS =====
+    def add_venta(self, producto_id, cantidad, precio_unitario, cliente):
+        precio_unitario = a_guaranies(precio_unitario)
+        total = cantidad * precio_unitario
+        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        def aplicar(conn):
+            conn.execute('''
+                INSERT INTO ventas (producto_id, cantidad, precio_unitario, total, fecha, cliente)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (producto_id, cantidad, precio_unitario, total, fecha, cliente))
+            conn.execute('UPDATE productos SET stock = stock - ? WHERE id = ?', (cantidad, producto_id))
+            self._registrar_balance(conn, 'INGRESO', f'Venta - {cliente}', total, fecha)
+        self._escribir(aplicar, (('ventas', self._periodo(fecha)), ('productos', None), ('balance', None)),
+                       lambda: self.catalogo.ajustar_stock(producto_id, -cantidad))
+    
+    def add_venta_ticket(self, lineas, cliente):
+        """
+        Registra una venta de varios productos (ticket) en una sola transacción.
+        
+        Inserta la cabecera en tickets y las líneas en ventas con executemany,
+        descuenta el stock de todos los productos con un único UPDATE y escribe
+        un único movimiento en el libro de balance por el total del ticket.
+        
+        Args:
+            lineas: Lista de (producto_id, cantidad, precio_unitario)
+            cliente: Nombre del cliente
+        
+        Returns:
+            int: Total del ticket
+        """
+        lineas = [(producto_id, cantidad, a_guaranies(precio), cantidad * a_guaranies(precio))
+                  for producto_id, cantidad, precio in lineas]
+        if not lineas:
+            raise ValueError("El ticket no tiene líneas")
+        total = sum(linea[3] for linea in lineas)
+        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        vendidas = {}
+        for producto_id, cantidad, _, _ in lineas:
+            vendidas[producto_id] = vendidas.get(producto_id, 0) + cantidad
+        
+        def aplicar(conn):
+            cursor = conn.execute('''
+                INSERT INTO tickets (fecha, cliente, lineas, total) VALUES (?, ?, ?, ?)
+            ''', (fecha, cliente, len(lineas), total))
+            ticket_id = cursor.lastrowid
+            conn.executemany('''
+                INSERT INTO ventas (producto_id, cantidad, precio_unitario, total, fecha, cliente, ticket_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(*linea, fecha, cliente, ticket_id) for linea in lineas])
+            conn.execute('''
+                UPDATE productos SET stock = stock - (
+                    SELECT SUM(cantidad) FROM ventas WHERE ticket_id = ? AND producto_id = productos.id
+                )
+                WHERE id IN (SELECT producto_id FROM ventas WHERE ticket_id = ?)
+            ''', (ticket_id, ticket_id))
+            self._registrar_balance(conn, 'INGRESO', f'Venta - {cliente} (ticket {ticket_id})', total, fecha)
+        
+        def despues():
+            for producto_id, cantidad in vendidas.items():
+                self.catalogo.ajustar_stock(producto_id, -cantidad)
+        
+        self._escribir(aplicar, (('ventas', self._periodo(fecha)), ('productos', None), ('balance', None)),
+                       despues)
+        return total
+    
+    def get_ticket(self, ticket_id):
+        """
+        Cabecera y líneas de un ticket.
+        
+        Returns:
+            tuple: ((id, fecha, cliente, lineas, total), [(producto, cantidad,
+                precio_unitario, total), ...]) o None si no existe
+        """
+        conn = self.get_connection()
+        cabecera = conn.execute(
+            'SELECT id, fecha, cliente, lineas, total FROM tickets WHERE id = ?', (ticket_id,)
+        ).fetchone()
+        if cabecera is None:
+            return None
+        lineas = conn.execute('''
+            SELECT p.nombre, v.cantidad, v.precio_unitario, v.total
+            FROM ventas v LEFT JOIN productos p ON p.id = v.producto_id
+            WHERE v.ticket_id = ? ORDER BY v.id
+        ''', (ticket_id,)).fetchall()
+        return cabecera, lineas
+    
+    def get_ventas(self, limit=50):
+        return self.get_ventas_page(size=limit)[0]
+    
+    def get_ventas_page(self, after=None, size=50):
+        """
+        Página del historial de ventas, de la más reciente a la más antigua.
+        
+        Paginación por cursor sobre (fecha, id): cada página cuesta lo mismo
+        sin importar su profundidad.
+        
+        Args:
+            after: Cursor devuelto por la página anterior (None para la primera)
+            size: Cantidad de filas por página
+        
+        Returns:
+            tuple: (filas, cursor_siguiente); cursor_siguiente es None en la última página
+        """
+        return self._pagina_historial('''
+            SELECT v.id, p.nombre, v.cantidad, v.total, v.fecha, v.cliente 
+            FROM {esquema}.ventas v JOIN main.productos p ON v.producto_id = p.id
+            WHERE (v.fecha, v.id) < (?, ?)
+            ORDER BY v.fecha DESC, v.id DESC LIMIT ?
+        ''', after, size)
+    
+    def _pagina_historial(self, consulta, after, size):
+        """
+        Ejecuta la consulta de una página del historial (fecha en la columna 4).
+        
+        Si la base activa no completa la página, sigue por los años archivados
+        del más nuevo al más antiguo: el archivo se adjunta recién cuando el
+        historial llega a su año.
+        """
+        if after is None:
+            after = ('\uffff', 0)
+        conn = self.get_connection()
+        filas = conn.execute(consulta.format(esquema='main'), (after[0], after[1], size)).fetchall()
+        for anio in reversed(self.get_anios_archivados()):
+            if len(filas) >= size:
+                break
+            if f'{anio:04d}-01-01' > after[0]:
+                continue
+            esquema = self._adjuntar_archivo(anio)
+            filas += conn.execute(consulta.format(esquema=esquema),
+                                  (after[0], after[1], size - len(filas))).fetchall()
+        siguiente = (filas[-1][4], filas[-1][0]) if len(filas) == size else None
+        return filas, siguiente
+    
+    # ===== GASTOS =====
+    def add_gasto(self, concepto, monto, categoria, descripcion):
+        monto = a_guaranies(monto)
+        fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        def aplicar(conn):
+            conn.execute('''
+                INSERT INTO gastos (concepto, monto, categoria, fecha, descripcion)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (concepto, monto, categoria, fecha, descripcion))
+            self._registrar_balance(conn, 'EGRESO', concepto, monto, fecha)
+        self._escribir(aplicar, (('gastos', self._periodo(fecha)), ('balance', None)))
+    
+    def get_gastos_mes(self, mes=None, anio=None):
+        if mes is None:
+            mes = datetime.now().month
+        if anio is None:
+            anio = datetime.now().year
+        return self._get_fila_resumen(mes, anio)[1] or 0
+    
+    def get_gastos(self, limit=50):
+        return self.get_gastos_page(size=limit)[0]
+    
+    def get_gastos_page(self, after=None, size=50):
+        """Página del historial de gastos por cursor (fecha, id); ver get_ventas_page"""
+        return self._pagina_historial('''
+            SELECT * FROM {esquema}.gastos
+            WHERE (fecha, id) < (?, ?)
+            ORDER BY fecha DESC, id DESC LIMIT ?
+        ''', after, size)
+    
+    # ===== BALANCE =====
+    def _crear_estado_balance(self, cursor):
+        """
+        Crea el saldo actual (balance_estado, una sola fila) y los checkpoints.
+        
+        balance_checkpoint guarda el saldo acumulado de uno de cada
+        BALANCE_CHECKPOINT_CADA movimientos, para reconstruir saldos históricos
+        sin recorrer todo el libro.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'balance_estado'")
+        existia = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS balance_estado (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                saldo INTEGER NOT NULL DEFAULT 0,
+                ultimo_id INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS balance_checkpoint (
+                balance_id INTEGER PRIMARY KEY,
+                fecha TEXT,
+                saldo INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO balance_estado (id, saldo, ultimo_id) VALUES (1, 0, 0)')
+        
+        # Bases existentes: calcular saldo y checkpoints desde el libro
+        if not existia:
+            self._recalcular_balance(cursor)
+    
+    def _registrar_balance(self, conn, tipo, concepto, monto, fecha):
+        """
+        Agrega un movimiento al libro manteniendo el orden (fecha, id).
+        
+        Lo habitual es una fecha igual o posterior a la última del libro. Con
+        una fecha anterior, el movimiento toma el saldo del que lo precede y
+        corre los saldos acumulados y checkpoints de los posteriores.
+        """
+        cursor = conn.cursor()
+        delta = monto if tipo == 'INGRESO' else -monto
+        
+        # El UPDATE toma el bloqueo de escritura: leer después es consistente
+        cursor.execute('UPDATE balance_estado SET saldo = saldo + ? WHERE id = 1', (delta,))
+        cursor.execute('SELECT saldo FROM balance_estado WHERE id = 1')
+        nuevo_saldo = cursor.fetchone()[0]
+        
+        cursor.execute('SELECT MAX(fecha) FROM balance')
+        ultima_fecha = cursor.fetchone()[0]
+        if ultima_fecha is not None and fecha < ultima_fecha:
+            cursor.execute('''
+                SELECT saldo_acumulado FROM balance WHERE fecha <= ? ORDER BY fecha DESC, id DESC LIMIT 1
+            ''', (fecha,))
+            anterior = cursor.fetchone()
+            nuevo_saldo = (anterior[0] if anterior else 0) + delta
+            # El id nuevo es el mayor: lo siguen solo las fechas posteriores
+            cursor.execute('UPDATE balance SET saldo_acumulado = saldo_acumulado + ? WHERE fecha > ?',
+                           (delta, fecha))
+            cursor.execute('UPDATE balance_checkpoint SET saldo = saldo + ? WHERE fecha > ?', (delta, fecha))
+        
+        cursor.execute('''
+            INSERT INTO balance (fecha, tipo, concepto, monto, saldo_acumulado)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (fecha, tipo, concepto, monto, nuevo_saldo))
+        balance_id = cursor.lastrowid
+        cursor.execute('UPDATE balance_estado SET ultimo_id = ? WHERE id = 1', (balance_id,))
+        
+        if balance_id % self.BALANCE_CHECKPOINT_CADA == 0:
+            cursor.execute('''
+                INSERT OR REPLACE INTO balance_checkpoint (balance_id, fecha, saldo) VALUES (?, ?, ?)
+            ''', (balance_id, fecha, nuevo_saldo))
+    
+    def get_balance_actual(self):
+        def calcular():
+            cursor = self.get_connection().execute('SELECT saldo FROM balance_estado WHERE id = 1')
+            result = cursor.fetchone()
+            return result[0] if result else 0
+        return self._cacheado(('balance_actual',), [('balance', None)], calcular)
+    
+    def get_balance_en(self, fecha):
+        """
+        Saldo acumulado al final de una fecha ('YYYY-MM-DD' o 'YYYY-MM-DD HH:MM:SS').
+        
+        Parte del checkpoint más cercano en orden (fecha, id) y suma solo los
+        movimientos posteriores hasta esa fecha.
+        """
+        if len(fecha) == 10:
+            fecha = f'{fecha} 23:59:59'
+        cursor = self.get_connection().cursor()
+        cursor.execute('''
+            SELECT fecha, id FROM balance WHERE fecha <= ? ORDER BY fecha DESC, id DESC LIMIT 1
+        ''', (fecha,))
+        hasta = cursor.fetchone()
+        if hasta is None:
+            return self._get_balance_archivado_en(fecha)
+        
+        cursor.execute('''
+            SELECT fecha, balance_id, saldo FROM balance_checkpoint
+            WHERE (fecha, balance_id) <= (?, ?) ORDER BY fecha DESC, balance_id DESC LIMIT 1
+        ''', hasta)
+        checkpoint_fecha, checkpoint_id, saldo = cursor.fetchone() or ('', -1, 0)
+        
+        cursor.execute(f'''
+            SELECT SUM({self.MONTO_CON_SIGNO}) FROM balance
+            WHERE (fecha, id) > (?, ?) AND (fecha, id) <= (?, ?)
+        ''', (checkpoint_fecha, checkpoint_id) + tuple(hasta))
+        return saldo + (cursor.fetchone()[0] or 0)
+    
+    def _recalcular_balance(self, cursor):
+        """Reescribe saldo_acumulado, checkpoints y saldo actual con una suma de ventana en orden (fecha, id)"""
+        cursor.execute(f'''
+            WITH corrido AS (
+                SELECT id, SUM({self.MONTO_CON_SIGNO}) OVER (ORDER BY fecha, id) AS saldo FROM balance
+            )
+            UPDATE balance SET saldo_acumulado = (SELECT saldo FROM corrido WHERE corrido.id = balance.id)
+        ''')
+        cursor.execute('DELETE FROM balance_checkpoint')
+        cursor.execute('''
+            INSERT INTO balance_checkpoint (balance_id, fecha, saldo)
+            SELECT id, fecha, saldo_acumulado FROM balance WHERE id % ? = 0
+        ''', (self.BALANCE_CHECKPOINT_CADA,))
+        cursor.execute('''
+            UPDATE balance_estado SET
+                saldo = IFNULL((SELECT saldo_acumulado FROM balance ORDER BY fecha DESC, id DESC LIMIT 1), 0),
+                ultimo_id = IFNULL((SELECT MAX(id) FROM balance), 0)
+            WHERE id = 1
+        ''')
+    
+    def recalcular_balance(self):
+        """Recalcula el libro de balance completo (saldos, checkpoints y saldo actual)"""
+        with self.get_connection() as conn:
+            self._recalcular_balance(conn.cursor())
+        self.invalidar_cache()
+    
+    def verificar_balance(self, tolerancia=0.005):
+        """
+        Verifica la integridad del libro de balance.
+        
+        Compara los ingresos/egresos del libro con ventas y gastos, los saldos
+        acumulados fila a fila en orden (fecha, id), los checkpoints y el saldo actual.
+        
+        Returns:
+            list: Descripción de cada problema encontrado; vacía si está íntegro
+        """
+        cursor = self.get_connection().cursor()
+        problemas = []
+        
+        cursor.execute('''
+            SELECT
+                (SELECT IFNULL(SUM(monto), 0) FROM balance WHERE tipo = 'INGRESO'),
+                (SELECT IFNULL(SUM(total), 0) FROM ventas),
+                (SELECT IFNULL(SUM(monto), 0) FROM balance WHERE tipo = 'EGRESO'),
+                (SELECT IFNULL(SUM(monto), 0) FROM gastos)
+        ''')
+        ingresos, ventas, egresos, gastos = cursor.fetchone()
+        if abs(ingresos - ventas) > tolerancia:
+            problemas.append(f'Ingresos del libro ({ingresos}) distintos del total de ventas ({ventas})')
+        if abs(egresos - gastos) > tolerancia:
+            problemas.append(f'Egresos del libro ({egresos}) distintos del total de gastos ({gastos})')
+        
+        cursor.execute(f'''
+            SELECT COUNT(*), MIN(id) FROM (
+                SELECT id, saldo_acumulado,
+                       SUM({self.MONTO_CON_SIGNO}) OVER (ORDER BY fecha, id) AS esperado
+                FROM balance
+            ) WHERE ABS(IFNULL(saldo_acumulado, 0) - esperado) > ?
+        ''', (tolerancia,))
+        erroneos, primer_id = cursor.fetchone()
+        if erroneos:
+            problemas.append(f'{erroneos} saldos acumulados incorrectos (primero en id {primer_id})')
+        
+        cursor.execute('''
+            SELECT COUNT(*) FROM balance_checkpoint c LEFT JOIN balance b ON b.id = c.balance_id
+            WHERE b.id IS NULL OR ABS(c.saldo - b.saldo_acumulado) > ?
+        ''', (tolerancia,))
+        checkpoints_erroneos = cursor.fetchone()[0]
+        if checkpoints_erroneos:
+            problemas.append(f'{checkpoints_erroneos} checkpoints no coinciden con el libro')
+        
+        cursor.execute(f'''
+            SELECT e.saldo, e.ultimo_id,
+                   (SELECT IFNULL(SUM({self.MONTO_CON_SIGNO}), 0) FROM balance),
+                   (SELECT IFNULL(MAX(id), 0) FROM balance)
+            FROM balance_estado e WHERE e.id = 1
+        ''')
+        saldo, ultimo_id, saldo_libro, max_id = cursor.fetchone()
+        if abs(saldo - saldo_libro) > tolerancia or ultimo_id != max_id:
+            problemas.append(f'Saldo actual ({saldo}) no coincide con el libro ({saldo_libro})')
+        
+        return problemas
+    
+    def get_resumen_mes(self, mes=None, anio=None):
+        if mes is None:
+            mes = datetime.now().month
+        if anio is None:
+            anio = datetime.now().year
+        
+        ventas_mes, gastos_mes, unidades_producidas, _ = self._get_fila_resumen(mes, anio)
+        
+        costo_por_unidad = gastos_mes / unidades_producidas if unidades_producidas > 0 else 0
+        
+        return {
+            'ventas': ventas_mes,
+            'gastos': gastos_mes,
+            'balance': ventas_mes - gastos_mes,
+            'unidades_producidas': unidades_producidas,
+            'costo_por_unidad': costo_por_unidad
+        }
+    
+    def get_version_datos(self, anio, mes=12):
+        """
+        Versión de los datos hasta el fin de un período (mes, o año con mes=12).
+        
+        Suma las versiones de resumen_mensual de todos los meses hasta (anio, mes),
+        que solo crecen: cambia con cualquier escritura en ese período o en uno
+        anterior (que mueve el saldo acumulado), y no con escrituras posteriores.
+        """
+        cursor = self.get_connection().execute(
+            'SELECT IFNULL(SUM(version), 0) FROM resumen_mensual WHERE (anio, mes) <= (?, ?)',
+            (anio, mes)
+        )
+        return cursor.fetchone()[0]
+    
+    # ===== DETALLE DE TRANSACCIONES =====
+    # Columnas y consulta por tabla; ventas y producción llevan el nombre del producto.
+    # {esquema} es main o el archivo adjunto de un año archivado.
+    DETALLE_COLUMNAS = {
+        'ventas': ('id', 'fecha', 'producto_id', 'producto', 'cantidad', 'precio_unitario', 'total', 'cliente',
+                   'ticket_id'),
+        'gastos': ('id', 'fecha', 'concepto', 'monto', 'categoria', 'descripcion'),
+        'produccion': ('id', 'fecha', 'producto_id', 'producto', 'cantidad', 'costo_total'),
+    }
+    DETALLE_CONSULTAS = {
+        'ventas': '''
+            SELECT v.id, v.fecha, v.producto_id, p.nombre, v.cantidad, v.precio_unitario, v.total, v.cliente,
+                   v.ticket_id
+            FROM {esquema}.ventas v LEFT JOIN main.productos p ON p.id = v.producto_id
+            WHERE v.fecha >= ? AND v.fecha < ?
+            ORDER BY v.fecha, v.id
+        ''',
+        'gastos': '''
+            SELECT id, fecha, concepto, monto, categoria, descripcion
+            FROM {esquema}.gastos
+            WHERE fecha >= ? AND fecha < ?
+            ORDER BY fecha, id
+        ''',
+        'produccion': '''
+            SELECT pr.id, pr.fecha, pr.producto_id, p.nombre, pr.cantidad, pr.costo_total
+            FROM {esquema}.produccion pr LEFT JOIN main.productos p ON p.id = pr.producto_id
+            WHERE pr.fecha >= ? AND pr.fecha < ?
+            ORDER BY pr.fecha, pr.id
+        ''',
+    }
+    
+    def iter_detalle(self, tabla, desde, hasta, tam_bloque=1000):
+        """
+        Recorre las transacciones de una tabla en [desde, hasta) por bloques.
+        
+        Usa fetchmany sobre un cursor propio: nunca hay más de tam_bloque
+        filas en memoria, sin importar el tamaño del rango. Los años
+        archivados del rango se leen de su archivo, antes que la base activa.
+        
+        Yields:
+            list: Bloques de filas con las columnas de DETALLE_COLUMNAS[tabla]
+        """
+        if tabla not in self.DETALLE_CONSULTAS:
+            raise ValueError(f"Tabla sin detalle: {tabla}")
+        for esquema in self._esquemas_rango(desde, hasta):
+            cursor = self.get_connection().cursor()
+            cursor.arraysize = tam_bloque
+            cursor.execute(self.DETALLE_CONSULTAS[tabla].format(esquema=esquema), (desde, hasta))
+            try:
+                while True:
+                    bloque = cursor.fetchmany()
+                    if not bloque:
+                        break
+                    yield bloque
+            finally:
+                cursor.close()
+    
+    def iter_detalle_mes(self, tabla, mes, anio, tam_bloque=1000):
+        """iter_detalle para un mes completo"""
+        return self.iter_detalle(tabla, *self._rango_mes(mes, anio), tam_bloque=tam_bloque)
+    
+    def contar_detalle_mes(self, tabla, mes, anio):
+        """Cantidad de transacciones de una tabla en el mes (rango sobre el índice de fecha)"""
+        if tabla not in self.DETALLE_CONSULTAS:
+            raise ValueError(f"Tabla sin detalle: {tabla}")
+        desde, hasta = self._rango_mes(mes, anio)
+        conn = self.get_connection()
+        return sum(
+            conn.execute(f'SELECT COUNT(*) FROM {esquema}.{tabla} WHERE fecha >= ? AND fecha < ?',
+                         (desde, hasta)).fetchone()[0]
+            for esquema in self._esquemas_rango(desde, hasta)
+        )
+    
+    # ===== RESUMEN MENSUAL =====
+    def _get_fila_resumen(self, mes, anio):
+        """Lectura por clave primaria de resumen_mensual: (ventas, gastos, unidades, costo_produccion)"""
+        def calcular():
+            cursor = self.get_connection().execute('''
+                SELECT ventas, gastos, unidades, costo_produccion FROM resumen_mensual
+                WHERE anio = ? AND mes = ?
+            ''', (anio, mes))
+            return cursor.fetchone() or (0, 0, 0, 0)
+        periodo = (anio, mes)
+        dependencias = [('ventas', periodo), ('gastos', periodo), ('produccion', periodo)]
+        return self._cacheado(('resumen', periodo), dependencias, calcular)
+    
+    def _calcular_resumen_mensual(self, cursor):
+        """Recalcula los totales por (anio, mes) desde las tablas de origen"""
+        cursor.execute('''
+            SELECT anio, mes, SUM(ventas), SUM(gastos), SUM(unidades), SUM(costo_produccion) FROM (
+                SELECT substr(fecha, 1, 4) AS anio, substr(fecha, 6, 2) AS mes,
+                       SUM(IFNULL(total, 0)) AS ventas, 0 AS gastos, 0 AS unidades, 0 AS costo_produccion
+                FROM ventas WHERE fecha IS NOT NULL GROUP BY 1, 2
+                UNION ALL
+                SELECT substr(fecha, 1, 4), substr(fecha, 6, 2), 0, SUM(IFNULL(monto, 0)), 0, 0
+                FROM gastos WHERE fecha IS NOT NULL GROUP BY 1, 2
+                UNION ALL
+                SELECT substr(fecha, 1, 4), substr(fecha, 6, 2), 0, 0,
+                       SUM(IFNULL(cantidad, 0)), SUM(IFNULL(costo_total, 0))
+                FROM produccion WHERE fecha IS NOT NULL GROUP BY 1, 2
+            )
+            GROUP BY anio, mes
+        ''')
+        return {(int(f[0]), int(f[1])): tuple(f[2:]) for f in cursor.fetchall()}
+    
+    def _poblar_resumen_mensual(self, cursor):
+        # Las versiones solo crecen (de ellas depende la caché de reportes): un mes
+        # que queda sin datos se guarda en cero en lugar de borrarse. Los años
+        # archivados ya no tienen filas de origen: su resumen queda como está.
+        cursor.execute('''
+            SELECT anio, mes, version FROM resumen_mensual
+            WHERE anio NOT IN (SELECT anio FROM archivos)
+        ''')
+        versiones = {(f[0], f[1]): f[2] for f in cursor.fetchall()}
+        totales = self._calcular_resumen_mensual(cursor)
+        cursor.execute('DELETE FROM resumen_mensual WHERE anio NOT IN (SELECT anio FROM archivos)')
+        cursor.executemany('''
+            INSERT INTO resumen_mensual (anio, mes, ventas, gastos, unidades, costo_produccion, version)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [clave + totales.get(clave, (0, 0, 0, 0)) + (versiones.get(clave, 0) + 1,)
+              for clave in set(totales) | set(versiones)])
+    
+    def reconstruir_resumen_mensual(self):
+        """Reconstruye resumen_mensual completa desde ventas, gastos y produccion"""
+        with self.get_connection() as conn:
+            self._poblar_resumen_mensual(conn.cursor())
+        self.invalidar_cache()
+    
+    def verificar_resumen_mensual(self, tolerancia=0.005):
+        """
+        Compara resumen_mensual con los totales recalculados (sin los años
+        archivados, cuyas filas de origen ya no están en la base activa).
+        
+        Returns:
+            list: Diferencias como (anio, mes, esperado, almacenado); vacía si está al día
+        """
+        cursor = self.get_connection().cursor()
+        archivados = set(self.get_anios_archivados())
+        esperado = self._calcular_resumen_mensual(cursor)
+        cursor.execute('SELECT anio, mes, ventas, gastos, unidades, costo_produccion FROM resumen_mensual')
+        almacenado = {(f[0], f[1]): tuple(f[2:]) for f in cursor.fetchall() if f[0] not in archivados}
+        
+        diferencias = []
+        for clave in sorted(set(esperado) | set(almacenado)):
+            a = esperado.get(clave, (0, 0, 0, 0))
+            b = almacenado.get(clave, (0, 0, 0, 0))
+            if any(abs(x - y) > tolerancia for x, y in zip(a, b)):
+                diferencias.append((clave[0], clave[1], a, b))
+        return diferencias
+    
+    # ===== ARCHIVO POR AÑOS =====
+    def _crear_tabla_archivos(self, cursor):
+        """Años cerrados cuyas transacciones se movieron a su archivo (archivar_anio)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archivos (
+                anio INTEGER PRIMARY KEY,
+                filas INTEGER NOT NULL,
+                fecha_archivado TEXT
+            )
+        ''')
+    
+    def ruta_archivo(self, anio):
+        """Archivo SQLite de un año: <carpeta de la base>/archivo/<nombre>_<anio>.db"""
+        base = Path(self.db_path)
+        return base.parent / 'archivo' / f'{base.stem}_{anio}.db'
+    
+    def get_anios_archivados(self):
+        """Años archivados, de menor a mayor"""
+        def calcular():
+            cursor = self.get_connection().execute('SELECT anio FROM archivos ORDER BY anio')
+            return tuple(fila[0] for fila in cursor.fetchall())
+        return self._cacheado(('anios_archivados',), [('archivos', None)], calcular)
+    
+    def get_primer_anio_activo(self):
+        """Año de la transacción más antigua que sigue en la base activa, o None"""
+        conn = self.get_connection()
+        fechas = [
+            conn.execute(f'''
+                SELECT fecha FROM {tabla} WHERE fecha IS NOT NULL {"AND tipo <> 'ARRASTRE'" if tabla == 'balance' else ''}
+                ORDER BY fecha LIMIT 1
+            ''').fetchone()
+            for tabla in self.TABLAS_ARCHIVO
+        ]
+        fechas = [fila[0] for fila in fechas if fila is not None]
+        return int(min(fechas)[:4]) if fechas else None
+    
+    def archivar_anio(self, anio):
+        """
+        Mueve las transacciones de un año cerrado a su propio archivo.
+        
+        Ventas, tickets, gastos, producción y libro de balance del año salen de
+        la base activa. Quedan sus filas de resumen_mensual (reportes mensuales
+        y anuales sin cambios) y un movimiento ARRASTRE con el saldo de todo lo
+        archivado, primero en el libro, para que los saldos sigan cerrando.
+        Los años se archivan del más antiguo al más nuevo; las lecturas y
+        búsquedas de un año archivado adjuntan su archivo al pedirlo.
+        
+        El archivo se escribe y confirma antes de borrar nada de la base
+        activa: si se interrumpe en el medio, el año sigue sin archivar.
+        
+        Returns:
+            int: Filas movidas al archivo
+        
+        Raises:
+            ValueError: Si el año no está cerrado, ya está archivado o quedan
+                transacciones de años anteriores
+        """
+        if anio >= datetime.now().year:
+            raise ValueError(f"Solo se archivan años cerrados ({anio} está en curso)")
+        if anio in self.get_anios_archivados():
+            raise ValueError(f"El año {anio} ya está archivado")
+        primero = self.get_primer_anio_activo()
+        if primero is not None and primero < anio:
+            raise ValueError(f"Primero hay que archivar {primero}")
+        
+        hasta = f'{anio + 1:04d}-01-01'
+        ruta = self.ruta_archivo(anio)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        if ruta.exists():
+            # Resto de un intento interrumpido: el año no figura en archivos
+            ruta.unlink()
+        
+        conn = self.get_connection()
+        filas = 0
+        conn.execute('ATTACH DATABASE ? AS archivo_nuevo', (str(ruta),))
+        try:
+            conn.execute('PRAGMA archivo_nuevo.synchronous = FULL')
+            with conn:
+                conn.execute('BEGIN')
+                for tabla in self.TABLAS_ARCHIVO:
+                    definicion = conn.execute(
+                        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)
+                    ).fetchone()[0]
+                    conn.execute(re.sub(rf'^CREATE TABLE\s+"?{tabla}"?', f'CREATE TABLE archivo_nuevo.{tabla}',
+                                        definicion, flags=re.IGNORECASE))
+                    filas += conn.execute(
+                        f'INSERT INTO archivo_nuevo.{tabla} SELECT * FROM main.{tabla} WHERE fecha < ?', (hasta,)
+                    ).rowcount
+                    conn.execute(f'CREATE INDEX archivo_nuevo.idx_{tabla}_historial ON {tabla} (fecha, id)')
+                self._crear_busqueda(conn.cursor(), 'archivo_nuevo')
+        finally:
+            conn.execute('DETACH DATABASE archivo_nuevo')
+        
+        with conn:
+            conn.execute('BEGIN')
+            cursor = conn.cursor()
+            # El arrastre anterior (fecha del 31/12 previo) también pasa al archivo
+            cursor.execute(f'SELECT IFNULL(SUM({self.MONTO_CON_SIGNO}), 0) FROM balance WHERE fecha < ?', (hasta,))
+            arrastre = cursor.fetchone()[0]
+            
+            # Sin los triggers de borrado, resumen_mensual conserva los totales del año
+            for tabla in self.RESUMEN_FUENTES:
+                cursor.execute(f'DROP TRIGGER IF EXISTS trg_{tabla}_resumen_del')
+            for tabla in self.TABLAS_ARCHIVO:
+                cursor.execute(f'DELETE FROM {tabla} WHERE fecha < ?', (hasta,))
+            self._crear_triggers_resumen(cursor)
+            
+            # Fecha del 31/12 e id 0: primero en el orden (fecha, id) de la suma corrida del libro
+            cursor.execute('''
+                INSERT INTO balance (id, fecha, tipo, concepto, monto)
+                VALUES (0, ?, 'ARRASTRE', ?, ?)
+            ''', (f'{anio:04d}-12-31 23:59:59', f'Saldo archivado hasta {anio}', arrastre))
+            self._recalcular_balance(cursor)
+            cursor.execute('INSERT INTO archivos (anio, filas, fecha_archivado) VALUES (?, ?, ?)',
+                           (anio, filas, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        self.invalidar_cache()
+        return filas
+    
+    def compactar(self):
+        """VACUUM de la base activa: devuelve al sistema el espacio liberado al archivar"""
+        self.get_connection().execute('VACUUM')
+    
+    def _adjuntar_archivo(self, anio):
+        """
+        Nombre del esquema del archivo de un año en la conexión del hilo.
+        
+        Lo adjunta (ATTACH) la primera vez; cada conexión mantiene a lo sumo
+        ARCHIVOS_ADJUNTOS_MAX y suelta el usado hace más tiempo.
+        """
+        conn = self.get_connection()
+        adjuntos = getattr(self._local, 'adjuntos', None)
+        if adjuntos is None:
+            adjuntos = self._local.adjuntos = OrderedDict()
+        esquema = f'archivo_{anio}'
+        if esquema in adjuntos:
+            adjuntos.move_to_end(esquema)
+            return esquema
+        
+        ruta = self.ruta_archivo(anio)
+        if not ruta.exists():
+            raise FileNotFoundError(f"Falta el archivo del año {anio}: {ruta}")
+        while len(adjuntos) >= self.ARCHIVOS_ADJUNTOS_MAX:
+            viejo, _ = adjuntos.popitem(last=False)
+            conn.execute(f'DETACH DATABASE {viejo}')
+        # Una conexión de solo lectura se abrió con URI: el archivo también va en modo ro
+        destino = f'{ruta.absolute().as_uri()}?mode=ro' if self.solo_lectura else str(ruta)
+        conn.execute(f'ATTACH DATABASE ? AS {esquema}', (destino,))
+        adjuntos[esquema] = anio
+        return esquema
+    
+    def _esquemas_rango(self, desde, hasta):
+        """Esquemas con filas en [desde, hasta): archivos de los años del rango y luego main"""
+        esquemas = [
+            self._adjuntar_archivo(anio) for anio in self.get_anios_archivados()
+            if f'{anio:04d}-01-01' < hasta and f'{anio + 1:04d}-01-01' > desde
+        ]
+        return esquemas + ['main']
+    
+    def _get_balance_archivado_en(self, fecha):
+        """Saldo a una fecha anterior a la base activa, desde el archivo de su año o uno previo"""
+        conn = self.get_connection()
+        for anio in reversed(self.get_anios_archivados()):
+            if f'{anio:04d}-01-01' > fecha:
+                continue
+            esquema = self._adjuntar_archivo(anio)
+            fila = conn.execute(f'''
+                SELECT saldo_acumulado FROM {esquema}.balance WHERE fecha <= ?
+                ORDER BY fecha DESC, id DESC LIMIT 1
+            ''', (fecha,)).fetchone()
+            if fila is not None:
+                return fila[0]
+        return 0
+    
+    # ===== BÚSQUEDA =====
+    # Columnas de cada índice FTS5; ventas_fts lleva el nombre del producto de la venta
+    BUSQUEDA_COLUMNAS = {
+        'ventas': ('cliente', 'producto'),
+        'gastos': ('concepto', 'descripcion', 'categoria'),
+        'productos': ('nombre', 'codigo', 'categoria'),
+    }
+    
+    # Sin distinguir mayúsculas ni acentos. Prefijos de 2 a 8 letras indexados:
+    # la palabra que se está escribiendo se busca sin juntar todas las
+    # coincidencias de un término común ('clie' entre millones de 'Cliente')
+    BUSQUEDA_OPCIONES = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4 5 6 7 8'"
+    
+    # Pesos de bm25 por columna de BUSQUEDA_COLUMNAS: el cliente, el concepto y
+    # el nombre pesan más que la descripción o la categoría
+    BUSQUEDA_PESOS = {
+        'ventas': (2.0, 1.0),
+        'gastos': (10.0, 1.0, 5.0),
+        'productos': (10.0, 5.0, 1.0),
+    }
+    
+    # Resultados con las columnas del historial (get_ventas_page, get_gastos_page)
+    # o de get_productos, más la relevancia al final para el cursor. {coincidencias}
+    # puntúa cada fila del índice con bm25; {esquema} es main o un año archivado.
+    # Orden por relevancia (bm25 es menor cuanto más relevante) y, en empate, de
+    # la fila más nueva a la más antigua; la página sigue después del cursor.
+    BUSQUEDA_CONSULTAS = {
+        'ventas': '''
+            SELECT v.id, p.nombre, v.cantidad, v.total, v.fecha, v.cliente, f.relevancia
+            FROM ({coincidencias}) f
+            JOIN {esquema}.ventas v ON v.id = f.rowid
+            JOIN main.productos p ON p.id = v.producto_id
+            WHERE v.fecha >= :desde AND v.fecha < :hasta AND {despues}
+            ORDER BY f.relevancia, f.rowid DESC LIMIT :size
+        ''',
+        'gastos': '''
+            SELECT g.*, f.relevancia
+            FROM ({coincidencias}) f
+            JOIN {esquema}.gastos g ON g.id = f.rowid
+            WHERE g.fecha >= :desde AND g.fecha < :hasta AND {despues}
+            ORDER BY f.relevancia, f.rowid DESC LIMIT :size
+        ''',
+        'productos': '''
+            SELECT p.*, f.relevancia
+            FROM ({coincidencias}) f
+            JOIN main.productos p ON p.id = f.rowid
+            WHERE {despues}
+            ORDER BY f.relevancia, f.rowid DESC LIMIT :size
+        ''',
+    }
+    
+    # Keyset sobre (relevancia, rowid): más relevancia, o la misma y una fila más antigua
+    BUSQUEDA_DESPUES = '(f.relevancia > :relevancia OR (f.relevancia = :relevancia AND f.rowid < :id))'
+    
+    def _crear_busqueda(self, cursor, esquema='main'):
+        """
+        Crea los índices de texto completo (FTS5) y los puebla si son nuevos.
+        
+        gastos_fts y productos_fts leen el texto de su tabla (content=).
+        ventas_fts no guarda texto (content=''): el nombre del producto no está
+        en ventas y copiarlo en cada venta duplicaría millones de filas. Un
+        archivo de año lleva ventas_fts y gastos_fts; productos sigue en main.
+        """
+        cursor.execute(f"SELECT 1 FROM {esquema}.sqlite_master WHERE type = 'table' AND name = 'ventas_fts'")
+        existia = cursor.fetchone() is not None
+        
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {esquema}.ventas_fts USING fts5(
+                {', '.join(self.BUSQUEDA_COLUMNAS['ventas'])}, content = '', {self.BUSQUEDA_OPCIONES}
+            )
+        ''')
+        tablas = ('gastos', 'productos') if esquema == 'main' else ('gastos',)
+        for tabla in tablas:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {esquema}.{tabla}_fts USING fts5(
+                    {', '.join(self.BUSQUEDA_COLUMNAS[tabla])}, content = '{tabla}', content_rowid = 'id',
+                    {self.BUSQUEDA_OPCIONES}
+                )
+            ''')
+        
+        if not existia:
+            self._poblar_busqueda(cursor, esquema)
+    
+    def _poblar_busqueda(self, cursor, esquema='main'):
+        cursor.execute(f"INSERT INTO {esquema}.ventas_fts (ventas_fts) VALUES ('delete-all')")
+        cursor.execute(f'''
+            INSERT INTO {esquema}.ventas_fts (rowid, cliente, producto)
+            SELECT v.id, v.cliente, p.nombre FROM {esquema}.ventas v LEFT JOIN main.productos p ON p.id = v.producto_id
+        ''')
+        for tabla in ('gastos', 'productos') if esquema == 'main' else ('gastos',):
+            cursor.execute(f"INSERT INTO {esquema}.{tabla}_fts ({tabla}_fts) VALUES ('rebuild')")
+    
+    def _crear_triggers_busqueda(self, cursor):
+        """Triggers que mantienen los índices FTS5 al escribir ventas, gastos y productos"""
+        # ventas_fts no guarda el texto: para borrar una fila hay que repetir lo indexado
+        nombre = '(SELECT nombre FROM productos WHERE id = {}.producto_id)'
+        indexar = f"INSERT INTO ventas_fts (rowid, cliente, producto) VALUES (NEW.id, NEW.cliente, {nombre.format('NEW')});"
+        quitar = (f"INSERT INTO ventas_fts (ventas_fts, rowid, cliente, producto) "
+                  f"VALUES ('delete', OLD.id, OLD.cliente, {nombre.format('OLD')});")
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_ventas_fts_ins AFTER INSERT ON ventas BEGIN {indexar} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_ventas_fts_del AFTER DELETE ON ventas BEGIN {quitar} END')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_ventas_fts_upd AFTER UPDATE OF cliente, producto_id ON ventas
+            BEGIN {quitar} {indexar} END
+        ''')
+        # Renombrar un producto reindexa sus ventas
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_productos_fts_ventas AFTER UPDATE OF nombre ON productos
+            BEGIN
+                INSERT INTO ventas_fts (ventas_fts, rowid, cliente, producto)
+                SELECT 'delete', id, cliente, OLD.nombre FROM ventas WHERE producto_id = OLD.id;
+                INSERT INTO ventas_fts (rowid, cliente, producto)
+                SELECT id, cliente, NEW.nombre FROM ventas WHERE producto_id = NEW.id;
+            END
+        ''')
+        
+        for tabla, columnas in (('gastos', self.BUSQUEDA_COLUMNAS['gastos']),
+                                ('productos', self.BUSQUEDA_COLUMNAS['productos'])):
+            lista = ', '.join(columnas)
+            indexar = (f"INSERT INTO {tabla}_fts (rowid, {lista}) "
+                       f"VALUES (NEW.id, {', '.join(f'NEW.{c}' for c in columnas)});")
+            quitar = (f"INSERT INTO {tabla}_fts ({tabla}_fts, rowid, {lista}) "
+                      f"VALUES ('delete', OLD.id, {', '.join(f'OLD.{c}' for c in columnas)});")
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{tabla}_fts_ins AFTER INSERT ON {tabla} BEGIN {indexar} END')
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{tabla}_fts_del AFTER DELETE ON {tabla} BEGIN {quitar} END')
+            # Solo las columnas indexadas: el stock de productos cambia en cada venta
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{tabla}_fts_upd AFTER UPDATE OF {lista} ON {tabla}
+                BEGIN {quitar} {indexar} END
+            ''')
+    
+    def reconstruir_busqueda(self):
+        """Vuelve a indexar ventas, gastos y productos (tras una carga masiva sin triggers)"""
+        with self.get_connection() as conn:
+            self._poblar_busqueda(conn.cursor())
+    
+    @staticmethod
+    def _consulta_fts(texto):
+        """Texto del usuario como consulta FTS5: todas las palabras, la última como prefijo"""
+        palabras = re.findall(r'\w+', texto or '')
+        terminos = [f'"{palabra}"' for palabra in palabras[:-1]]
+        terminos += [f'"{palabra}"*' for palabra in palabras[-1:]]
+        return ' '.join(terminos)
+    
+    def buscar(self, query, tipo, rango=None, after=None, size=50):
+        """
+        Búsqueda de texto completo en ventas, gastos o productos.
+        
+        Ventas por cliente o nombre del producto; gastos por concepto,
+        descripción o categoría; productos por nombre, código o categoría.
+        Deben estar todas las palabras, sin distinguir mayúsculas ni acentos;
+        la última se busca como prefijo porque es la que se está escribiendo
+        ('energia elec' encuentra 'Energía eléctrica').
+        
+        Los resultados se ordenan por relevancia (bm25 con BUSQUEDA_PESOS) y,
+        a igual relevancia, de la fila más nueva a la más antigua. Las páginas
+        siguen un cursor (relevancia, id), sin OFFSET: una página profunda
+        cuesta lo mismo que la primera. Ordenar exige puntuar todas las
+        coincidencias, así que un término muy común (un prefijo de dos letras
+        entre un millón de ventas) tarda más que uno selectivo.
+        
+        Ventas y gastos siguen por los años archivados del rango, del más nuevo
+        al más antiguo, adjuntados recién cuando la página llega a ellos. bm25
+        depende de las estadísticas de cada índice, así que la relevancia se
+        ordena dentro de cada año archivado y no entre años.
+        
+        Args:
+            query: Texto escrito por el usuario
+            tipo: 'ventas', 'gastos' o 'productos'
+            rango: (desde, hasta) semiabierto sobre fecha, como iter_detalle;
+                None para todo el historial (no aplica a productos)
+            after: Cursor devuelto por la página anterior (None para la primera)
+            size: Cantidad de filas por página
+        
+        Returns:
+            tuple: (filas, cursor_siguiente), con las columnas de
+                get_ventas_page, get_gastos_page o get_productos;
+                cursor_siguiente es None en la última página
+        """
+        if tipo not in self.BUSQUEDA_COLUMNAS:
+            raise ValueError(f"Tipo de búsqueda desconocido: {tipo}")
+        consulta = self._consulta_fts(query)
+        if not consulta:
+            return [], None
+        conn = self.get_connection()
+        
+        desde, hasta = rango or ('', '\uffff')
+        if tipo == 'productos':
+            fuentes = [None]
+        else:
+            # Fuentes en orden: la base activa y los años archivados del rango, del más nuevo al más antiguo
+            fuentes = [None] + [
+                anio for anio in reversed(self.get_anios_archivados())
+                if f'{anio:04d}-01-01' < hasta and f'{anio + 1:04d}-01-01' > desde
+            ]
+        pesos = ', '.join(str(peso) for peso in self.BUSQUEDA_PESOS[tipo])
+        # Cursor: (posición de la fuente, relevancia e id de la última fila devuelta)
+        inicio, relevancia, ultimo_id = after or (0, float('-inf'), 2 ** 63 - 1)
+        parametros = {'consulta': consulta, 'desde': desde, 'hasta': hasta}
+        filas = []
+        for posicion in range(inicio, len(fuentes)):
+            esquema = 'main' if fuentes[posicion] is None else self._adjuntar_archivo(fuentes[posicion])
+            if posicion > inicio:
+                relevancia, ultimo_id = float('-inf'), 2 ** 63 - 1
+            if esquema != 'main' and conn.execute(
+                f"SELECT 1 FROM {esquema}.sqlite_master WHERE name = '{tipo}_fts'"
+            ).fetchone() is None:
+                # Archivo creado antes de la búsqueda de texto completo: sin índice
+                continue
+            coincidencias = (f'SELECT rowid, bm25({tipo}_fts, {pesos}) AS relevancia '
+                             f'FROM {esquema}.{tipo}_fts WHERE {tipo}_fts MATCH :consulta')
+            sql = self.BUSQUEDA_CONSULTAS[tipo].format(
+                coincidencias=coincidencias, esquema=esquema, despues=self.BUSQUEDA_DESPUES
+            )
+            filas += conn.execute(sql, dict(parametros, relevancia=relevancia, id=ultimo_id,
+                                            size=size - len(filas))).fetchall()
+            if len(filas) >= size:
+                return [fila[:-1] for fila in filas], (posicion, filas[-1][-1], filas[-1][0])
+        return [fila[:-1] for fila in filas], None
+
+
+# ==============================================================================
+# FORMATO MONEDA GUARANÍES
+# ==============================================================================
+def a_guaranies(valor):
+    """
+    Monto entero en guaraníes, como se guarda en la base (la moneda no tiene fracciones).
+    
+    Redondea la mitad hacia arriba (1000.5 -> 1001), no al par como round();
+    la migración 1 usa esta misma función para los montos REAL existentes.
+    """
+    # str(): el decimal que se escribió, no la aproximación binaria del float
+    return int(Decimal(str(valor or 0)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_guaranies(valor):
+    """Formatea un número al estilo Guaraníes: Gs. 1.000.000"""
+    if valor is None:
+        valor = 0
+    return f"Gs. {valor:,.0f}".replace(",", ".")
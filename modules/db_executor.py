@@ -0,0 +1,66 @@
+"""
+================================================================================
+MÓDULO DB EXECUTOR - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Ejecuta las operaciones de DatabaseManager en un hilo dedicado para que
+ninguna consulta ni fsync bloquee el hilo principal de la interfaz.
+================================================================================
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DBExecutor:
+    """
+    Cola de operaciones de base de datos atendida por un único hilo.
+    
+    El hilo trabajador usa su propia conexión persistente de DatabaseManager,
+    así que las escrituras quedan serializadas y el hilo que llama solo paga
+    encolar la tarea.
+    """
+    
+    def __init__(self, db, despachar=None):
+        """
+        Args:
+            db: Instancia de DatabaseManager
+            despachar: Función que recibe un callable sin argumentos y lo ejecuta
+                en el hilo de la interfaz (en Kivy, vía Clock.schedule_once).
+                Si es None, los callbacks corren en el hilo trabajador.
+        """
+        self.db = db
+        self._despachar = despachar or (lambda funcion: funcion())
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db')
+    
+    def enviar(self, funcion, *args, al_terminar=None, al_fallar=None, **kwargs):
+        """
+        Encola funcion(*args, **kwargs) en el hilo de base de datos.
+        
+        Args:
+            funcion: Callable a ejecutar (normalmente un método de DatabaseManager)
+            al_terminar: Callback con el resultado, ejecutado vía despachar
+            al_fallar: Callback con la excepción, ejecutado vía despachar
+        
+        Returns:
+            Future: Resultado de la operación
+        """
+        futuro = self._executor.submit(funcion, *args, **kwargs)
+        if al_terminar is not None or al_fallar is not None:
+            futuro.add_done_callback(
+                lambda f: self._despachar(lambda: self._entregar(f, al_terminar, al_fallar))
+            )
+        return futuro
+    
+    def _entregar(self, futuro, al_terminar, al_fallar):
+        error = futuro.exception()
+        if error is None:
+            if al_terminar is not None:
+                al_terminar(futuro.result())
+        elif al_fallar is not None:
+            al_fallar(error)
+        else:
+            print(f"[ERROR] Operación de base de datos fallida: {error}")
+    
+    def cerrar(self, esperar=True):
+        """Detiene el hilo trabajador; con esperar=True completa las tareas pendientes"""
+        self._executor.shutdown(wait=esperar)
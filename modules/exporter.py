@@ -0,0 +1,95 @@
+"""
+================================================================================
+MÓDULO EXPORTER - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Exportación de transacciones (ventas, gastos, producción) a CSV o JSON Lines.
+Las filas se leen de SQLite por bloques (DatabaseManager.iter_detalle) y se
+escriben a medida que llegan, así la memoria no depende de la cantidad de filas.
+================================================================================
+"""
+
+import csv
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from .storage import get_output_directory
+
+
+class DataExporter:
+    """Exportador de transacciones crudas para contabilidad"""
+    
+    TAM_BLOQUE = 2000
+    
+    def __init__(self, db, output_dir=None):
+        """
+        Args:
+            db: Instancia de DatabaseManager
+            output_dir: Directorio de salida (default: el mismo de los reportes PDF)
+        """
+        self.db = db
+        self.output_dir = output_dir or get_output_directory()
+    
+    def exportar(self, tabla, formato='csv', desde=None, hasta=None, comprimir=False, progreso=None):
+        """
+        Exporta una tabla filtrada por rango de fechas.
+        
+        Args:
+            tabla: 'ventas', 'gastos' o 'produccion'
+            formato: 'csv' o 'jsonl'
+            desde: Fecha inicial inclusive ('YYYY-MM-DD' o date); None = sin límite
+            hasta: Fecha final inclusive ('YYYY-MM-DD' o date); None = sin límite
+            comprimir: Si True, escribe el archivo con gzip (.gz)
+            progreso: Callback opcional progreso(filas_escritas)
+        
+        Returns:
+            tuple: (ruta del archivo, filas exportadas)
+        """
+        if tabla not in self.db.DETALLE_COLUMNAS:
+            raise ValueError(f"Tabla no exportable: {tabla}")
+        if formato not in ('csv', 'jsonl'):
+            raise ValueError(f"Formato desconocido: {formato}")
+        
+        columnas = self.db.DETALLE_COLUMNAS[tabla]
+        inicio, fin = self._rango(desde, hasta)
+        
+        sello = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"Exportacion_{tabla}_{sello}.{formato}" + ('.gz' if comprimir else '')
+        filepath = os.path.join(self.output_dir, filename)
+        
+        abrir = gzip.open if comprimir else open
+        
+        filas = 0
+        with abrir(filepath, 'wt', encoding='utf-8', newline='') as salida:
+            if formato == 'csv':
+                escritor = csv.writer(salida)
+                escritor.writerow(columnas)
+                escribir = escritor.writerows
+            else:
+                def escribir(bloque):
+                    salida.writelines(
+                        json.dumps(dict(zip(columnas, fila)), ensure_ascii=False) + '\n'
+                        for fila in bloque
+                    )
+            
+            for bloque in self.db.iter_detalle(tabla, inicio, fin, self.TAM_BLOQUE):
+                escribir(bloque)
+                filas += len(bloque)
+                if progreso is not None:
+                    progreso(filas)
+        
+        return filepath, filas
+    
+    @staticmethod
+    def _rango(desde, hasta):
+        """Convierte fechas inclusivas en el rango semiabierto [inicio, fin) de la columna fecha"""
+        inicio = str(desde) if desde is not None else ''
+        if hasta is None:
+            fin = '\uffff'
+        else:
+            if not isinstance(hasta, date):
+                hasta = date.fromisoformat(str(hasta)[:10])
+            fin = str(hasta + timedelta(days=1))
+        return inicio, fin
@@ -0,0 +1,191 @@
+"""
+================================================================================
+MÓDULO FONTS - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Registro de fuentes Unicode (TTF) para los reportes PDF. Cada fuente se lee y
+se analiza una sola vez por proceso; los PDFReport siguientes reciben una
+copia con las métricas ya calculadas y solo incrustan los glifos que usan.
+================================================================================
+"""
+
+import copy
+import io
+import os
+import threading
+import types
+from importlib.util import find_spec
+
+# SubsetEstable y FontRegistry usan detalles internos de fpdf2 (SubsetMap._map,
+# el constructor de TTFFont): la versión está fijada en buildozer.spec y
+# requirements.txt (fpdf2==2.7.5); revisar estas clases antes de cambiarla
+from fpdf.fonts import SubsetMap, TTFFont
+from fontTools import ttLib
+
+
+# Carpeta de fuentes propias de la app (incluida en el APK vía assets/*):
+# DejaVuSans y DejaVuSans-Bold, licencia en LICENSE-DejaVu.txt
+DIR_ASSETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'fonts')
+
+# Archivos por estilo, en orden de preferencia dentro de cada carpeta. DejaVuSans
+# viene en assets/fonts; Roboto y DejaVuSans, también con Kivy.
+FUENTES = (
+    ('', ('Roboto-Regular.ttf', 'DejaVuSans.ttf')),
+    ('B', ('Roboto-Bold.ttf', 'DejaVuSans-Bold.ttf')),
+    ('I', ('Roboto-Italic.ttf', 'DejaVuSans-Oblique.ttf')),
+)
+
+# Fuentes de respaldo para caracteres que la principal no tiene (símbolos, emoji)
+RESPALDO = ('DejaVuSans.ttf', 'NotoEmoji-Regular.ttf')
+
+# Nombre de familia con el que se registran en cada PDF
+FAMILIA = 'sans'
+FAMILIA_RESPALDO = 'respaldo'
+
+
+class SubsetEstable(SubsetMap):
+    """
+    Subconjunto de glifos que asigna a cada carácter siempre el mismo código.
+    
+    fpdf numera los glifos en el orden en que aparecen, distinto en cada
+    documento; acá el código es el propio valor Unicode (o uno fijo en el área
+    privada para los que no entran en 16 bits). Así el contenido de una página
+    vale igual en cualquier PDFReport y se puede importar en otro.
+    """
+    
+    def __init__(self, font, identities):
+        self._codigos = set()
+        # unicode -> código: pick() se llama por cada carácter escrito y el
+        # camino de fpdf arma un Glyph y consulta el cmap de fontTools cada vez
+        self._por_unicode = {}
+        super().__init__(font, identities)
+    
+    def pick(self, unicode):
+        codigo = self._por_unicode.get(unicode)
+        if codigo is None:
+            codigo = super().pick(unicode)
+            if codigo is not None:
+                self._por_unicode[unicode] = codigo
+        return codigo
+    
+    def pick_glyph(self, glyph):
+        if glyph and glyph not in self._map:
+            unicode = glyph.unicode[0] if glyph.unicode else 0
+            codigo = unicode if unicode <= 0xFFFF else 0xE000 + (unicode - 0x10000) % 0x1900
+            while codigo in self._codigos:
+                codigo = (codigo + 1) & 0xFFFF
+            self._map[glyph] = codigo
+            self._codigos.add(codigo)
+        return self._map.get(glyph)
+
+
+class FontRegistry:
+    """Fuentes TTF analizadas una vez por proceso y compartidas entre reportes"""
+    
+    def __init__(self, directorios=None):
+        """
+        Args:
+            directorios: Carpetas donde buscar las fuentes, en orden
+                (default: assets/fonts y las fuentes de Kivy)
+        """
+        self.directorios = directorios if directorios is not None else self._directorios_por_defecto()
+        # (ruta, estilo) -> (TTFFont analizada, contenido del archivo)
+        self._plantillas = {}
+        self._lock = threading.Lock()
+        self._avisado = False
+    
+    @staticmethod
+    def _directorios_por_defecto():
+        directorios = [DIR_ASSETS]
+        # Ubicar las fuentes de Kivy sin importarlo (este módulo no depende de Kivy)
+        try:
+            spec = find_spec('kivy')
+        except (ImportError, ValueError):
+            spec = None
+        if spec is not None and spec.submodule_search_locations:
+            for ubicacion in spec.submodule_search_locations:
+                directorios.append(os.path.join(ubicacion, 'data', 'fonts'))
+        return directorios
+    
+    def buscar(self, nombres):
+        """Ruta del primer archivo de nombres que exista, o None"""
+        for directorio in self.directorios:
+            for nombre in nombres:
+                ruta = os.path.join(directorio, nombre)
+                if os.path.isfile(ruta):
+                    return ruta
+        return None
+    
+    @property
+    def disponible(self):
+        """True si hay al menos la fuente regular"""
+        return self.buscar(FUENTES[0][1]) is not None
+    
+    @property
+    def firma(self):
+        """Archivos de fuente que usaría instalar(), o 'helvetica' sin fuentes TTF (clave de ReportCache)"""
+        regular = self.buscar(FUENTES[0][1])
+        if regular is None:
+            return 'helvetica'
+        archivos = [self.buscar(nombres) or regular for _, nombres in FUENTES]
+        for nombre in RESPALDO:
+            ruta = self.buscar((nombre,))
+            if ruta is not None and ruta != regular:
+                archivos.append(ruta)
+        return ','.join(os.path.basename(ruta) for ruta in archivos)
+    
+    def _plantilla(self, ruta, estilo):
+        clave = (ruta, estilo)
+        with self._lock:
+            if clave not in self._plantillas:
+                with open(ruta, 'rb') as archivo:
+                    contenido = archivo.read()
+                # TTFFont solo consulta fonts y str_alias_nb_pages del documento
+                documento = types.SimpleNamespace(fonts={}, str_alias_nb_pages='')
+                self._plantillas[clave] = (TTFFont(documento, ruta, FAMILIA + estilo, estilo), contenido)
+            return self._plantillas[clave]
+    
+    def _instalar(self, pdf, ruta, familia, estilo):
+        plantilla, contenido = self._plantilla(ruta, estilo)
+        fuente = copy.copy(plantilla)
+        fuente.i = len(pdf.fonts) + 1
+        fuente.fontkey = familia + estilo
+        # El subsetting de fpdf modifica el TTFont: cada documento lee su propia copia
+        fuente.ttfont = ttLib.TTFont(io.BytesIO(contenido), recalcTimestamp=False, fontNumber=0, lazy=True)
+        fuente.hbfont = None
+        fuente.missing_glyphs = []
+        fuente.subset = SubsetEstable(fuente, [0x00, 0x20, 0x0D, 0x0A])
+        pdf.fonts[fuente.fontkey] = fuente
+    
+    def instalar(self, pdf):
+        """
+        Registra las fuentes Unicode en un PDF, siempre en el mismo orden.
+        
+        Returns:
+            str: Familia a usar con set_font, o None si no hay fuentes TTF
+                (el PDF sigue con las fuentes estándar)
+        """
+        regular = self.buscar(FUENTES[0][1])
+        if regular is None:
+            if not self._avisado:
+                self._avisado = True
+                print(f"[WARNING] Sin fuentes TTF en {self.directorios}: los PDF usan Helvetica (solo Latin-1)")
+            return None
+        
+        for estilo, nombres in FUENTES:
+            self._instalar(pdf, self.buscar(nombres) or regular, FAMILIA, estilo)
+        
+        respaldos = []
+        for nombre in RESPALDO:
+            ruta = self.buscar((nombre,))
+            if ruta is not None and ruta != regular:
+                familia = f'{FAMILIA_RESPALDO}{len(respaldos)}'
+                self._instalar(pdf, ruta, familia, '')
+                respaldos.append(familia)
+        if respaldos:
+            pdf.set_fallback_fonts(respaldos, exact_match=False)
+        return FAMILIA
+
+
+# Registro compartido por todos los reportes del proceso
+registro = FontRegistry()
@@ -0,0 +1,108 @@
+"""
+================================================================================
+MÓDULO HISTORIAL - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Historial de ventas y gastos cargado por páginas con cursor (keyset). No
+depende de Kivy: las pantallas (main.py) le pasan la función de página y la
+conversión de filas, y muestran los datos que entrega.
+================================================================================
+"""
+
+
+class PaginadorHistorial:
+    """
+    Estado de un historial paginado: cursor, búsqueda y si quedan páginas.
+    
+    Las páginas se piden al hilo de la base de datos (DBExecutor). Con una
+    búsqueda activa salen de db.buscar; sin ella, de get_pagina. Las páginas
+    pedidas antes de reiniciar no se consultan si todavía esperaban en la cola
+    (al escribir una búsqueda, cada letra reinicia) y se descartan al llegar.
+    """
+    
+    TAM_PAGINA = 30
+    
+    def __init__(self, ejecutor, tabla, get_pagina, fila_a_dato, al_agregar, al_fallar=None, tam_pagina=None):
+        """
+        Args:
+            ejecutor: DBExecutor de la base de datos
+            tabla: Tabla del historial ('ventas' o 'gastos'), la que recorre db.buscar
+            get_pagina: get_pagina(db, after, size) -> (filas, cursor siguiente o None),
+                p. ej. DatabaseManager.get_ventas_page
+            fila_a_dato: Convierte una fila en el dict que muestra la lista
+            al_agregar: Callback con la lista de dicts de cada página recibida
+            al_fallar: Callback con la excepción si falla una página
+            tam_pagina: Filas por página (default: TAM_PAGINA)
+        """
+        self.ejecutor = ejecutor
+        self.tabla = tabla
+        self.get_pagina = get_pagina
+        self.fila_a_dato = fila_a_dato
+        self.al_agregar = al_agregar
+        self.al_fallar = al_fallar
+        self.tam_pagina = tam_pagina or self.TAM_PAGINA
+        
+        self.busqueda = ''
+        self.cargando = False
+        self.completo = True
+        self._cursor = None
+        self._generacion = 0
+    
+    def reiniciar(self, busqueda=None):
+        """
+        Vuelve a la primera página y la pide.
+        
+        Args:
+            busqueda: Texto a buscar ('' = historial completo); None conserva el actual
+        
+        Returns:
+            Future: La página pedida
+        """
+        if busqueda is not None:
+            self.busqueda = busqueda
+        self._generacion += 1
+        self._cursor = None
+        self.completo = False
+        self.cargando = False
+        return self.siguiente()
+    
+    def siguiente(self):
+        """
+        Pide la página siguiente.
+        
+        Returns:
+            Future: La página pedida, o None si ya hay una en camino o no quedan más
+        """
+        if self.completo or self.cargando:
+            return None
+        self.cargando = True
+        generacion = self._generacion
+        return self.ejecutor.enviar(
+            self._pedir, self.busqueda, self._cursor, generacion,
+            al_terminar=lambda pagina: self._recibir(pagina, generacion),
+            al_fallar=lambda error: self._fallar(error, generacion),
+        )
+    
+    def _pedir(self, busqueda, after, generacion):
+        if generacion != self._generacion:
+            # Ya hay otra búsqueda en la cola: no ordenar resultados que nadie verá
+            return None
+        db = self.ejecutor.db
+        if busqueda:
+            return db.buscar(busqueda, self.tabla, after=after, size=self.tam_pagina)
+        return self.get_pagina(db, after, self.tam_pagina)
+    
+    def _recibir(self, pagina, generacion):
+        if generacion != self._generacion:
+            return
+        filas, self._cursor = pagina
+        self.cargando = False
+        self.completo = self._cursor is None
+        self.al_agregar([self.fila_a_dato(fila) for fila in filas])
+    
+    def _fallar(self, error, generacion):
+        if generacion != self._generacion:
+            return
+        self.cargando = False
+        if self.al_fallar is not None:
+            self.al_fallar(error)
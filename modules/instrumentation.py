@@ -0,0 +1,352 @@
+"""
+================================================================================
+MÓDULO INSTRUMENTATION - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Mediciones de rendimiento para saber si una pantalla lenta se debe al SQL, a
+la construcción de widgets o al render del PDF:
+
+- Cada sentencia SQL de DatabaseManager: histograma de latencias y filas,
+  con registro de consultas lentas y su EXPLAIN QUERY PLAN.
+- Handlers de las pantallas (on_enter, registrar_*, _mostrar_*).
+- Etapas de PDFGenerator (consultas, armado, escritura).
+
+Se activa y desactiva en caliente (instrumentacion.activar()) o al arrancar
+con la variable de entorno FACTORY_INSTRUMENTACION=1. Desactivada, cada punto
+de medición cuesta una comprobación de un atributo.
+================================================================================
+"""
+
+import bisect
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+class Estadistica:
+    """Latencias acumuladas de una sentencia o handler"""
+    
+    # Límites superiores de cada barra del histograma, en milisegundos
+    LIMITES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+    
+    def __init__(self):
+        self.llamadas = 0
+        self.total = 0.0
+        self.minimo = None
+        self.maximo = 0.0
+        self.filas = 0
+        self.histograma = [0] * (len(self.LIMITES_MS) + 1)
+    
+    def agregar(self, segundos, filas=0):
+        self.llamadas += 1
+        self.total += segundos
+        self.minimo = segundos if self.minimo is None else min(self.minimo, segundos)
+        self.maximo = max(self.maximo, segundos)
+        self.filas += filas
+        self.histograma[bisect.bisect_left(self.LIMITES_MS, segundos * 1000)] += 1
+    
+    def percentil(self, p):
+        """Percentil aproximado (límite superior de la barra que lo contiene), en ms"""
+        objetivo = p * self.llamadas
+        acumulado = 0
+        for i, cantidad in enumerate(self.histograma):
+            acumulado += cantidad
+            if acumulado >= objetivo and cantidad:
+                return self.LIMITES_MS[i] if i < len(self.LIMITES_MS) else self.maximo * 1000
+        return 0.0
+    
+    def como_dict(self):
+        barras = {f'<={limite}': n for limite, n in zip(self.LIMITES_MS, self.histograma) if n}
+        if self.histograma[-1]:
+            barras[f'>{self.LIMITES_MS[-1]}'] = self.histograma[-1]
+        return {
+            'llamadas': self.llamadas,
+            'total_ms': round(self.total * 1000, 3),
+            'media_ms': round(self.total * 1000 / self.llamadas, 3) if self.llamadas else 0,
+            'min_ms': round((self.minimo or 0) * 1000, 3),
+            'max_ms': round(self.maximo * 1000, 3),
+            'p50_ms': self.percentil(0.5),
+            'p95_ms': self.percentil(0.95),
+            'filas': self.filas,
+            'histograma_ms': barras,
+        }
+
+
+class Instrumentacion:
+    """Registro de mediciones del proceso, activable en caliente"""
+    
+    # Sentencias más lentas que esto van al registro de consultas lentas
+    UMBRAL_LENTA_MS = 100
+    # Entradas conservadas del registro de consultas lentas (las más recientes)
+    MAX_LENTAS = 200
+    
+    def __init__(self):
+        self.activa = False
+        self.umbral_lenta_ms = self.UMBRAL_LENTA_MS
+        # (categoría, nombre) -> Estadistica
+        self._estadisticas = {}
+        self.lentas = deque(maxlen=self.MAX_LENTAS)
+        self._lock = threading.Lock()
+    
+    def activar(self, umbral_lenta_ms=None):
+        """Empieza a medir; umbral_lenta_ms cambia el umbral de consultas lentas"""
+        if umbral_lenta_ms is not None:
+            self.umbral_lenta_ms = umbral_lenta_ms
+        self.activa = True
+    
+    def desactivar(self):
+        """Deja de medir (lo ya medido se conserva hasta reiniciar())"""
+        self.activa = False
+    
+    def reiniciar(self):
+        """Descarta todas las mediciones"""
+        with self._lock:
+            self._estadisticas = {}
+            self.lentas.clear()
+    
+    def registrar(self, categoria, nombre, segundos, filas=0):
+        """Agrega una medición a la estadística (categoría, nombre)"""
+        with self._lock:
+            estadistica = self._estadisticas.get((categoria, nombre))
+            if estadistica is None:
+                estadistica = self._estadisticas[(categoria, nombre)] = Estadistica()
+            estadistica.agregar(segundos, filas)
+    
+    def registrar_lenta(self, sql, parametros, segundos, filas, plan):
+        self.lentas.append({
+            'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'hilo': threading.current_thread().name,
+            'ms': round(segundos * 1000, 3),
+            'filas': filas,
+            'sql': sql,
+            'parametros': repr(parametros)[:200] if parametros is not None else None,
+            'plan': plan,
+        })
+    
+    def medido(self, categoria):
+        """
+        Decorador que mide cada llamada a la función.
+        
+        Se registra con el nombre calificado (p. ej. 'VentasScreen.on_enter').
+        """
+        def decorador(funcion):
+            nombre = funcion.__qualname__
+            
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                if not self.activa:
+                    return funcion(*args, **kwargs)
+                inicio = time.perf_counter()
+                try:
+                    return funcion(*args, **kwargs)
+                finally:
+                    self.registrar(categoria, nombre, time.perf_counter() - inicio)
+            return envoltura
+        return decorador
+    
+    def etapas(self, categoria, nombre, progreso):
+        """
+        Envuelve un callback progreso(fraccion, etapa) para medir cuánto dura
+        cada etapa y el total. Usar como context manager; devuelve el callback
+        a pasar al generador (el original si la instrumentación está apagada).
+        """
+        return _Etapas(self, categoria, nombre, progreso)
+    
+    def resumen(self):
+        """Mediciones actuales como dict serializable a JSON"""
+        with self._lock:
+            estadisticas = sorted(self._estadisticas.items(), key=lambda e: -e[1].total)
+            return {
+                'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'activa': self.activa,
+                'umbral_lenta_ms': self.umbral_lenta_ms,
+                'estadisticas': [dict(categoria=categoria, nombre=nombre, **e.como_dict())
+                                 for (categoria, nombre), e in estadisticas],
+                'lentas': list(self.lentas),
+            }
+    
+    def volcar(self, ruta):
+        """
+        Escribe resumen() en un archivo JSON.
+        
+        Returns:
+            str: Ruta del archivo escrito
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(self.resumen(), f, ensure_ascii=False, indent=1)
+        return ruta
+
+
+class _Etapas:
+    def __init__(self, instrumentacion, categoria, nombre, progreso):
+        self._instrumentacion = instrumentacion
+        self._categoria = categoria
+        self._nombre = nombre
+        self._progreso = progreso
+        self._etapa = None
+    
+    def __enter__(self):
+        if not self._instrumentacion.activa:
+            return self._progreso
+        self._inicio = self._desde = time.perf_counter()
+        return self
+    
+    def __call__(self, fraccion, etapa=''):
+        if etapa != self._etapa:
+            ahora = time.perf_counter()
+            self._cerrar_etapa(ahora)
+            self._etapa, self._desde = etapa, ahora
+        self._progreso(fraccion, etapa)
+    
+    def _cerrar_etapa(self, ahora):
+        if self._etapa:
+            self._instrumentacion.registrar(self._categoria, f'{self._nombre}: {self._etapa}',
+                                            ahora - self._desde)
+    
+    def __exit__(self, tipo, valor, traza):
+        if not hasattr(self, '_inicio'):
+            return False
+        ahora = time.perf_counter()
+        self._cerrar_etapa(ahora)
+        self._instrumentacion.registrar(self._categoria, self._nombre, ahora - self._inicio)
+        return False
+
+
+# Registro compartido por todo el proceso
+instrumentacion = Instrumentacion()
+if os.environ.get('FACTORY_INSTRUMENTACION', '') not in ('', '0'):
+    instrumentacion.activar(float(os.environ.get('FACTORY_INSTRUMENTACION_UMBRAL_MS', Instrumentacion.UMBRAL_LENTA_MS)))
+
+
+# ==============================================================================
+# SQLITE INSTRUMENTADO
+# ==============================================================================
+class CursorInstrumentado(sqlite3.Cursor):
+    """
+    Cursor que mide cada sentencia desde execute hasta leer la última fila.
+    
+    La medición se cierra al agotar el resultado (fetchall, o fetchone /
+    fetchmany sin más filas), al ejecutar otra sentencia o al liberar el cursor.
+    """
+    
+    # Sentencias para las que se pide EXPLAIN QUERY PLAN
+    CON_PLAN = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+    
+    _medicion = None
+    
+    def execute(self, sql, parametros=()):
+        if self._medicion is not None:
+            self._cerrar_medicion()
+        if not instrumentacion.activa:
+            return super().execute(sql, parametros)
+        inicio = time.perf_counter()
+        super().execute(sql, parametros)
+        self._medicion = [sql, parametros, time.perf_counter() - inicio, 0]
+        if self.description is None:
+            # Sin filas que leer (INSERT, UPDATE, DDL...): cuenta las afectadas
+            self._medicion[3] = max(self.rowcount, 0)
+            self._cerrar_medicion()
+        return self
+    
+    def executemany(self, sql, secuencia):
+        if self._medicion is not None:
+            self._cerrar_medicion()
+        if not instrumentacion.activa:
+            return super().executemany(sql, secuencia)
+        inicio = time.perf_counter()
+        super().executemany(sql, secuencia)
+        # Los parámetros ya se consumieron: sin EXPLAIN para executemany
+        self._medicion = [sql, None, time.perf_counter() - inicio, max(self.rowcount, 0)]
+        self._cerrar_medicion()
+        return self
+    
+    def fetchone(self):
+        if self._medicion is None:
+            return super().fetchone()
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        self._medicion[2] += time.perf_counter() - inicio
+        if fila is None:
+            self._cerrar_medicion()
+        else:
+            self._medicion[3] += 1
+        return fila
+    
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        if self._medicion is None:
+            return super().fetchmany(size)
+        inicio = time.perf_counter()
+        filas = super().fetchmany(size)
+        self._medicion[2] += time.perf_counter() - inicio
+        self._medicion[3] += len(filas)
+        if len(filas) < size:
+            self._cerrar_medicion()
+        return filas
+    
+    def fetchall(self):
+        if self._medicion is None:
+            return super().fetchall()
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        self._medicion[2] += time.perf_counter() - inicio
+        self._medicion[3] += len(filas)
+        self._cerrar_medicion()
+        return filas
+    
+    def close(self):
+        if self._medicion is not None:
+            self._cerrar_medicion()
+        super().close()
+    
+    def __del__(self):
+        if self._medicion is not None:
+            self._cerrar_medicion()
+    
+    def _cerrar_medicion(self):
+        sql, parametros, segundos, filas = self._medicion
+        self._medicion = None
+        clave = ' '.join(sql.split())
+        instrumentacion.registrar('sql', clave, segundos, filas)
+        if segundos * 1000 >= instrumentacion.umbral_lenta_ms:
+            instrumentacion.registrar_lenta(clave, parametros, segundos, filas,
+                                            self._plan(sql, parametros))
+    
+    def _plan(self, sql, parametros):
+        """EXPLAIN QUERY PLAN de la sentencia, o None si no aplica"""
+        if parametros is None or not sql.lstrip().upper().startswith(self.CON_PLAN):
+            return None
+        try:
+            cursor = self.connection.cursor(sqlite3.Cursor)
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, parametros)
+            return [fila[-1] for fila in cursor.fetchall()]
+        except sqlite3.Error:
+            return None
+
+
+class ConexionInstrumentada(sqlite3.Connection):
+    """
+    Conexión cuyos cursores (incluidos los de execute) son CursorInstrumentado
+    mientras la instrumentación está activa; apagada, son cursores comunes.
+    """
+    
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = CursorInstrumentado if instrumentacion.activa else sqlite3.Cursor
+        return super().cursor(factory)
+    
+    def execute(self, sql, parametros=()):
+        if not instrumentacion.activa:
+            return super().execute(sql, parametros)
+        return self.cursor().execute(sql, parametros)
+    
+    def executemany(self, sql, secuencia):
+        if not instrumentacion.activa:
+            return super().executemany(sql, secuencia)
+        return self.cursor().executemany(sql, secuencia)
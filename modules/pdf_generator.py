@@ -7,11 +7,23 @@ Generación de PDF con fpdf2 + Share Intent nativo de Android
 ================================================================================
 """
 
+import calendar
+import multiprocessing
 import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 
 from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from .fonts import registro as registro_fuentes
+from .instrumentation import instrumentacion
+from .report_cache import ReportCache
+from .storage import get_output_directory
 
 # Importar plyer para compartir (funciona en Android)
 try:
@@ -31,18 +43,70 @@ except ImportError:
 class PDFReport(FPDF):
     """Clase personalizada para generar reportes en PDF"""
     
-    def __init__(self):
+    def __init__(self, con_pie=True):
+        """
+        Args:
+            con_pie: Si es False no se escribe el pie con el número de página
+                (páginas que después se importan en otro documento)
+        """
         super().__init__(orientation='P', unit='mm', format='A4')
         self.set_auto_page_break(auto=True, margin=15)
         self.set_margins(15, 15, 15)
+        self.con_pie = con_pie
+        self._importando = False
+        
+        # Fuentes Unicode ya analizadas por el registro del proceso; sin archivos
+        # TTF quedan las estándar (solo Latin-1). Se registran siempre en el mismo
+        # orden: el contenido de una página nombra las fuentes por índice
+        # (/F1, /F2...) y así las páginas de otro PDFReport se importan tal cual
+        self.familia = registro_fuentes.instalar(self) or 'helvetica'
+        if self.familia == 'helvetica':
+            for estilo in ('', 'B', 'I'):
+                self.set_font(self.familia, estilo, 10)
+    
+    def normalize_text(self, txt):
+        return super().normalize_text(self._dibujable(txt))
+    
+    def _dibujable(self, txt, con_respaldo=True):
+        """
+        Omite los caracteres que ninguna fuente disponible puede dibujar (p. ej.
+        emoji sin fuente de emoji). text() no usa las fuentes de respaldo: para
+        él se filtra con con_respaldo=False.
+        """
+        if txt.isascii():
+            return txt
+        
+        if self.familia == 'helvetica':
+            limpio = txt.encode('latin-1', 'ignore').decode('latin-1')
+        else:
+            fuentes = [self.current_font]
+            if con_respaldo:
+                fuentes += [self.fonts[f] for f in self._fallback_font_ids]
+            limpio = ''.join(c for c in txt if any(ord(c) in f.glyph_ids for f in fuentes))
+        return limpio.strip() if limpio != txt else txt
+    
+    def glifos_usados(self):
+        """Caracteres usados por fuente, para registrar_glifos() en el documento que importa"""
+        return {clave: sorted(g.unicode[0] for g in fuente.subset.dict() if g.unicode)
+                for clave, fuente in self.fonts.items() if fuente.type == 'TTF'}
+    
+    def registrar_glifos(self, glifos):
+        """Incluye en este documento los glifos que usan páginas importadas de otro"""
+        for clave, caracteres in glifos.items():
+            fuente = self.fonts[clave]
+            for caracter in caracteres:
+                fuente.subset.pick(caracter)
     
     def header(self):
         """Encabezado del PDF"""
-        self.set_font('Arial', 'B', 16)
+        if self._importando:
+            return
+        
+        self.set_font(self.familia, 'B', 16)
         self.set_text_color(33, 37, 41)
         self.cell(0, 10, 'GESTIÓN DE FÁBRICA', 0, 1, 'C')
         
-        self.set_font('Arial', '', 10)
+        self.set_font(self.familia, '', 10)
         self.set_text_color(108, 117, 125)
         fecha = datetime.now().strftime('%d/%m/%Y %H:%M')
         self.cell(0, 5, f'Reporte Generado: {fecha}', 0, 1, 'C')
@@ -54,21 +118,24 @@ class PDFReport(FPDF):
     
     def footer(self):
         """Pie de página del PDF"""
+        if not self.con_pie:
+            return
+        
         self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
+        self.set_font(self.familia, 'I', 8)
         self.set_text_color(128, 128, 128)
         self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
     
     def chapter_title(self, title):
         """Título de sección"""
-        self.set_font('Arial', 'B', 12)
+        self.set_font(self.familia, 'B', 12)
         self.set_text_color(0, 123, 255)
         self.cell(0, 10, title, 0, 1, 'L')
         self.ln(2)
     
     def chapter_body(self, body):
         """Cuerpo de texto"""
-        self.set_font('Arial', '', 10)
+        self.set_font(self.familia, '', 10)
         self.set_text_color(33, 37, 41)
         self.multi_cell(0, 5, body)
         self.ln()
@@ -77,36 +144,142 @@ class PDFReport(FPDF):
         """Agrega un cuadro de resumen"""
         self.set_fill_color(*color)
         self.set_text_color(255, 255, 255)
-        self.set_font('Arial', 'B', 10)
+        self.set_font(self.familia, 'B', 10)
         self.cell(90, 8, f'  {titulo}', 0, 0, 'L', True)
         
         self.set_fill_color(240, 240, 240)
         self.set_text_color(33, 37, 41)
-        self.set_font('Arial', '', 10)
+        self.set_font(self.familia, '', 10)
         self.cell(90, 8, f'{valor}  ', 0, 1, 'R', True)
         self.ln(3)
+    
+    def _fila_tabla(self, columnas, celdas, alto):
+        """
+        Fila de datos con text() en lugar de cell(): en tablas de miles de
+        filas cell() es varias veces más lento y acá no hace falta su maquetado.
+        """
+        x = self.l_margin
+        y = self.get_y()
+        base = y + alto * 0.7
+        for (_, ancho, alineacion), texto in zip(columnas, celdas):
+            texto = self._dibujable(texto, con_respaldo=False)
+            # Recortar para que el texto no invada la celda vecina (~1,7 mm por carácter a 8 pt)
+            maximo = int(ancho / 1.7)
+            if len(texto) > maximo:
+                texto = texto[:maximo - 1] + '.'
+            if alineacion == 'R':
+                self.text(x + ancho - 1 - self.get_string_width(texto), base, texto)
+            else:
+                self.text(x + 1, base, texto)
+            x += ancho
+        self.set_y(y + alto)
+    
+    def _encabezado_tabla(self, columnas, alto):
+        self.set_font(self.familia, 'B', 8)
+        self.set_fill_color(0, 123, 255)
+        self.set_text_color(255, 255, 255)
+        for titulo, ancho, alineacion in columnas:
+            self.cell(ancho, alto, titulo, border=0, align=alineacion, fill=True,
+                      new_x=XPos.RIGHT, new_y=YPos.TOP)
+        self.ln(alto)
+        self.set_font(self.familia, '', 8)
+        self.set_text_color(33, 37, 41)
+    
+    def _fila_subtotal(self, columnas, etiqueta, valor, alto):
+        self.set_font(self.familia, 'B', 8)
+        self.set_fill_color(240, 240, 240)
+        ancho_etiqueta = sum(ancho for _, ancho, _ in columnas[:-1])
+        self.cell(ancho_etiqueta, alto, f'  {etiqueta}', border=0, align='L', fill=True,
+                  new_x=XPos.RIGHT, new_y=YPos.TOP)
+        self.cell(columnas[-1][1], alto, valor, border=0, align='R', fill=True,
+                  new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.set_font(self.familia, '', 8)
+    
+    def tabla_paginada(self, columnas, filas, formato_total, alto=5):
+        """
+        Tabla de detalle que se escribe a medida que llegan las filas.
+        
+        Repite el encabezado en cada página y cierra cada página con su
+        subtotal; solo se acumulan los totales, nunca las filas.
+        
+        Args:
+            columnas: Lista de (titulo, ancho_mm, alineacion); la última es la totalizada
+            filas: Iterable de (celdas, valor, categoria)
+            formato_total: Función que formatea los subtotales
+        
+        Returns:
+            tuple: (cantidad de filas, total, {categoria: (filas, subtotal)})
+        """
+        self._encabezado_tabla(columnas, alto + 1)
+        cantidad = 0
+        total = 0
+        subtotal_pagina = 0
+        por_categoria = {}
+        
+        for celdas, valor, categoria in filas:
+            # Reservar lugar para la fila y el subtotal antes del salto automático
+            if self.get_y() + 2 * alto > self.page_break_trigger:
+                self._fila_subtotal(columnas, 'Subtotal página', formato_total(subtotal_pagina), alto)
+                subtotal_pagina = 0
+                self.add_page()
+                self._encabezado_tabla(columnas, alto + 1)
+            
+            self._fila_tabla(columnas, celdas, alto)
+            cantidad += 1
+            total += valor
+            subtotal_pagina += valor
+            filas_cat, subtotal_cat = por_categoria.get(categoria, (0, 0))
+            por_categoria[categoria] = (filas_cat + 1, subtotal_cat + valor)
+        
+        self._fila_subtotal(columnas, 'Subtotal página', formato_total(subtotal_pagina), alto)
+        self._fila_subtotal(columnas, f'TOTAL ({cantidad} registros)', formato_total(total), alto + 1)
+        self.ln(4)
+        return cantidad, total, por_categoria
+    
+    def tabla_subtotales(self, titulo_categoria, por_categoria, formato_total, alto=5):
+        """Subtotales por categoría, ordenados de mayor a menor"""
+        columnas = [(titulo_categoria, 110, 'L'), ('Registros', 30, 'R'), ('Subtotal', 40, 'R')]
+        self._encabezado_tabla(columnas, alto + 1)
+        for categoria, (filas, subtotal) in sorted(por_categoria.items(), key=lambda c: -c[1][1]):
+            if self.get_y() + alto > self.page_break_trigger:
+                self.add_page()
+                self._encabezado_tabla(columnas, alto + 1)
+            self._fila_tabla(columnas, [str(categoria or '-'), str(filas), formato_total(subtotal)], alto)
+        self.ln(4)
+    
+    def contenido_paginas(self):
+        """Contenido ya renderizado de cada página, para importar_pagina()"""
+        return [bytes(self.pages[n].contents) for n in range(1, self.page + 1)]
+    
+    def importar_pagina(self, contenido):
+        """
+        Agrega una página con contenido renderizado por otro PDFReport.
+        
+        La página importada ya trae su encabezado; el pie (con el número de
+        página de este documento) se escribe como en cualquier otra página.
+        """
+        self._importando = True
+        try:
+            self.add_page()
+        finally:
+            self._importando = False
+        # q ... Q deja el estado gráfico (fuente, colores) como fpdf lo espera
+        self.pages[self.page].contents += b'q\n' + contenido + b'\nQ\n'
 
 
 class PDFGenerator:
     """Generador de reportes PDF para la aplicación"""
     
+    # Filas leídas de SQLite por bloque en los reportes detallados
+    TAM_BLOQUE = 500
+    
     def __init__(self):
         self.output_dir = self._get_output_directory()
+        self.cache = ReportCache(self.output_dir)
     
     def _get_output_directory(self):
         """Obtiene el directorio de salida para los PDFs"""
-        if ANDROID_AVAILABLE:
-            try:
-                from android.storage import primary_external_storage_path
-                base_path = primary_external_storage_path()
-                pdf_dir = os.path.join(base_path, 'Documents', 'FactoryReports')
-            except:
-                pdf_dir = os.path.join(os.path.expanduser('~'), 'FactoryReports')
-        else:
-            pdf_dir = os.path.join(os.path.expanduser('~'), 'FactoryReports')
-        
-        os.makedirs(pdf_dir, exist_ok=True)
-        return pdf_dir
+        return get_output_directory()
     
     def format_guaranies(self, valor):
         """Formatea número a formato Guaraníes"""
@@ -114,7 +287,56 @@ class PDFGenerator:
             valor = 0
         return f"Gs. {valor:,.0f}".replace(",", ".")
     
-    def generar_reporte_mensual(self, db, mes=None, anio=None):
+    def generar_reporte(self, db, tipo='mensual', mes=None, anio=None, progreso=None, **kwargs):
+        """
+        Devuelve el reporte pedido, generándolo solo si los datos cambiaron.
+        
+        La clave de caché es (tipo, período, versión de los datos hasta el fin
+        del período, fuentes): un mes cerrado sin cambios devuelve el PDF
+        existente al instante y no se acumulan copias en FactoryReports.
+        
+        Args:
+            db: Instancia de DatabaseManager
+            tipo: 'mensual', 'detallado' o 'anual'
+            mes: Mes del reporte (default: mes actual; se ignora en 'anual')
+            anio: Año del reporte (default: año actual)
+            progreso: Callback opcional progreso(fraccion, etapa)
+            **kwargs: Opciones del generador (p. ej. procesos para 'anual')
+        
+        Returns:
+            str: Ruta del archivo PDF
+        """
+        if progreso is None:
+            progreso = lambda fraccion, etapa='': None
+        if mes is None:
+            mes = datetime.now().month
+        if anio is None:
+            anio = datetime.now().year
+        
+        # Con la instrumentación activa se mide cada etapa informada a progreso
+        with instrumentacion.etapas('pdf', tipo, progreso) as progreso:
+            if tipo == 'anual':
+                periodo, version = f'{anio:04d}', db.get_version_datos(anio)
+            else:
+                periodo, version = f'{anio:04d}_{mes:02d}', db.get_version_datos(anio, mes)
+            
+            fuentes = registro_fuentes.firma
+            filepath = self.cache.buscar(tipo, periodo, version, fuentes)
+            if filepath is not None:
+                progreso(1.0, 'Sin cambios desde el último reporte')
+                return filepath
+            
+            if tipo == 'anual':
+                generado = self.generar_reporte_anual(db, anio, progreso=progreso, **kwargs)
+            elif tipo == 'detallado':
+                generado = self.generar_reporte_detallado(db, mes, anio, progreso=progreso, **kwargs)
+            elif tipo == 'mensual':
+                generado = self.generar_reporte_mensual(db, mes, anio, progreso=progreso, **kwargs)
+            else:
+                raise ValueError(f"Tipo de reporte desconocido: {tipo}")
+            return self.cache.guardar(tipo, periodo, version, generado, fuentes)
+    
+    def generar_reporte_mensual(self, db, mes=None, anio=None, progreso=None):
         """
         Genera un reporte mensual en PDF
         
@@ -122,18 +344,26 @@ class PDFGenerator:
             db: Instancia de DatabaseManager
             mes: Mes del reporte (default: mes actual)
             anio: Año del reporte (default: año actual)
+            progreso: Callback opcional progreso(fraccion, etapa) entre etapas
         
         Returns:
             str: Ruta del archivo PDF generado
         """
+        if progreso is None:
+            progreso = lambda fraccion, etapa='': None
         if mes is None:
             mes = datetime.now().month
         if anio is None:
             anio = datetime.now().year
         
+        progreso(0.1, 'Consultando datos')
         resumen = db.get_resumen_mes(mes, anio)
-        balance_total = db.get_balance_actual()
+        # Saldo al cierre del mes (en el mes en curso, el saldo actual): así el
+        # reporte de un mes cerrado no cambia con los movimientos posteriores
+        ultimo_dia = calendar.monthrange(anio, mes)[1]
+        balance_total = db.get_balance_en(f'{anio:04d}-{mes:02d}-{ultimo_dia:02d}')
         
+        progreso(0.3, 'Armando páginas')
         pdf = PDFReport()
         pdf.add_page()
         
@@ -159,16 +389,247 @@ class PDFGenerator:
         pdf.add_resumen_box('SALDO TOTAL', self.format_guaranies(balance_total), (111, 66, 193))
         
         pdf.ln(10)
-        pdf.set_font('Arial', 'I', 8)
+        pdf.set_font(pdf.familia, 'I', 8)
         pdf.set_text_color(128, 128, 128)
         pdf.cell(0, 5, '* Los cálculos de costo por unidad incluyen todos los gastos de fábrica del mes.', 0, 1, 'L')
-        pdf.cell(0, 5, '* El balance acumulado representa el saldo histórico de ingresos menos gastos.', 0, 1, 'L')
+        pdf.cell(0, 5, '* El balance acumulado representa el saldo histórico de ingresos menos gastos al cierre del mes.', 0, 1, 'L')
         
+        progreso(0.7, 'Escribiendo PDF')
         filename = f"Reporte_Fabrica_{anio}_{mes:02d}_{datetime.now().strftime('%H%M%S')}.pdf"
         filepath = os.path.join(self.output_dir, filename)
         pdf.output(filepath)
+        return self._terminar(filepath, progreso)
+    
+    def generar_reporte_detallado(self, db, mes=None, anio=None, progreso=None):
+        """
+        Genera el reporte mensual con el detalle de cada venta, gasto y producción
         
-        return filepath
+        Las filas se leen por bloques (db.iter_detalle_mes) y se escriben en el
+        PDF a medida que llegan, con subtotales por página y por categoría.
+        
+        Args:
+            db: Instancia de DatabaseManager
+            mes: Mes del reporte (default: mes actual)
+            anio: Año del reporte (default: año actual)
+            progreso: Callback opcional progreso(fraccion, etapa)
+        
+        Returns:
+            str: Ruta del archivo PDF generado
+        """
+        if progreso is None:
+            progreso = lambda fraccion, etapa='': None
+        if mes is None:
+            mes = datetime.now().month
+        if anio is None:
+            anio = datetime.now().year
+        
+        pdf = PDFReport()
+        pdf.add_page()
+        nombre_mes = self._get_nombre_mes(mes)
+        self._escribir_detalle_mes(pdf, db, mes, anio, f'REPORTE DETALLADO - {nombre_mes} {anio}', progreso)
+        
+        progreso(0.92, 'Escribiendo PDF')
+        filename = f"Reporte_Detallado_{anio}_{mes:02d}_{datetime.now().strftime('%H%M%S')}.pdf"
+        filepath = os.path.join(self.output_dir, filename)
+        pdf.output(filepath)
+        return self._terminar(filepath, progreso)
+    
+    def generar_reporte_anual(self, db, anio=None, procesos=None, progreso=None):
+        """
+        Genera el reporte anual: portada con el resumen del año, índice y el
+        detalle de los doce meses.
+        
+        Cada mes se consulta y se renderiza en un proceso aparte, con su propia
+        conexión de solo lectura; este proceso solo une las páginas
+        (scripts/benchmark_reporte_anual.py compara contra una sola corrida en
+        serie). Dentro de la app y donde no hay procesos (Android) los meses se
+        renderizan aquí uno tras otro.
+        
+        Args:
+            db: Instancia de DatabaseManager
+            anio: Año del reporte (default: año actual)
+            procesos: Procesos trabajadores (1 = sin pool). Por defecto, los
+                núcleos disponibles si este proceso no tiene otros hilos (línea de
+                comandos) y 1 si los tiene (la app, con sus colas de trabajo)
+            progreso: Callback opcional progreso(fraccion, etapa)
+        
+        Returns:
+            str: Ruta del archivo PDF generado
+        """
+        if progreso is None:
+            progreso = lambda fraccion, etapa='': None
+        if anio is None:
+            anio = datetime.now().year
+        
+        progreso(0.02, 'Renderizando meses')
+        meses = self._renderizar_meses(db, anio, procesos, progreso)
+        saldo_cierre = db.get_balance_en(f'{anio:04d}-12-31')
+        
+        progreso(0.9, 'Uniendo páginas')
+        fmt = self.format_guaranies
+        pdf = PDFReport()
+        
+        # Portada
+        pdf.add_page()
+        pdf.chapter_title(f'REPORTE ANUAL {anio}')
+        ventas = sum(meses[mes][0]['ventas'] for mes in meses)
+        gastos = sum(meses[mes][0]['gastos'] for mes in meses)
+        unidades = sum(meses[mes][0]['unidades_producidas'] for mes in meses)
+        pdf.add_resumen_box('TOTAL DE VENTAS', fmt(ventas), (40, 167, 69))
+        pdf.add_resumen_box('TOTAL DE GASTOS', fmt(gastos), (220, 53, 69))
+        pdf.add_resumen_box('BALANCE DEL AÑO', fmt(ventas - gastos),
+                            (40, 167, 69) if ventas >= gastos else (220, 53, 69))
+        pdf.add_resumen_box('UNIDADES PRODUCIDAS', f'{unidades} unidades', (0, 123, 255))
+        pdf.add_resumen_box('SALDO AL CIERRE', fmt(saldo_cierre), (111, 66, 193))
+        pdf.ln(5)
+        
+        columnas = [('Mes', 40, 'L'), ('Ventas', 40, 'R'), ('Gastos', 40, 'R'),
+                    ('Balance', 40, 'R'), ('Unidades', 20, 'R')]
+        pdf._encabezado_tabla(columnas, 6)
+        for mes in range(1, 13):
+            resumen = meses[mes][0]
+            pdf._fila_tabla(columnas, [self._get_nombre_mes(mes), fmt(resumen['ventas']),
+                                       fmt(resumen['gastos']), fmt(resumen['balance']),
+                                       str(resumen['unidades_producidas'])], 5)
+        pdf.set_font(pdf.familia, 'B', 8)
+        pdf._fila_tabla(columnas, ['TOTAL', fmt(ventas), fmt(gastos), fmt(ventas - gastos), str(unidades)], 6)
+        
+        # Índice: las páginas de cada mes ya se conocen, se numera sin segunda pasada
+        pdf.add_page()
+        pdf.chapter_title('ÍNDICE')
+        pdf.set_font(pdf.familia, '', 10)
+        pdf.set_text_color(33, 37, 41)
+        enlaces = {}
+        pagina = pdf.page + 1
+        for mes in range(1, 13):
+            enlaces[mes] = pdf.add_link()
+            pdf.cell(150, 8, f'{self._get_nombre_mes(mes)} {anio}', link=enlaces[mes],
+                     new_x=XPos.RIGHT, new_y=YPos.TOP)
+            pdf.cell(30, 8, str(pagina), align='R', link=enlaces[mes],
+                     new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            pagina += len(meses[mes][1])
+        
+        for mes in range(1, 13):
+            pdf.registrar_glifos(meses[mes][2])
+            for n, contenido in enumerate(meses[mes][1]):
+                pdf.importar_pagina(zlib.decompress(contenido))
+                if n == 0:
+                    pdf.set_link(enlaces[mes], page=pdf.page)
+                    pdf.start_section(f'{self._get_nombre_mes(mes)} {anio}')
+        
+        progreso(0.95, 'Escribiendo PDF')
+        filename = f"Reporte_Anual_{anio}_{datetime.now().strftime('%H%M%S')}.pdf"
+        filepath = os.path.join(self.output_dir, filename)
+        pdf.output(filepath)
+        return self._terminar(filepath, progreso)
+    
+    def _renderizar_meses(self, db, anio, procesos, progreso):
+        """
+        Renderiza los doce meses del año, en paralelo si hay procesos.
+        
+        Returns:
+            dict: mes -> [resumen, [contenido comprimido de cada página], glifos usados]
+        """
+        tareas = [(type(db), db.db_path, mes, anio) for mes in range(1, 13)]
+        if procesos is None:
+            # En la app corren la cola de reportes, el hilo de la base y la
+            # escritura agrupada; un hijo spawn además reimportaría main.py
+            procesos = (os.cpu_count() or 1) if threading.active_count() == 1 else 1
+        procesos = min(procesos, len(tareas))
+        
+        meses = {}
+        
+        def recibir(resultado):
+            mes, *datos = resultado
+            meses[mes] = datos
+            progreso(0.02 + 0.85 * len(meses) / len(tareas), f'{self._get_nombre_mes(mes)} listo')
+        
+        executor = None
+        if procesos > 1:
+            try:
+                # spawn: cada hijo es un intérprete nuevo; con fork heredaría
+                # locks tomados por otros hilos en el momento de crearlo
+                executor = ProcessPoolExecutor(max_workers=procesos,
+                                               mp_context=multiprocessing.get_context('spawn'))
+            except (ValueError, OSError, ImportError, NotImplementedError) as e:
+                print(f"[WARNING] Reporte anual sin procesos paralelos: {e}")
+        
+        if executor is not None:
+            try:
+                futuros = [executor.submit(_renderizar_mes_anual, *tarea) for tarea in tareas]
+                for futuro in as_completed(futuros):
+                    recibir(futuro.result())
+            except BrokenProcessPool as e:
+                print(f"[WARNING] Se interrumpió un proceso del reporte anual: {e}")
+            finally:
+                # Si se canceló, los meses que no empezaron no llegan a ejecutarse
+                executor.shutdown(wait=True, cancel_futures=True)
+        
+        # Sin pool, o los meses que no entregó un pool interrumpido
+        for tarea in tareas:
+            if tarea[2] not in meses:
+                recibir(_renderizar_mes_anual(*tarea))
+        return meses
+    
+    def _escribir_detalle_mes(self, pdf, db, mes, anio, titulo, progreso):
+        """
+        Escribe en pdf (desde la página actual) el resumen y las tablas de
+        ventas, gastos y producción del mes. Lo usan el reporte detallado y
+        cada mes del reporte anual.
+        
+        Returns:
+            dict: Resumen del mes (db.get_resumen_mes)
+        """
+        progreso(0.02, 'Consultando datos')
+        resumen = db.get_resumen_mes(mes, anio)
+        cantidades = {tabla: db.contar_detalle_mes(tabla, mes, anio)
+                      for tabla in ('ventas', 'gastos', 'produccion')}
+        total_filas = max(sum(cantidades.values()), 1)
+        hechas = [0]
+        
+        def filas(tabla, convertir, etapa):
+            for bloque in db.iter_detalle_mes(tabla, mes, anio, tam_bloque=self.TAM_BLOQUE):
+                for fila in bloque:
+                    yield convertir(fila)
+                hechas[0] += len(bloque)
+                progreso(0.05 + 0.85 * hechas[0] / total_filas, etapa)
+        
+        fmt = self.format_guaranies
+        pdf.chapter_title(titulo)
+        pdf.add_resumen_box('TOTAL DE VENTAS', fmt(resumen['ventas']), (40, 167, 69))
+        pdf.add_resumen_box('TOTAL DE GASTOS', fmt(resumen['gastos']), (220, 53, 69))
+        pdf.add_resumen_box('UNIDADES PRODUCIDAS', f"{resumen['unidades_producidas']} unidades", (0, 123, 255))
+        
+        # Ventas: (id, fecha, producto_id, producto, cantidad, precio_unitario, total, cliente, ticket_id)
+        pdf.add_page()
+        pdf.chapter_title(f"VENTAS ({cantidades['ventas']})")
+        columnas = [('Fecha', 28, 'L'), ('Producto', 44, 'L'), ('Cliente', 38, 'L'),
+                    ('Cant.', 14, 'R'), ('P. Unit.', 26, 'R'), ('Total', 30, 'R')]
+        _, _, por_producto = pdf.tabla_paginada(columnas, filas('ventas', lambda v: (
+            [v[1][:16], v[3] or '-', v[7] or '', str(v[4]), fmt(v[5]), fmt(v[6])], v[6] or 0, v[3]
+        ), 'Ventas'), fmt)
+        pdf.tabla_subtotales('Producto', por_producto, fmt)
+        
+        # Gastos: (id, fecha, concepto, monto, categoria, descripcion)
+        pdf.add_page()
+        pdf.chapter_title(f"GASTOS ({cantidades['gastos']})")
+        columnas = [('Fecha', 28, 'L'), ('Concepto', 62, 'L'), ('Categoría', 56, 'L'), ('Monto', 34, 'R')]
+        _, _, por_categoria = pdf.tabla_paginada(columnas, filas('gastos', lambda g: (
+            [g[1][:16], g[2] or '', g[4] or '-', fmt(g[3])], g[3] or 0, g[4]
+        ), 'Gastos'), fmt)
+        pdf.tabla_subtotales('Categoría', por_categoria, fmt)
+        
+        # Producción: (id, fecha, producto_id, producto, cantidad, costo_total)
+        pdf.add_page()
+        pdf.chapter_title(f"PRODUCCIÓN ({cantidades['produccion']})")
+        columnas = [('Fecha', 28, 'L'), ('Producto', 86, 'L'), ('Costo', 36, 'R'), ('Cantidad', 30, 'R')]
+        unidades = lambda valor: f'{valor:,.0f}'.replace(',', '.')
+        _, _, por_producto = pdf.tabla_paginada(columnas, filas('produccion', lambda p: (
+            [p[1][:16], p[3] or '-', fmt(p[5]), str(p[4])], p[4] or 0, p[3]
+        ), 'Producción'), unidades)
+        pdf.tabla_subtotales('Producto', por_producto, unidades)
+        
+        return resumen
     
     def compartir_pdf_android(self, filepath):
         """
@@ -216,7 +677,7 @@ class PDFGenerator:
             
             chooser = Intent.createChooser(intent, 'Compartir Reporte PDF')
             activity.startActivity(chooser)
-            
+        
         except Exception as e:
             print(f"[ERROR] Error al compartir PDF: {e}")
             if PLYER_AVAILABLE:
@@ -225,6 +686,19 @@ class PDFGenerator:
                 except:
                     pass
     
+    @staticmethod
+    def _terminar(filepath, progreso):
+        """Último aviso de avance; si con él se cancela el trabajo, el PDF ya escrito se borra"""
+        try:
+            progreso(1.0, 'Listo')
+        except BaseException:
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+            raise
+        return filepath
+    
     def _get_nombre_mes(self, mes):
         """Devuelve el nombre del mes en español"""
         meses = {
@@ -235,9 +709,34 @@ class PDFGenerator:
         return meses.get(mes, 'Mes desconocido')
 
 
+def _renderizar_mes_anual(clase_db, db_path, mes, anio):
+    """
+    Trabajo de un proceso del reporte anual: abre la base en solo lectura,
+    renderiza el detalle del mes y devuelve sus páginas comprimidas junto con
+    los glifos que usan (el documento final debe incluirlos).
+    
+    Returns:
+        tuple: (mes, resumen, [contenido comprimido de cada página], glifos usados)
+    """
+    db = clase_db(db_path, solo_lectura=True)
+    try:
+        generador = PDFGenerator()
+        pdf = PDFReport(con_pie=False)
+        pdf.add_page()
+        resumen = generador._escribir_detalle_mes(
+            pdf, db, mes, anio, f'{generador._get_nombre_mes(mes).upper()} {anio}',
+            lambda fraccion, etapa='': None
+        )
+    finally:
+        db.close()
+    # Nivel 1: solo para achicar lo que viaja entre procesos
+    paginas = [zlib.compress(contenido, 1) for contenido in pdf.contenido_paginas()]
+    return mes, resumen, paginas, pdf.glifos_usados()
+
+
 def generar_y_compartir_pdf(db):
     """Genera PDF y lo comparte (función de conveniencia)"""
     generator = PDFGenerator()
-    filepath = generator.generar_reporte_mensual(db)
+    filepath = generator.generar_reporte(db)
     generator.compartir_pdf_android(filepath)
     return filepath
@@ -0,0 +1,136 @@
+"""
+================================================================================
+MÓDULO REPORT CACHE - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Caché de reportes PDF direccionada por contenido. Cada archivo se nombra con
+el hash de (tipo de reporte, período, versión de los datos, fuentes); si el
+período no cambió, se devuelve el PDF existente en lugar de generarlo otra
+vez. Los archivos de la caché viven en su propia subcarpeta de FactoryReports
+y solo ellos se eliminan al superar la antigüedad o el tamaño máximo.
+================================================================================
+"""
+
+import hashlib
+import os
+import re
+import time
+
+
+class ReportCache:
+    """Reportes PDF ya generados, indexados por su clave de contenido"""
+    
+    # Límites por defecto del directorio de reportes
+    MAX_BYTES = 200 * 1024 * 1024
+    MAX_DIAS = 90
+    
+    # Cambiar si cambia el diseño de los reportes, para no servir PDFs viejos
+    FORMATO = 2
+    
+    # Subcarpeta de la caché dentro de la carpeta de reportes: los PDF que el
+    # usuario guarda en FactoryReports nunca entran en la limpieza
+    SUBCARPETA = 'cache'
+    
+    # Nombre de los archivos que crea ruta(); limpiar() no toca otros
+    PATRON_ARCHIVO = re.compile(r'Reporte_[A-Za-z]+_[0-9_]+_[0-9a-f]{12}\.pdf')
+    
+    def __init__(self, directorio, max_bytes=None, max_dias=None):
+        """
+        Args:
+            directorio: Carpeta de los reportes (normalmente FactoryReports);
+                la caché usa su subcarpeta SUBCARPETA
+            max_bytes: Tamaño total máximo de los reportes en caché (default: MAX_BYTES)
+            max_dias: Antigüedad máxima desde el último uso (default: MAX_DIAS)
+        """
+        self.directorio = os.path.join(directorio, self.SUBCARPETA)
+        self.max_bytes = max_bytes if max_bytes is not None else self.MAX_BYTES
+        self.max_dias = max_dias if max_dias is not None else self.MAX_DIAS
+    
+    def ruta(self, tipo, periodo, version, fuentes=''):
+        """
+        Ruta del reporte para una clave, exista o no.
+        
+        Args:
+            tipo: 'mensual', 'detallado', 'anual'...
+            periodo: Texto del período, p. ej. '2024_05' o '2024'
+            version: Versión de los datos del período (DatabaseManager.get_version_datos)
+            fuentes: Fuentes con que se dibuja el reporte (FontRegistry.firma):
+                con otras fuentes el mismo período es otro PDF
+        """
+        clave = f'{tipo}|{periodo}|{version}|{fuentes}|{self.FORMATO}'
+        digesto = hashlib.sha1(clave.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.directorio, f'Reporte_{tipo.capitalize()}_{periodo}_{digesto}.pdf')
+    
+    def buscar(self, tipo, periodo, version, fuentes=''):
+        """
+        Devuelve la ruta del reporte si ya fue generado, o None.
+        
+        Un acierto renueva la fecha del archivo, así la limpieza por antigüedad
+        elimina primero lo que no se usa.
+        """
+        ruta = self.ruta(tipo, periodo, version, fuentes)
+        try:
+            os.utime(ruta)
+        except OSError:
+            return None
+        return ruta
+    
+    def guardar(self, tipo, periodo, version, generado, fuentes=''):
+        """
+        Mueve un PDF recién generado a su ruta de caché y aplica la limpieza.
+        
+        Args:
+            generado: Ruta del archivo recién escrito
+        
+        Returns:
+            str: Ruta definitiva del reporte
+        """
+        ruta = self.ruta(tipo, periodo, version, fuentes)
+        os.makedirs(self.directorio, exist_ok=True)
+        os.replace(generado, ruta)
+        self.limpiar(conservar=ruta)
+        return ruta
+    
+    def limpiar(self, conservar=None):
+        """
+        Elimina reportes de la caché sin uso hace más de max_dias y, si aún
+        se supera max_bytes, los menos usados recientemente.
+        
+        Args:
+            conservar: Ruta que no se elimina (el reporte recién entregado)
+        
+        Returns:
+            int: Archivos eliminados
+        """
+        archivos = []
+        try:
+            nombres = os.listdir(self.directorio)
+        except OSError:
+            nombres = []
+        for nombre in nombres:
+            if not self.PATRON_ARCHIVO.fullmatch(nombre):
+                continue
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                datos = os.stat(ruta)
+            except OSError:
+                continue
+            archivos.append((datos.st_mtime, datos.st_size, ruta))
+        archivos.sort()
+        
+        limite = time.time() - self.max_dias * 86400
+        total = sum(tamanio for _, tamanio, _ in archivos)
+        eliminados = 0
+        for modificado, tamanio, ruta in archivos:
+            if ruta == conservar:
+                continue
+            if modificado >= limite and total <= self.max_bytes:
+                break
+            try:
+                os.remove(ruta)
+            except OSError as e:
+                print(f"[WARNING] No se pudo eliminar el reporte {ruta}: {e}")
+                continue
+            total -= tamanio
+            eliminados += 1
+        return eliminados
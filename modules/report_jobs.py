@@ -0,0 +1,160 @@
+"""
+================================================================================
+MÓDULO REPORT JOBS - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Cola de generación de reportes en segundo plano. Los trabajos corren de a uno
+en un hilo propio (con su propia conexión SQLite), informan su avance y se
+pueden cancelar; la interfaz recibe los avisos a través de `despachar`.
+================================================================================
+"""
+
+import itertools
+import queue
+import threading
+
+
+class ReporteCancelado(Exception):
+    """El trabajo fue cancelado antes de terminar"""
+
+
+class TrabajoReporte:
+    """Un reporte encolado: estado, avance y resultado"""
+    
+    PENDIENTE = 'pendiente'
+    EJECUTANDO = 'ejecutando'
+    COMPLETADO = 'completado'
+    CANCELADO = 'cancelado'
+    ERROR = 'error'
+    
+    def __init__(self, id, descripcion, funcion, args, kwargs, al_progreso, al_terminar, al_fallar):
+        self.id = id
+        self.descripcion = descripcion
+        self.estado = self.PENDIENTE
+        self.progreso = 0.0
+        self.etapa = ''
+        self.resultado = None
+        self.error = None
+        self._funcion = funcion
+        self._args = args
+        self._kwargs = kwargs
+        self._al_progreso = al_progreso
+        self._al_terminar = al_terminar
+        self._al_fallar = al_fallar
+        self._cancelar = threading.Event()
+    
+    def cancelar(self):
+        """Pide la cancelación; se hace efectiva en el próximo punto de avance"""
+        self._cancelar.set()
+    
+    @property
+    def cancelado(self):
+        return self._cancelar.is_set()
+    
+    @property
+    def terminado(self):
+        return self.estado in (self.COMPLETADO, self.CANCELADO, self.ERROR)
+
+
+class ReportJobQueue:
+    """
+    Cola FIFO de reportes atendida por un hilo trabajador.
+    
+    La función de cada trabajo recibe un argumento `progreso(fraccion, etapa)`;
+    cada llamada actualiza el trabajo, avisa a la interfaz y es además el punto
+    donde se aplica una cancelación pendiente.
+    """
+    
+    def __init__(self, despachar=None):
+        """
+        Args:
+            despachar: Función que ejecuta un callable en el hilo de la interfaz
+                (en Kivy, vía Clock.schedule_once). Si es None, los callbacks
+                corren en el hilo trabajador.
+        """
+        self._despachar = despachar or (lambda funcion: funcion())
+        self._cola = queue.Queue()
+        self._trabajos = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._hilo = None
+    
+    def encolar(self, funcion, *args, descripcion='', al_progreso=None, al_terminar=None,
+                al_fallar=None, **kwargs):
+        """
+        Encola funcion(*args, progreso=..., **kwargs).
+        
+        Args:
+            descripcion: Texto para mostrar en la interfaz
+            al_progreso: Callback al_progreso(trabajo) en cada avance
+            al_terminar: Callback al_terminar(trabajo) al completarse
+            al_fallar: Callback al_fallar(trabajo) si falla o se cancela
+        
+        Returns:
+            TrabajoReporte: El trabajo encolado
+        """
+        trabajo = TrabajoReporte(next(self._ids), descripcion, funcion, args, kwargs,
+                                 al_progreso, al_terminar, al_fallar)
+        with self._lock:
+            self._trabajos.append(trabajo)
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._atender, name='reportes', daemon=True)
+                self._hilo.start()
+        self._cola.put(trabajo)
+        return trabajo
+    
+    def pendientes(self):
+        """Trabajos encolados o en ejecución"""
+        with self._lock:
+            return [t for t in self._trabajos if not t.terminado]
+    
+    def cancelar_todos(self):
+        for trabajo in self.pendientes():
+            trabajo.cancelar()
+    
+    def cerrar(self, timeout=5):
+        """Cancela lo pendiente y detiene el hilo trabajador"""
+        self.cancelar_todos()
+        with self._lock:
+            hilo = self._hilo
+        if hilo is not None:
+            self._cola.put(None)
+            hilo.join(timeout)
+    
+    def _atender(self):
+        while True:
+            trabajo = self._cola.get()
+            if trabajo is None:
+                return
+            self._ejecutar(trabajo)
+            with self._lock:
+                # Conservar solo los trabajos que la interfaz todavía puede consultar
+                self._trabajos = [t for t in self._trabajos if not t.terminado]
+    
+    def _ejecutar(self, trabajo):
+        def progreso(fraccion, etapa=''):
+            if trabajo.cancelado:
+                raise ReporteCancelado()
+            trabajo.progreso = fraccion
+            trabajo.etapa = etapa
+            self._avisar(trabajo._al_progreso, trabajo)
+        
+        try:
+            trabajo.estado = TrabajoReporte.EJECUTANDO
+            progreso(0.0, 'Iniciando')
+            trabajo.resultado = trabajo._funcion(*trabajo._args, progreso=progreso, **trabajo._kwargs)
+            trabajo.progreso = 1.0
+            trabajo.estado = TrabajoReporte.COMPLETADO
+            self._avisar(trabajo._al_terminar, trabajo)
+        except ReporteCancelado:
+            trabajo.estado = TrabajoReporte.CANCELADO
+            self._avisar(trabajo._al_fallar, trabajo)
+        except Exception as e:
+            trabajo.error = e
+            trabajo.estado = TrabajoReporte.ERROR
+            print(f"[ERROR] Reporte '{trabajo.descripcion}' fallido: {e}")
+            self._avisar(trabajo._al_fallar, trabajo)
+    
+    def _avisar(self, callback, trabajo):
+        if callback is not None:
+            self._despachar(lambda: callback(trabajo))
@@ -0,0 +1,74 @@
+"""
+================================================================================
+MÓDULO STARTUP - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Medición del arranque en frío: marca el tiempo de cada etapa (imports, base
+de datos, kv, primer frame) desde el inicio del proceso, lo muestra en la
+consola y lo agrega a un archivo para comparar entre versiones.
+================================================================================
+"""
+
+import json
+import os
+import time
+
+
+class StartupTimer:
+    """Marcas de tiempo de las etapas del arranque"""
+    
+    def __init__(self, inicio=None):
+        """
+        Args:
+            inicio: time.perf_counter() del comienzo (default: ahora)
+        """
+        self.inicio = inicio if inicio is not None else time.perf_counter()
+        self._anterior = self.inicio
+        # [(etapa, duración de la etapa, acumulado)] en segundos
+        self.etapas = []
+        self.terminado = False
+    
+    def marcar(self, etapa):
+        """Registra el fin de una etapa; su duración es desde la marca anterior"""
+        ahora = time.perf_counter()
+        self.etapas.append((etapa, ahora - self._anterior, ahora - self.inicio))
+        self._anterior = ahora
+    
+    @property
+    def total(self):
+        """Segundos desde el inicio hasta la última marca"""
+        return self.etapas[-1][2] if self.etapas else 0.0
+    
+    def desglose(self):
+        """Líneas de texto con la duración de cada etapa"""
+        lineas = [f"[STARTUP] {etapa:<20} {duracion * 1000:8.1f} ms  (t={acumulado * 1000:.1f} ms)"
+                  for etapa, duracion, acumulado in self.etapas]
+        lineas.append(f"[STARTUP] {'total':<20} {self.total * 1000:8.1f} ms")
+        return lineas
+    
+    def terminar(self, archivo=None):
+        """
+        Muestra el desglose y, si se indica, lo agrega como una línea JSON.
+        
+        Args:
+            archivo: Ruta del historial de arranques (una línea por arranque)
+        """
+        if self.terminado:
+            return
+        self.terminado = True
+        for linea in self.desglose():
+            print(linea)
+        if archivo is None:
+            return
+        
+        registro = {
+            'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'total_ms': round(self.total * 1000, 1),
+            'etapas': {etapa: round(duracion * 1000, 1) for etapa, duracion, _ in self.etapas},
+        }
+        try:
+            os.makedirs(os.path.dirname(archivo) or '.', exist_ok=True)
+            with open(archivo, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"[WARNING] No se pudo guardar el tiempo de arranque: {e}")
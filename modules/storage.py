@@ -0,0 +1,33 @@
+"""
+================================================================================
+MÓDULO STORAGE - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Rutas de salida compartidas por los reportes PDF y las exportaciones.
+================================================================================
+"""
+
+import os
+
+# Importar Android-specific para el almacenamiento externo
+try:
+    import jnius  # noqa: F401
+    ANDROID_AVAILABLE = True
+except ImportError:
+    ANDROID_AVAILABLE = False
+
+
+def get_output_directory():
+    """Obtiene (y crea) el directorio de salida para reportes y exportaciones"""
+    if ANDROID_AVAILABLE:
+        try:
+            from android.storage import primary_external_storage_path
+            base_path = primary_external_storage_path()
+            output_dir = os.path.join(base_path, 'Documents', 'FactoryReports')
+        except:
+            output_dir = os.path.join(os.path.expanduser('~'), 'FactoryReports')
+    else:
+        output_dir = os.path.join(os.path.expanduser('~'), 'FactoryReports')
+    
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
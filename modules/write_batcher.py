@@ -0,0 +1,211 @@
+"""
+================================================================================
+MÓDULO WRITE BATCHER - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Escritura agrupada (group commit) para la carga rápida de ventas, gastos y
+producción. Con el modo activo, add_venta/add_gasto/add_produccion encolan la
+escritura y vuelven enseguida; un hilo propio confirma lo encolado en una sola
+transacción cada max_ms milisegundos o cada max_registros registros.
+
+Durabilidad:
+- Una escritura encolada no está en la base hasta que se confirma su lote y
+  las lecturas no la ven hasta entonces (a lo sumo max_ms después).
+- sincronizar() bloquea hasta que todo lo encolado antes de la llamada está
+  confirmado. La app lo pide al pausarse; close() espera a que el hilo
+  confirme lo pendiente (o levanta TimeoutError sin cerrar las conexiones).
+- Si un lote falla se revierte entero y sus registros se reintentan de a uno:
+  los que vuelven a fallar se informan con al_fallar y el próximo
+  sincronizar() o cerrar() levanta EscriturasDescartadas con todos ellos.
+================================================================================
+"""
+
+import threading
+import time
+from collections import deque
+
+from .instrumentation import instrumentacion
+
+
+class EscriturasDescartadas(Exception):
+    """Escrituras del lote que fallaron también al reintentarlas de a una"""
+    
+    def __init__(self, errores):
+        """
+        Args:
+            errores: Excepción de cada escritura descartada, en orden
+        """
+        self.errores = list(errores)
+        super().__init__(f"{len(self.errores)} escritura(s) descartada(s); última: {self.errores[-1]}")
+
+
+class WriteBatcher:
+    """
+    Cola de escrituras confirmadas por lotes en un hilo dedicado.
+    
+    Cada entrada es (aplicar, dependencias, despues): aplicar(conn) ejecuta
+    las sentencias dentro de la transacción del lote; tras el commit,
+    DatabaseManager invalida la caché según dependencias y corre despues().
+    """
+    
+    def __init__(self, db, max_ms=250, max_registros=100, al_confirmar=None, al_fallar=None,
+                 despachar=None):
+        """
+        Args:
+            db: Instancia de DatabaseManager
+            max_ms: Espera máxima de una escritura encolada antes del commit
+            max_registros: Registros que disparan el commit sin esperar max_ms
+            al_confirmar: Callback al_confirmar(tablas) tras cada lote, con el
+                conjunto de tablas escritas
+            al_fallar: Callback al_fallar(error) por cada registro descartado
+            despachar: Función que ejecuta un callable en el hilo de la interfaz
+                (en Kivy, vía Clock.schedule_once). Si es None, los callbacks
+                corren en el hilo del lote.
+        """
+        self.db = db
+        self.max_ms = max_ms
+        self.max_registros = max_registros
+        self._al_confirmar = al_confirmar
+        self._al_fallar = al_fallar
+        self._despachar = despachar or (lambda funcion: funcion())
+        
+        self._pendientes = deque()
+        self._condicion = threading.Condition()
+        self._encolados = 0
+        self._confirmados = 0
+        self._urgente = False
+        self._activo = True
+        # Errores de las escrituras descartadas desde el último sincronizar()
+        self._errores = []
+        self.lotes = 0
+        
+        self._hilo = threading.Thread(target=self._atender, name='db-lote', daemon=True)
+        self._hilo.start()
+    
+    @property
+    def detenido(self):
+        """True cuando el hilo terminó de confirmar lo pendiente tras cerrar()"""
+        return not self._hilo.is_alive()
+    
+    @property
+    def pendientes(self):
+        """Escrituras encoladas todavía sin confirmar"""
+        return len(self._pendientes)
+    
+    def encolar(self, aplicar, dependencias, despues=None):
+        """
+        Agrega una escritura al próximo lote.
+        
+        Returns:
+            bool: False si el modo agrupado ya se detuvo (escribir directo)
+        """
+        with self._condicion:
+            if not self._activo:
+                return False
+            self._pendientes.append((aplicar, dependencias, despues))
+            self._encolados += 1
+            if len(self._pendientes) == 1 or len(self._pendientes) >= self.max_registros:
+                self._condicion.notify_all()
+        return True
+    
+    def sincronizar(self, timeout=None):
+        """
+        Confirma ya lo encolado y espera el commit (flush síncrono).
+        
+        Raises:
+            TimeoutError: Si el lote no se confirmó en timeout segundos
+            EscriturasDescartadas: Escrituras que fallaron desde la sincronización anterior
+        """
+        with self._condicion:
+            objetivo = self._encolados
+            if self._confirmados < objetivo:
+                self._urgente = True
+                self._condicion.notify_all()
+                if not self._condicion.wait_for(lambda: self._confirmados >= objetivo, timeout):
+                    raise TimeoutError("Las escrituras pendientes no se confirmaron a tiempo")
+            errores, self._errores = self._errores, []
+        if errores:
+            raise EscriturasDescartadas(errores)
+    
+    def cerrar(self, timeout=None):
+        """
+        Deja de aceptar escrituras, confirma lo pendiente y espera al hilo.
+        
+        Args:
+            timeout: Espera máxima en segundos (default: hasta terminar)
+        
+        Raises:
+            TimeoutError: Si el hilo sigue confirmando al vencer timeout; la
+                conexión de la base no debe cerrarse todavía (ver detenido)
+            EscriturasDescartadas: Escrituras que fallaron desde el último sincronizar()
+        """
+        with self._condicion:
+            self._activo = False
+            self._condicion.notify_all()
+        self._hilo.join(timeout)
+        if self._hilo.is_alive():
+            raise TimeoutError(f"Quedan {self.pendientes} escrituras del lote sin confirmar")
+        with self._condicion:
+            errores, self._errores = self._errores, []
+        if errores:
+            raise EscriturasDescartadas(errores)
+    
+    def _atender(self):
+        while True:
+            with self._condicion:
+                self._condicion.wait_for(lambda: self._pendientes or not self._activo)
+                if not self._pendientes:
+                    return
+                # Juntar registros hasta completar el lote o vencer el plazo
+                limite = time.monotonic() + self.max_ms / 1000
+                while self._activo and not self._urgente and len(self._pendientes) < self.max_registros:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._condicion.wait(restante)
+                lote = list(self._pendientes)
+                self._pendientes.clear()
+            
+            self._confirmar(lote)
+            
+            with self._condicion:
+                self._confirmados += len(lote)
+                if not self._pendientes:
+                    self._urgente = False
+                self._condicion.notify_all()
+    
+    def _confirmar(self, lote):
+        inicio = time.perf_counter()
+        conn = self.db.get_connection()
+        try:
+            with conn:
+                for aplicar, _, _ in lote:
+                    aplicar(conn)
+            confirmados = lote
+        except Exception:
+            # Un registro inválido no debe llevarse al resto del lote
+            confirmados = []
+            for entrada in lote:
+                try:
+                    with conn:
+                        entrada[0](conn)
+                    confirmados.append(entrada)
+                except Exception as e:
+                    self._fallo(e)
+        if instrumentacion.activa:
+            instrumentacion.registrar('escritura', 'lote', time.perf_counter() - inicio, len(lote))
+        
+        tablas = set()
+        for _, dependencias, despues in confirmados:
+            self.db._escritura_confirmada(dependencias, despues)
+            tablas.update(tabla for tabla, _ in dependencias)
+        self.lotes += 1
+        if tablas and self._al_confirmar is not None:
+            self._despachar(lambda: self._al_confirmar(tablas))
+    
+    def _fallo(self, error):
+        print(f"[ERROR] Escritura descartada del lote: {error}")
+        with self._condicion:
+            self._errores.append(error)
+        if self._al_fallar is not None:
+            self._despachar(lambda: self._al_fallar(error))
@@ -0,0 +1,303 @@
+"""
+================================================================================
+BENCHMARK - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Mide latencia y rendimiento de los métodos de DatabaseManager y de la
+generación de reportes PDF sobre una base sintética (scripts/datos_sinteticos.py),
+sin interfaz gráfica. Los resultados se comparan con una línea base guardada
+en scripts/baselines/ y las regresiones se muestran como porcentaje.
+
+Las líneas base dependen de la máquina: guardar una por equipo (--guardar)
+antes de comparar.
+
+USO:
+    python scripts/benchmark.py --escala pequena --guardar
+    python scripts/benchmark.py --escala pequena
+    python scripts/benchmark.py --escala mediana --sin-pdf --solo get_balance
+    python scripts/benchmark.py --db factory.db --repeticiones 50
+================================================================================
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from datos_sinteticos import ESCALAS, generar  # noqa: E402
+from modules.database import DatabaseManager  # noqa: E402
+
+DIR_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# Tiempo máximo por benchmark: se corta antes de las repeticiones si se pasa
+PRESUPUESTO_S = 5.0
+
+# Solo se corren los benchmarks cuyo nombre contiene este texto (--solo)
+FILTRO = None
+
+
+class Medicion:
+    """Tiempos de un benchmark"""
+    
+    def __init__(self, nombre, tiempos, unidades=1):
+        self.nombre = nombre
+        self.tiempos = sorted(tiempos)
+        # Operaciones por llamada (filas leídas, por ejemplo), para el rendimiento
+        self.unidades = unidades
+    
+    @property
+    def p50_ms(self):
+        return statistics.median(self.tiempos) * 1000
+    
+    @property
+    def p95_ms(self):
+        return self.tiempos[min(len(self.tiempos) - 1, int(len(self.tiempos) * 0.95))] * 1000
+    
+    @property
+    def ops_s(self):
+        return self.unidades * len(self.tiempos) / sum(self.tiempos) if sum(self.tiempos) else 0
+    
+    def como_dict(self):
+        return {'p50_ms': round(self.p50_ms, 4), 'p95_ms': round(self.p95_ms, 4),
+                'ops_s': round(self.ops_s, 2), 'llamadas': len(self.tiempos)}
+
+
+def medir(nombre, funcion, repeticiones, preparar=None, unidades=1):
+    """
+    Llama a funcion hasta repeticiones veces (o hasta PRESUPUESTO_S) después
+    de una llamada de calentamiento.
+    
+    Args:
+        preparar: Callback opcional antes de cada llamada, fuera de la medición
+            (p. ej. vaciar la caché de consultas)
+        unidades: Operaciones que hace cada llamada
+    """
+    if FILTRO and FILTRO not in nombre:
+        return None
+    if preparar:
+        preparar()
+    funcion()
+    tiempos = []
+    limite = time.perf_counter() + PRESUPUESTO_S
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+        if time.perf_counter() > limite:
+            break
+    return Medicion(nombre, tiempos, unidades)
+
+
+def periodo_de_referencia(db):
+    """(mes, anio) con más ventas; el más reciente si hay empate"""
+    fila = db.get_connection().execute('''
+        SELECT anio, mes FROM resumen_mensual ORDER BY ventas DESC, anio DESC, mes DESC LIMIT 1
+    ''').fetchone()
+    if fila is None:
+        raise SystemExit('La base no tiene transacciones')
+    return fila[1], fila[0]
+
+
+def benchmarks_db(db, repeticiones):
+    """Lecturas y escrituras de DatabaseManager"""
+    mes, anio = periodo_de_referencia(db)
+    fecha_media = db.get_connection().execute(
+        'SELECT fecha FROM balance WHERE id = (SELECT MAX(id) / 2 FROM balance)').fetchone()[0]
+    _, siguiente = db.get_ventas_page(size=50)
+    # Un cursor a mitad del historial: la paginación debe costar lo mismo a cualquier profundidad
+    cursor_profundo = db.get_connection().execute(
+        'SELECT fecha, id FROM ventas ORDER BY fecha, id LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM ventas)'
+    ).fetchone()
+    filas_mes = db.contar_detalle_mes('ventas', mes, anio)
+    producto_id, nombre, codigo = db.get_productos()[0][:3]
+    prefijo = nombre[:3]
+    # Nombre con una letra cambiada: no coincide por prefijo, sí por trigramas
+    aproximada = nombre[:-2] + 'x' + nombre[-1:]
+    db.catalogo.cargar()
+    ticket = [(fila[0], 1, 1000) for fila in db.get_productos()[:10]]
+    cliente = db.get_connection().execute('SELECT cliente FROM ventas ORDER BY id DESC LIMIT 1').fetchone()[0]
+    
+    frio = db.invalidar_cache
+    resultados = [
+        medir('get_productos', db.get_productos, repeticiones, frio),
+        medir('get_productos (caché)', db.get_productos, repeticiones),
+        medir('get_resumen_mes', lambda: db.get_resumen_mes(mes, anio), repeticiones, frio),
+        medir('get_resumen_mes (caché)', lambda: db.get_resumen_mes(mes, anio), repeticiones),
+        medir('get_produccion_mes', lambda: db.get_produccion_mes(mes, anio), repeticiones, frio),
+        medir('get_gastos_mes', lambda: db.get_gastos_mes(mes, anio), repeticiones, frio),
+        medir('get_balance_actual', db.get_balance_actual, repeticiones, frio),
+        medir('get_balance_en', lambda: db.get_balance_en(fecha_media), repeticiones, frio),
+        medir('get_version_datos', lambda: db.get_version_datos(anio), repeticiones),
+        medir('catalogo.cargar', lambda: db.catalogo.cargar(forzar=True), max(repeticiones // 10, 3)),
+        medir('catalogo.buscar (código)', lambda: db.catalogo.buscar(codigo), repeticiones),
+        medir('catalogo.buscar (prefijo)', lambda: db.catalogo.buscar(prefijo), repeticiones),
+        medir('catalogo.buscar (aproximada)', lambda: db.catalogo.buscar(aproximada), repeticiones),
+        medir('get_ventas', db.get_ventas, repeticiones, frio),
+        medir('get_ventas_page (2ª página)', lambda: db.get_ventas_page(siguiente, 50), repeticiones),
+        medir('get_ventas_page (profunda)', lambda: db.get_ventas_page(cursor_profundo, 50), repeticiones),
+        medir('get_gastos', db.get_gastos, repeticiones, frio),
+        medir('buscar ventas (cliente)', lambda: db.buscar(cliente, 'ventas'), repeticiones),
+        medir('buscar ventas (prefijo común)', lambda: db.buscar(prefijo, 'ventas'), repeticiones),
+        medir('buscar gastos', lambda: db.buscar('mant', 'gastos'), repeticiones),
+        medir('buscar productos', lambda: db.buscar(prefijo, 'productos', size=10), repeticiones),
+        medir('contar_detalle_mes', lambda: db.contar_detalle_mes('ventas', mes, anio), repeticiones, frio),
+        medir('iter_detalle_mes (filas/s)',
+              lambda: sum(len(b) for b in db.iter_detalle_mes('ventas', mes, anio)),
+              max(repeticiones // 10, 3), unidades=max(filas_mes, 1)),
+        medir('verificar_resumen_mensual', db.verificar_resumen_mensual, 3),
+        medir('verificar_balance', db.verificar_balance, 3),
+    ]
+    
+    # Escrituras al final: cambian los datos (la base es una copia descartable)
+    resultados += [
+        medir('add_venta', lambda: db.add_venta(producto_id, 1, 1000, 'Benchmark'), repeticiones),
+        medir('add_venta_ticket (10 líneas)', lambda: db.add_venta_ticket(ticket, 'Benchmark'), repeticiones,
+              unidades=len(ticket)),
+        medir('add_gasto', lambda: db.add_gasto('Benchmark', 1000, 'Benchmark', ''), repeticiones),
+        medir('add_produccion', lambda: db.add_produccion(producto_id, 1, 500), repeticiones),
+        medir('update_producto_stock', lambda: db.update_producto_stock(producto_id, 0), repeticiones),
+    ]
+    
+    # Escritura agrupada: encolar un lote de ventas y esperar su commit
+    lote = 1000
+    
+    def ventas_agrupadas():
+        for _ in range(lote):
+            db.add_venta(producto_id, 1, 1000, 'Benchmark')
+        db.sincronizar()
+    
+    db.activar_escritura_agrupada(max_registros=lote)
+    try:
+        resultados.append(medir('add_venta (agrupada)', ventas_agrupadas, max(repeticiones // 20, 3),
+                                unidades=lote))
+    finally:
+        db.desactivar_escritura_agrupada()
+    return resultados
+
+
+def benchmarks_pdf(db, repeticiones):
+    """Generación de reportes, sin la caché de reportes"""
+    from modules.pdf_generator import PDFGenerator
+    
+    mes, anio = periodo_de_referencia(db)
+    generador = PDFGenerator()
+    generador.output_dir = tempfile.mkdtemp(prefix='benchmark_pdf_')
+    
+    def llamar(funcion, *args, **kwargs):
+        return lambda: os.remove(funcion(db, *args, **kwargs))
+    
+    try:
+        return [
+            medir('generar_reporte_mensual', llamar(generador.generar_reporte_mensual, mes, anio),
+                  max(repeticiones // 5, 3)),
+            medir('generar_reporte_detallado', llamar(generador.generar_reporte_detallado, mes, anio), 3),
+            medir('generar_reporte_anual', llamar(generador.generar_reporte_anual, anio, procesos=1), 1),
+        ]
+    finally:
+        shutil.rmtree(generador.output_dir, ignore_errors=True)
+
+
+def comparar(resultados, base, tolerancia):
+    """
+    Muestra cada medición junto a la línea base.
+    
+    Returns:
+        list: Nombres de los benchmarks cuyo p50 empeoró más que tolerancia
+    """
+    resultados = [medicion for medicion in resultados if medicion is not None]
+    regresiones = []
+    print(f"{'Benchmark':<32} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>12} {'vs base':>9}")
+    for medicion in resultados:
+        anterior = base.get(medicion.nombre)
+        cambio = ''
+        if anterior and anterior['p50_ms']:
+            delta = medicion.p50_ms / anterior['p50_ms'] - 1
+            cambio = f'{delta:+.0%}'
+            if delta > tolerancia:
+                regresiones.append(medicion.nombre)
+                cambio += ' !'
+        print(f'{medicion.nombre:<32} {medicion.p50_ms:>10.3f} {medicion.p95_ms:>10.3f} '
+              f'{medicion.ops_s:>12,.1f} {cambio:>9}')
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de DatabaseManager y PDFGenerator')
+    origen = parser.add_mutually_exclusive_group()
+    origen.add_argument('--escala', choices=tuple(ESCALAS), default='pequena',
+                        help='Genera una base sintética de esta escala (default: pequena)')
+    origen.add_argument('--db', help='Usa una copia de esta base en lugar de una sintética')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--anios', type=int, default=3)
+    parser.add_argument('--repeticiones', type=int, default=100)
+    parser.add_argument('--sin-pdf', action='store_true', help='No mide la generación de reportes')
+    parser.add_argument('--solo', help='Solo los benchmarks cuyo nombre contiene este texto')
+    parser.add_argument('--baseline', help='Archivo de línea base (default: scripts/baselines/<escala>.json)')
+    parser.add_argument('--guardar', action='store_true', help='Guarda los resultados como nueva línea base')
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help='Empeoramiento del p50 que cuenta como regresión (default: 0.25 = 25%%)')
+    args = parser.parse_args()
+    global FILTRO
+    FILTRO = args.solo
+    
+    nombre_base = os.path.splitext(os.path.basename(args.db))[0] if args.db else args.escala
+    ruta_base = args.baseline or os.path.join(DIR_BASELINES, f'{nombre_base}.json')
+    
+    directorio = tempfile.mkdtemp(prefix='benchmark_')
+    db_path = os.path.join(directorio, 'benchmark.db')
+    try:
+        if args.db:
+            # Copia consistente aunque la app tenga la base abierta en WAL
+            with sqlite3.connect(args.db) as origen_db, sqlite3.connect(db_path) as destino:
+                origen_db.backup(destino)
+        else:
+            inicio = time.perf_counter()
+            generar(db_path, ESCALAS[args.escala], args.anios, semilla=args.semilla)
+            print(f'Base sintética {args.escala} generada en {time.perf_counter() - inicio:.1f} s')
+        
+        db = DatabaseManager(db_path)
+        try:
+            resultados = benchmarks_db(db, args.repeticiones)
+            if not args.sin_pdf:
+                resultados += benchmarks_pdf(db, args.repeticiones)
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    
+    base = {}
+    if os.path.exists(ruta_base):
+        with open(ruta_base, encoding='utf-8') as f:
+            base = json.load(f)['resultados']
+    regresiones = comparar(resultados, base, args.tolerancia)
+    
+    if args.guardar:
+        os.makedirs(os.path.dirname(ruta_base), exist_ok=True)
+        with open(ruta_base, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'maquina': platform.platform(),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                # Con --solo se actualizan solo esos benchmarks y se conservan los demás
+                'resultados': dict(base, **{m.nombre: m.como_dict() for m in resultados if m is not None}),
+            }, f, ensure_ascii=False, indent=1)
+        print(f'Línea base guardada en {ruta_base}')
+    elif regresiones:
+        print(f'{len(regresiones)} regresiones respecto de {ruta_base}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
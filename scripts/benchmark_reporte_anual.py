@@ -0,0 +1,81 @@
+"""
+================================================================================
+BENCHMARK REPORTE ANUAL - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Mide PDFGenerator.generar_reporte_anual con distinta cantidad de procesos y
+muestra la aceleración respecto a la corrida en serie (1 proceso, sin pool),
+que siempre se mide primero.
+
+USO:
+    python scripts/benchmark_reporte_anual.py --db factory.db --anio 2024
+    python scripts/benchmark_reporte_anual.py --db factory.db --procesos 1,2,4,8
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from modules.database import DatabaseManager  # noqa: E402
+from modules.pdf_generator import PDFGenerator  # noqa: E402
+
+
+def medir(generador, db, anio, procesos, repeticiones):
+    """Mejor tiempo (segundos) de varias corridas"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        ruta = generador.generar_reporte_anual(db, anio, procesos=procesos)
+        tiempos.append(time.perf_counter() - inicio)
+        os.remove(ruta)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del reporte anual en paralelo')
+    parser.add_argument('--db', default='factory.db', help='Base de datos SQLite con datos del año')
+    parser.add_argument('--anio', type=int, default=time.localtime().tm_year)
+    parser.add_argument('--procesos', default=None,
+                        help='Lista separada por comas (default: 1, 2, 4... hasta los núcleos)')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.db):
+        parser.error(f'No existe la base de datos {args.db}')
+    
+    if args.procesos:
+        niveles = sorted({1} | {int(p) for p in args.procesos.split(',')})
+    else:
+        niveles = [1]
+        while niveles[-1] * 2 <= (os.cpu_count() or 1):
+            niveles.append(niveles[-1] * 2)
+    
+    db = DatabaseManager(args.db)
+    generador = PDFGenerator()
+    generador.output_dir = tempfile.mkdtemp(prefix='benchmark_reporte_')
+    
+    filas = sum(db.contar_detalle_mes(tabla, mes, args.anio)
+                for tabla in ('ventas', 'gastos', 'produccion') for mes in range(1, 13))
+    print(f'Reporte anual {args.anio}: {filas} transacciones, {os.cpu_count()} núcleos')
+    print(f"{'Procesos':>8} {'Tiempo (s)':>11} {'Aceleración':>12} {'Eficiencia':>11}")
+    
+    base = None
+    for procesos in niveles:
+        segundos = medir(generador, db, args.anio, procesos, args.repeticiones)
+        base = base or segundos
+        aceleracion = base / segundos
+        etiqueta = 'serie' if procesos == 1 else procesos
+        print(f'{etiqueta:>8} {segundos:>11.2f} {aceleracion:>11.2f}x {aceleracion / procesos:>10.0%}')
+    
+    db.close()
+    os.rmdir(generador.output_dir)
+
+
+if __name__ == '__main__':
+    main()
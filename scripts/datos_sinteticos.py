@@ -0,0 +1,228 @@
+"""
+================================================================================
+DATOS SINTÉTICOS - Gestión Fábrica
+Repositorio: voeseboin-sys/apkgithut
+
+Genera una base de datos con productos, ventas, gastos, producción y libro de
+balance a escala configurable, siempre igual para la misma semilla. Sirve
+para los benchmarks (scripts/benchmark.py) y para probar la app con años de
+historia.
+
+Las filas se insertan por lotes sin triggers ni índices; al final se crean
+los índices y se reconstruyen resumen_mensual, el libro de balance y los
+índices de búsqueda con los mismos métodos de DatabaseManager que usa la app.
+
+USO:
+    python scripts/datos_sinteticos.py sintetico.db --escala pequena
+    python scripts/datos_sinteticos.py sintetico.db --filas 2000000 --anios 5 --semilla 7
+================================================================================
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from modules.database import DatabaseManager  # noqa: E402
+
+
+# Transacciones totales (ventas + gastos + producción) de cada escala
+ESCALAS = {
+    'pequena': 10_000,
+    'mediana': 1_000_000,
+    'grande': 10_000_000,
+}
+
+# Reparto de las transacciones entre tablas
+PROPORCIONES = (('ventas', 0.70), ('gastos', 0.15), ('produccion', 0.15))
+
+CATEGORIAS_PRODUCTO = ('Panificados', 'Lácteos', 'Bebidas', 'Limpieza', 'Envases', 'Insumos')
+GASTOS = (
+    ('Materia prima', 'Insumos'), ('Energía eléctrica', 'Servicios'), ('Agua', 'Servicios'),
+    ('Sueldos', 'Personal'), ('Mantenimiento', 'Equipos'), ('Flete', 'Logística'),
+    ('Alquiler', 'Local'), ('Embalaje', 'Insumos'), ('Impuestos', 'Administración'),
+)
+
+TAM_LOTE = 20_000
+
+
+def _filas_por_dia(total, dias):
+    """Reparte total filas en dias de forma pareja (la diferencia entre días es a lo sumo 1)"""
+    for dia in range(dias):
+        yield total * (dia + 1) // dias - total * dia // dias
+
+
+def _fechas(rnd, inicio, dias, total):
+    """Fechas 'YYYY-MM-DD HH:MM:SS' en orden creciente, repartidas entre los días"""
+    for dia, cantidad in enumerate(_filas_por_dia(total, dias)):
+        prefijo = (inicio + timedelta(days=dia)).isoformat()
+        for segundos in sorted(rnd.randrange(6 * 3600, 22 * 3600) for _ in range(cantidad)):
+            yield f'{prefijo} {segundos // 3600:02d}:{segundos // 60 % 60:02d}:{segundos % 60:02d}'
+
+
+def _lotes(filas, tam=TAM_LOTE):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tam:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def generar(db_path, filas=ESCALAS['pequena'], anios=3, productos=200, clientes=500,
+            semilla=42, hasta=None, progreso=None):
+    """
+    Crea (o reemplaza) una base de datos sintética.
+    
+    Args:
+        db_path: Archivo SQLite a crear; si existe se reemplaza
+        filas: Transacciones totales entre ventas, gastos y producción
+        anios: Años de historia, terminando en hasta
+        productos: Cantidad de productos del catálogo
+        clientes: Cantidad de clientes distintos en las ventas
+        semilla: Semilla del generador (misma semilla = misma base)
+        hasta: Último día con datos (default: 31/12 del año pasado)
+        progreso: Callback opcional progreso(etapa, filas_insertadas)
+    
+    Returns:
+        dict: Filas insertadas por tabla
+    """
+    if progreso is None:
+        progreso = lambda etapa, insertadas: None
+    if hasta is None:
+        hasta = date(date.today().year - 1, 12, 31)
+    inicio = date(hasta.year - anios + 1, 1, 1)
+    dias = (hasta - inicio).days + 1
+    
+    for sufijo in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + sufijo):
+            os.remove(db_path + sufijo)
+    
+    db = DatabaseManager(db_path)
+    conn = db.get_connection()
+    
+    # Carga sin triggers ni índices secundarios: se vuelven a crear al final
+    objetos = conn.execute('''
+        SELECT type, name FROM sqlite_master
+        WHERE type IN ('trigger', 'index') AND sql IS NOT NULL
+    ''').fetchall()
+    with conn:
+        for tipo, nombre in objetos:
+            conn.execute(f'DROP {tipo.upper()} {nombre}')
+    
+    rnd = random.Random(semilla)
+    catalogo = []
+    for i in range(1, productos + 1):
+        precio = rnd.randrange(5_000, 500_000, 500)
+        catalogo.append((f'Producto {i:04d}', f'PROD-{i:04d}', rnd.randrange(0, 1000), precio,
+                         precio * rnd.randrange(45, 75) // 100, rnd.choice(CATEGORIAS_PRODUCTO),
+                         f'{inicio.isoformat()} 08:00:00'))
+    with conn:
+        conn.executemany('''
+            INSERT INTO productos (nombre, codigo, stock, precio_venta, costo_unitario, categoria, fecha_creacion)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', catalogo)
+    nombres_clientes = [f'Cliente {i:04d}' for i in range(1, clientes + 1)]
+    
+    cantidades = {tabla: int(filas * proporcion) for tabla, proporcion in PROPORCIONES}
+    cantidades['ventas'] += filas - sum(cantidades.values())
+    
+    def ventas():
+        # Un generador por tabla: lo que sale en una no depende de cuántas filas tengan las otras
+        rnd_tabla = random.Random(f'{semilla}-ventas')
+        for fecha in _fechas(rnd_tabla, inicio, dias, cantidades['ventas']):
+            producto_id = rnd_tabla.randrange(productos) + 1
+            cantidad = rnd_tabla.randrange(1, 21)
+            precio = catalogo[producto_id - 1][3]
+            yield (producto_id, cantidad, precio, cantidad * precio, fecha, rnd_tabla.choice(nombres_clientes))
+    
+    def gastos():
+        rnd_tabla = random.Random(f'{semilla}-gastos')
+        for fecha in _fechas(rnd_tabla, inicio, dias, cantidades['gastos']):
+            concepto, categoria = rnd_tabla.choice(GASTOS)
+            yield (concepto, rnd_tabla.randrange(50_000, 5_000_000, 1000), categoria, fecha, '')
+    
+    def produccion():
+        rnd_tabla = random.Random(f'{semilla}-produccion')
+        for fecha in _fechas(rnd_tabla, inicio, dias, cantidades['produccion']):
+            producto_id = rnd_tabla.randrange(productos) + 1
+            cantidad = rnd_tabla.randrange(10, 501)
+            yield (producto_id, cantidad, fecha, cantidad * catalogo[producto_id - 1][4])
+    
+    sentencias = {
+        'ventas': ('INSERT INTO ventas (producto_id, cantidad, precio_unitario, total, fecha, cliente) '
+                   'VALUES (?, ?, ?, ?, ?, ?)', ventas),
+        'gastos': ('INSERT INTO gastos (concepto, monto, categoria, fecha, descripcion) '
+                   'VALUES (?, ?, ?, ?, ?)', gastos),
+        'produccion': ('INSERT INTO produccion (producto_id, cantidad, fecha, costo_total) '
+                       'VALUES (?, ?, ?, ?)', produccion),
+    }
+    for tabla, (sql, filas_tabla) in sentencias.items():
+        insertadas = 0
+        for lote in _lotes(filas_tabla()):
+            with conn:
+                conn.executemany(sql, lote)
+            insertadas += len(lote)
+            progreso(tabla, insertadas)
+    
+    # Libro de balance en orden cronológico, como lo habría escrito la app
+    progreso('balance', 0)
+    with conn:
+        conn.execute('''
+            INSERT INTO balance (fecha, tipo, concepto, monto)
+            SELECT fecha, tipo, concepto, monto FROM (
+                SELECT fecha, 'INGRESO' AS tipo, 'Venta - ' || cliente AS concepto, total AS monto,
+                       0 AS origen, id FROM ventas
+                UNION ALL
+                SELECT fecha, 'EGRESO', concepto, monto, 1, id FROM gastos
+            ) ORDER BY fecha, origen, id
+        ''')
+    
+    progreso('índices', 0)
+    db.recrear_indices_y_triggers()
+    db.reconstruir_resumen_mensual()
+    db.reconstruir_busqueda()
+    db.recalcular_balance()
+    conn.execute('ANALYZE')
+    db.close()
+    
+    cantidades['productos'] = productos
+    cantidades['balance'] = cantidades['ventas'] + cantidades['gastos']
+    return cantidades
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera una base de datos sintética reproducible')
+    parser.add_argument('db', help='Archivo SQLite a crear (se reemplaza si existe)')
+    parser.add_argument('--escala', choices=tuple(ESCALAS), default='pequena',
+                        help='Transacciones totales: ' + ', '.join(f'{k}={v:,}' for k, v in ESCALAS.items()))
+    parser.add_argument('--filas', type=int, help='Transacciones totales (reemplaza a --escala)')
+    parser.add_argument('--anios', type=int, default=3)
+    parser.add_argument('--productos', type=int, default=200)
+    parser.add_argument('--clientes', type=int, default=500)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+    
+    def progreso(etapa, insertadas):
+        if sys.stderr.isatty():
+            sys.stderr.write(f'\r{etapa:<12} {insertadas:>12,}')
+            sys.stderr.flush()
+    
+    inicio = time.perf_counter()
+    cantidades = generar(args.db, args.filas or ESCALAS[args.escala], args.anios, args.productos,
+                         args.clientes, args.semilla, progreso=progreso)
+    if sys.stderr.isatty():
+        sys.stderr.write('\n')
+    print(f'{args.db}: ' + ', '.join(f'{tabla} {n:,}' for tabla, n in cantidades.items())
+          + f' en {time.perf_counter() - inicio:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Búsqueda de texto completo por relevancia (DatabaseManager.buscar)
+"""
+
+import os
+import tempfile
+import unittest
+
+from modules.database import DatabaseManager
+
+
+class BuscarTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.dir.name, 'factory.db'))
+        gastos = [
+            # (concepto, descripcion, categoria, fecha)
+            ('Luz', 'Factura de energía', 'Servicios', '2023-03-01 08:00:00'),
+            ('Energía eléctrica', '', 'Servicios', '2023-06-01 08:00:00'),
+            ('Alquiler', '', 'Local', '2024-01-05 08:00:00'),
+            ('Energía eléctrica', 'Energía del galpón', 'Servicios', '2024-02-01 08:00:00'),
+            ('Sueldos', 'Horas extra por corte de energía', 'Personal', '2024-02-10 08:00:00'),
+            ('Energía eléctrica', '', 'Servicios', '2024-03-01 08:00:00'),
+            ('Agua', 'Bomba de energía solar', 'Servicios', '2024-03-15 08:00:00'),
+        ]
+        with self.db.get_connection() as conn:
+            conn.executemany(
+                'INSERT INTO gastos (concepto, monto, categoria, fecha, descripcion) VALUES (?, 1000, ?, ?, ?)',
+                [(concepto, categoria, fecha, descripcion) for concepto, descripcion, categoria, fecha in gastos],
+            )
+    
+    def tearDown(self):
+        self.db.close()
+        self.dir.cleanup()
+    
+    def _todas(self, query, size, **kwargs):
+        filas, cursor, paginas = [], None, 0
+        while True:
+            pagina, cursor = self.db.buscar(query, 'gastos', after=cursor, size=size, **kwargs)
+            filas += pagina
+            paginas += 1
+            if cursor is None:
+                return filas, paginas
+    
+    def test_ordena_por_relevancia_y_empata_por_la_mas_nueva(self):
+        filas, _ = self.db.buscar('energia', 'gastos', size=10)
+        conceptos = [fila[1] for fila in filas]
+        # El concepto pesa más que la descripción
+        self.assertEqual(conceptos[:3], ['Energía eléctrica'] * 3)
+        self.assertEqual(sorted(conceptos[3:]), ['Agua', 'Luz', 'Sueldos'])
+        # A igual texto, igual relevancia: primero la más nueva
+        self.assertEqual([fila[4][:7] for fila in filas[:3] if not fila[5]], ['2024-03', '2023-06'])
+    
+    def test_las_paginas_por_cursor_repiten_el_orden_completo(self):
+        completas, _ = self.db.buscar('energia', 'gastos', size=10)
+        for size in (1, 2, 3):
+            filas, paginas = self._todas('energia', size)
+            self.assertEqual(filas, completas)
+            self.assertGreater(paginas, 1)
+    
+    def test_sigue_por_los_anios_archivados(self):
+        self.db.archivar_anio(2023)
+        filas, _ = self._todas('energia', 2)
+        fechas = [fila[4][:4] for fila in filas]
+        # Primero la base activa por relevancia, después el año archivado
+        self.assertEqual(fechas, ['2024'] * 4 + ['2023'] * 2)
+        self.assertEqual(len({fila[0] for fila in filas}), 6)
+        
+        filas, _ = self._todas('energia', 2, rango=('2023-01-01', '2024-01-01'))
+        self.assertEqual([fila[1] for fila in filas], ['Energía eléctrica', 'Luz'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Catálogo de productos en memoria (modules.catalog)
+"""
+
+import os
+import tempfile
+import unittest
+
+from modules.database import DatabaseManager
+
+
+class ProductCatalogInvalidarTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.dir.name, 'factory.db'))
+        self.db.add_producto('Café Molido', 'CAF-001', 10, 25000, 'Bebidas')
+        self.catalogo = self.db.catalogo
+        self.catalogo.cargar()
+    
+    def tearDown(self):
+        self.db.close()
+        self.dir.cleanup()
+    
+    def test_invalidar_avisa_y_la_recarga_ve_los_cambios(self):
+        avisos = []
+        # Como la pantalla abierta: al aviso vuelve a cargar el catálogo
+        self.catalogo.suscribir(lambda: (avisos.append(self.catalogo.cargado), self.catalogo.cargar()))
+        with self.db.get_connection() as conn:
+            conn.execute("INSERT INTO productos (nombre, codigo, stock, precio_venta, categoria) "
+                         "VALUES ('Té Verde', 'TE-001', 5, 12000, 'Bebidas')")
+        self.db.invalidar_cache()
+        
+        self.assertEqual(avisos, [False])
+        self.assertTrue(self.catalogo.cargado)
+        self.assertEqual([p.nombre for p in self.catalogo.buscar('te')], ['Té Verde'])
+        self.assertIsNotNone(self.catalogo.buscar_codigo('CAF-001'))
+    
+    def test_cada_suscriptor_recibe_cada_invalidacion(self):
+        avisos = []
+        self.catalogo.suscribir(lambda: avisos.append('a'))
+        self.catalogo.suscribir(lambda: avisos.append('b'))
+        self.catalogo.invalidar()
+        self.catalogo.invalidar()
+        
+        self.assertEqual(avisos, ['a', 'b', 'a', 'b'])
+        self.assertFalse(self.catalogo.cargado)
+
+
+if __name__ == '__main__':
+    unittest.main()
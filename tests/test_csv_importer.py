@@ -0,0 +1,63 @@
+"""
+Importación de históricos CSV (modules.csv_importer)
+"""
+
+import os
+import tempfile
+import unittest
+
+from modules.csv_importer import CSVImporter
+from modules.database import DatabaseManager
+
+
+class CSVImporterBalanceTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.dir.name, 'factory.db'))
+        self.db.add_producto('Producto A', 'PROD-001', 100, 1000, 'General')
+        self.producto_id = self.db.get_productos()[0][0]
+        # Venta de hoy: el libro ya tiene un movimiento con fecha posterior a lo importado
+        self.db.add_venta(self.producto_id, 1, 5000, 'Cliente actual')
+    
+    def tearDown(self):
+        self.db.close()
+        self.dir.cleanup()
+    
+    def escribir_csv(self, nombre, texto):
+        ruta = os.path.join(self.dir.name, nombre)
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+        return ruta
+    
+    def test_filas_con_fecha_pasada_sobre_libro_existente(self):
+        ruta = self.escribir_csv('ventas.csv', (
+            'fecha,codigo,cantidad,precio_unitario,cliente\n'
+            '2020-03-10,PROD-001,1,1000,Cliente A\n'
+            '2020-05-02,PROD-001,2,1500,Cliente B\n'
+            '2020-04-20,PROD-001,1,700,Cliente C\n'
+        ))
+        self.assertEqual(CSVImporter(self.db, tam_lote=2).importar('ventas', ruta), 3)
+        
+        self.assertEqual(self.db.get_balance_en('2020-03-09'), 0)
+        self.assertEqual(self.db.get_balance_en('2020-03-31'), 1000)
+        self.assertEqual(self.db.get_balance_en('2020-04-30'), 1700)
+        self.assertEqual(self.db.get_balance_en('2020-05-31'), 4700)
+        self.assertEqual(self.db.get_balance_actual(), 9700)
+        self.assertEqual(self.db.verificar_balance(), [])
+    
+    def test_filas_en_orden_despues_del_libro(self):
+        ruta = self.escribir_csv('gastos.csv', (
+            'fecha,concepto,monto\n'
+            '2999-01-01,Luz,300\n'
+            '2999-02-01,Agua,200\n'
+        ))
+        CSVImporter(self.db).importar('gastos', ruta)
+        
+        self.assertEqual(self.db.get_balance_en('2999-01-31'), 4700)
+        self.assertEqual(self.db.get_balance_actual(), 4500)
+        self.assertEqual(self.db.verificar_balance(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
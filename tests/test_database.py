@@ -0,0 +1,65 @@
+"""
+Montos en guaraníes y migraciones del esquema (modules.database)
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from modules.database import DatabaseManager, a_guaranies
+
+
+class AGuaraniesTest(unittest.TestCase):
+    
+    def test_redondea_la_mitad_hacia_arriba(self):
+        self.assertEqual(a_guaranies(1000.5), 1001)
+        self.assertEqual(a_guaranies(1001.5), 1002)
+        self.assertEqual(a_guaranies(2.5), 3)
+        self.assertEqual(a_guaranies(1000.49), 1000)
+        self.assertEqual(a_guaranies(None), 0)
+
+
+class MigracionMontosTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.dir.name, 'factory.db')
+        # Base anterior a las migraciones: montos REAL y sin user_version
+        conn = sqlite3.connect(self.ruta)
+        conn.execute('''
+            CREATE TABLE gastos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                concepto TEXT NOT NULL,
+                monto REAL NOT NULL,
+                categoria TEXT,
+                fecha TEXT,
+                descripcion TEXT
+            )
+        ''')
+        conn.executemany(
+            "INSERT INTO gastos (concepto, monto, categoria, fecha, descripcion) VALUES (?, ?, 'Otros', ?, '')",
+            [('Luz', 1000.5, '2025-01-10 08:00:00'), ('Agua', 2500.5, '2025-01-11 08:00:00')],
+        )
+        conn.commit()
+        conn.close()
+    
+    def tearDown(self):
+        self.db.close()
+        self.dir.cleanup()
+    
+    def test_la_migracion_redondea_como_a_guaranies(self):
+        self.db = DatabaseManager(self.ruta)
+        conn = self.db.get_connection()
+        
+        montos = [fila[0] for fila in conn.execute('SELECT monto FROM gastos ORDER BY id')]
+        self.assertEqual(montos, [a_guaranies(1000.5), a_guaranies(2500.5)])
+        self.assertEqual(montos, [1001, 2501])
+        
+        # Un gasto nuevo del mismo monto queda igual que el migrado
+        self.db.add_gasto('Luz', 1000.5, 'Otros', '')
+        self.assertEqual(conn.execute('SELECT monto FROM gastos ORDER BY id DESC LIMIT 1').fetchone()[0], 1001)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Historial paginado de las pantallas de ventas y gastos (modules.historial)
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+from modules.database import DatabaseManager
+from modules.db_executor import DBExecutor
+from modules.historial import PaginadorHistorial
+
+
+class PaginadorHistorialTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.dir.name, 'factory.db'))
+        for i in range(7):
+            self.db.add_gasto(f'Gasto {i}', 1000 * (i + 1), 'General', 'Luz' if i % 2 else '')
+        # Como Clock.schedule_once: los callbacks esperan a que la "interfaz" los corra
+        self.pendientes = []
+        self.ejecutor = DBExecutor(self.db, despachar=self.pendientes.append)
+        self.datos = []
+        self.errores = []
+        self.paginador = PaginadorHistorial(
+            self.ejecutor, 'gastos', DatabaseManager.get_gastos_page,
+            lambda g: g[1], al_agregar=self.datos.extend, al_fallar=self.errores.append, tam_pagina=3,
+        )
+    
+    def tearDown(self):
+        self.ejecutor.cerrar()
+        self.db.close()
+        self.dir.cleanup()
+    
+    def procesar(self):
+        """Espera al hilo de la base de datos y corre los callbacks despachados"""
+        self.ejecutor.enviar(lambda: None).result()
+        while self.pendientes:
+            self.pendientes.pop(0)()
+    
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        self.paginador.reiniciar()
+        self.assertTrue(self.paginador.cargando)
+        # Con una página en camino no se pide otra
+        self.assertIsNone(self.paginador.siguiente())
+        self.procesar()
+        while not self.paginador.completo:
+            self.assertIsNotNone(self.paginador.siguiente())
+            self.procesar()
+        
+        self.assertEqual(self.datos, [f'Gasto {i}' for i in reversed(range(7))])
+        self.assertFalse(self.paginador.cargando)
+        self.assertIsNone(self.paginador.siguiente())
+    
+    def test_busqueda_reinicia_y_descarta_paginas_viejas(self):
+        self.paginador.reiniciar()
+        # La búsqueda llega antes que la primera página del historial completo
+        self.paginador.reiniciar('luz')
+        self.procesar()
+        while not self.paginador.completo:
+            self.paginador.siguiente()
+            self.procesar()
+        
+        self.assertEqual(self.datos, ['Gasto 5', 'Gasto 3', 'Gasto 1'])
+        self.assertEqual(self.paginador.busqueda, 'luz')
+    
+    def test_pagina_reemplazada_no_se_consulta(self):
+        consultas = []
+        self.paginador.get_pagina = lambda db, after, size: consultas.append(after) or ([], None)
+        # Con el hilo de la base ocupado, las dos páginas esperan en la cola
+        liberar = threading.Event()
+        self.ejecutor.enviar(liberar.wait, 5)
+        self.paginador.reiniciar()
+        self.paginador.reiniciar()
+        liberar.set()
+        self.procesar()
+        
+        self.assertEqual(consultas, [None])
+        self.assertTrue(self.paginador.completo)
+    
+    def test_error_libera_la_carga(self):
+        self.paginador.get_pagina = lambda db, after, size: 1 / 0
+        self.paginador.reiniciar()
+        self.procesar()
+        
+        self.assertFalse(self.paginador.cargando)
+        self.assertEqual(len(self.errores), 1)
+        self.assertIsInstance(self.errores[0], ZeroDivisionError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Escritura agrupada (modules.write_batcher) al cerrar la base
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from modules.database import DatabaseManager
+from modules.write_batcher import EscriturasDescartadas
+
+
+class WriteBatcherCierreTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.dir.name, 'factory.db'))
+        self.db.activar_escritura_agrupada(max_ms=1000)
+    
+    def tearDown(self):
+        try:
+            self.db.close()
+        except EscriturasDescartadas:
+            pass
+        self.dir.cleanup()
+    
+    def _encolar(self, aplicar):
+        self.assertTrue(self.db._lote.encolar(aplicar, ()))
+    
+    def test_close_espera_el_lote_pendiente(self):
+        for i in range(20):
+            self.db.add_gasto(f'Gasto {i}', 100, 'Otros', '')
+        self.assertGreater(self.db._lote.pendientes, 0)
+        self.db.close()
+        
+        conn = sqlite3.connect(self.db.db_path)
+        try:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM gastos").fetchone()[0], 20)
+        finally:
+            conn.close()
+    
+    def test_close_informa_las_escrituras_descartadas(self):
+        def invalida(conn):
+            conn.execute("INSERT INTO tabla_inexistente VALUES (1)")
+        self._encolar(invalida)
+        self._encolar(invalida)
+        
+        with self.assertRaises(EscriturasDescartadas) as contexto:
+            self.db.close()
+        self.assertEqual(len(contexto.exception.errores), 2)
+        # Las conexiones se cierran igual
+        self.assertEqual(self.db._conexiones, [])
+    
+    def test_close_con_plazo_vencido_no_cierra_las_conexiones(self):
+        liberar = threading.Event()
+        self._encolar(lambda conn: liberar.wait(5))
+        
+        with self.assertRaises(TimeoutError):
+            self.db.close(timeout=0.1)
+        self.assertIsNotNone(self.db._lote)
+        self.assertNotEqual(self.db._conexiones, [])
+        
+        liberar.set()
+        self.db.close()
+        self.assertIsNone(self.db._lote)
+
+
+if __name__ == '__main__':
+    unittest.main()